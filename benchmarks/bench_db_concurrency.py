@@ -0,0 +1,133 @@
+# benchmarks/bench_db_concurrency.py
+"""
+Load test: API-style readers running while the scraper bulk-writes events.
+
+    python3 benchmarks/bench_db_concurrency.py --events 200000 --readers 4
+
+Runs the same workload against a database opened through db_utils (WAL,
+pooled readers, single writer) and against plain default-journal
+connections, and prints reader latency percentiles and errors as JSON.
+"""
+import sys
+import json
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import click
+from src.utils.db_utils import ConnectionPool, writer_connection, ensure_schema, upsert_events
+
+SCHEMA = Path(__file__).parent.parent / 'src' / 'schemas' / 'venue_schema.sql'
+
+def create_database(db_path, venue_count):
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA.read_text())
+    conn.executemany(
+        "INSERT INTO venues (name, x_coordinate, y_coordinate, address, size, category) VALUES (?, ?, ?, ?, ?, ?)",
+        [(f"Venue {i}", 42.3 + random.random() / 10, -83.0 - random.random() / 10, f"{i} Main St, Detroit, MI",
+          'Small', 'Club') for i in range(venue_count)]
+    )
+    conn.commit()
+    ensure_schema(conn)
+    conn.close()
+
+def make_events(count, venue_count):
+    return [{
+        'venue_id': random.randint(1, venue_count),
+        'name': f"Event {i}",
+        'date': f"2026-{random.randint(1, 12):02d}-{random.randint(1, 28):02d} 20:00:00",
+        'url': f"https://example.com/{i}"
+    } for i in range(count)]
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * pct / 100))] * 1000, 2)
+
+def run_workload(db_path, events, readers, batches, pooled, read_interval):
+    stop = threading.Event()
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    pool = ConnectionPool(db_path, size=readers) if pooled else None
+
+    def reader():
+        conn = None if pooled else sqlite3.connect(db_path, timeout=5)
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                if pooled:
+                    with pool.connection() as pooled_conn:
+                        pooled_conn.execute("SELECT * FROM venues WHERE id > ? ORDER BY id LIMIT 50",
+                                            (random.randint(0, 1000),)).fetchall()
+                else:
+                    conn.execute("SELECT * FROM venues WHERE id > ? ORDER BY id LIMIT 50",
+                                 (random.randint(0, 1000),)).fetchall()
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+            except sqlite3.Error as e:
+                with lock:
+                    errors.append(str(e))
+            # Think time between requests, like API clients paging through results
+            time.sleep(read_interval)
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+
+    write_start = time.perf_counter()
+    batch_size = max(1, len(events) // batches)
+    for i in range(0, len(events), batch_size):
+        batch = events[i:i + batch_size]
+        if pooled:
+            with writer_connection(db_path) as conn:
+                upsert_events(conn, batch)
+        else:
+            conn = sqlite3.connect(db_path, timeout=5)
+            conn.row_factory = sqlite3.Row
+            upsert_events(conn, batch)
+            conn.close()
+    write_seconds = time.perf_counter() - write_start
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return {
+        'write_seconds': round(write_seconds, 3),
+        'reads': len(latencies),
+        'read_p50_ms': percentile(latencies, 50),
+        'read_p95_ms': percentile(latencies, 95),
+        'read_p99_ms': percentile(latencies, 99),
+        'read_max_ms': round(max(latencies) * 1000, 2) if latencies else None,
+        'read_mean_ms': round(statistics.mean(latencies) * 1000, 2) if latencies else None,
+        'read_errors': len(errors),
+        'sample_error': errors[0] if errors else None
+    }
+
+@click.command()
+@click.option('--venues', 'venue_count', default=5000, type=int, help='Venues in the test database')
+@click.option('--events', 'event_count', default=200000, type=int, help='Events written during the test')
+@click.option('--batches', default=4, type=int, help='Write transactions the events are split into')
+@click.option('--readers', default=4, type=int, help='Concurrent reader threads')
+@click.option('--read-interval', default=0.002, type=float, help='Seconds each reader waits between queries')
+def main(venue_count, event_count, batches, readers, read_interval):
+    random.seed(0)
+    events = make_events(event_count, venue_count)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode, pooled in (('wal_pooled', True), ('default_journal', False)):
+            db_path = str(Path(tmp) / f"{mode}.db")
+            create_database(db_path, venue_count)
+            results[mode] = run_workload(db_path, events, readers, batches, pooled, read_interval)
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+# benchmarks/bench_dedup.py
+"""
+Benchmark deduplicate_events on synthetic event sets.
+
+    python3 benchmarks/bench_dedup.py --sizes 10000 100000
+
+The blocked matcher is checked against the original all-pairs implementation
+on the first --check events of each set.
+"""
+import sys
+import json
+import random
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import click
+from thefuzz import fuzz
+from src.utils.validation_utils import deduplicate_events
+
+WORDS = ['jazz', 'night', 'live', 'comedy', 'show', 'festival', 'detroit', 'tigers', 'vs', 'red',
+         'wings', 'techno', 'brunch', 'market', 'symphony', 'orchestra', 'tour', 'presents', 'open',
+         'mic', 'hip', 'hop', 'soul', 'motown', 'revue', 'friday', 'summer', 'series', 'the', 'band']
+SOURCES = ['Ticketmaster', 'Eventbrite', 'Website']
+
+def reference_deduplicate(events):
+    """
+    The original O(n^2) implementation, kept here as the correctness baseline.
+    """
+    deduplicated = []
+    for event in events:
+        is_duplicate = False
+        for existing in deduplicated:
+            name_similarity = fuzz.ratio(event['name'].lower(), existing['name'].lower())
+            date_match = event['date'] == existing['date']
+            if name_similarity > 90 and date_match:
+                is_duplicate = True
+                break
+        if not is_duplicate:
+            deduplicated.append(event)
+    return deduplicated
+
+def make_events(count, seed=0):
+    """
+    Build a synthetic event list where roughly a third of the entries are
+    near-duplicates (case changes, typos, suffixes) of earlier ones.
+    """
+    rng = random.Random(seed)
+    dates = [f"2026-{month:02d}-{day:02d} 20:00:00" for month in range(1, 13) for day in range(1, 29)]
+    events = []
+    for i in range(count):
+        if events and rng.random() < 0.35:
+            base = rng.choice(events)
+            name = base['name']
+            variant = rng.randrange(3)
+            if variant == 0:
+                name = name.upper()
+            elif variant == 1 and len(name) > 3:
+                pos = rng.randrange(len(name))
+                name = name[:pos] + rng.choice('abcdefghij') + name[pos + 1:]
+            else:
+                name = name + ' ' + rng.choice(['live', 'tickets', '(18+)'])
+            events.append({'name': name, 'date': base['date'], 'url': base['url'], 'venue': base['venue']})
+        else:
+            name = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 6)))
+            events.append({
+                'name': name,
+                'date': rng.choice(dates),
+                'url': f"https://example.com/events/{i}",
+                'venue': f"{rng.choice(SOURCES)} venue {rng.randrange(500)}"
+            })
+    return events
+
+@click.command()
+@click.option('--sizes', multiple=True, type=int, default=[10000, 100000], help='Synthetic event set sizes')
+@click.option('--check', default=3000, type=int, help='Events compared against the reference implementation')
+@click.option('--seed', default=0, type=int, help='Random seed')
+def main(sizes, check, seed):
+    results = []
+    for size in sizes:
+        events = make_events(size, seed)
+        sample = events[:check]
+        matches = deduplicate_events(sample) == reference_deduplicate(sample)
+
+        start = time.perf_counter()
+        deduplicated = deduplicate_events(events)
+        elapsed = time.perf_counter() - start
+        results.append({
+            'events': size,
+            'kept': len(deduplicated),
+            'seconds': round(elapsed, 3),
+            'events_per_second': round(size / elapsed) if elapsed else None,
+            'matches_reference': matches
+        })
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
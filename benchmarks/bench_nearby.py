@@ -0,0 +1,79 @@
+# benchmarks/bench_nearby.py
+"""
+Benchmark radius queries over a synthetic metro area of venues.
+
+    python3 benchmarks/bench_nearby.py --venues 100000 --queries 500
+
+Compares find_nearby_venues (R*Tree candidates + haversine refinement)
+against loading every venue and computing distances in Python.
+"""
+import sys
+import json
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import click
+from src.utils.db_utils import connect_db, ensure_schema
+from src.utils.geo_utils import find_nearby_venues, haversine_miles
+
+SCHEMA = Path(__file__).parent.parent / 'src' / 'schemas' / 'venue_schema.sql'
+DETROIT = (42.3314, -83.0458)
+
+def create_database(db_path, venue_count, seed):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA.read_text())
+    conn.executemany(
+        "INSERT INTO venues (name, x_coordinate, y_coordinate, address, size, category) VALUES (?, ?, ?, ?, ?, ?)",
+        [(f"Venue {i}", DETROIT[0] + rng.uniform(-0.6, 0.6), DETROIT[1] + rng.uniform(-0.8, 0.8),
+          f"{i} Main St", 'Small', 'Club') for i in range(venue_count)]
+    )
+    conn.commit()
+    conn.close()
+
+def scan_nearby(conn, latitude, longitude, radius_miles):
+    rows = conn.execute("SELECT id, name, x_coordinate, y_coordinate FROM venues").fetchall()
+    nearby = [(haversine_miles(latitude, longitude, row['x_coordinate'], row['y_coordinate']), row['id']) for row in rows]
+    return sorted(venue_id for distance, venue_id in nearby if distance <= radius_miles)
+
+def timed(func, queries):
+    start = time.perf_counter()
+    results = [func(*query) for query in queries]
+    elapsed = time.perf_counter() - start
+    return results, elapsed
+
+@click.command()
+@click.option('--venues', 'venue_count', default=100000, type=int, help='Synthetic venues')
+@click.option('--queries', 'query_count', default=500, type=int, help='Radius queries to time')
+@click.option('--radius', default=2.0, type=float, help='Query radius in miles')
+@click.option('--scan-queries', default=20, type=int, help='Queries used for the full-scan baseline')
+@click.option('--seed', default=0, type=int, help='Random seed')
+def main(venue_count, query_count, radius, scan_queries, seed):
+    rng = random.Random(seed + 1)
+    queries = [(DETROIT[0] + rng.uniform(-0.5, 0.5), DETROIT[1] + rng.uniform(-0.7, 0.7)) for _ in range(query_count)]
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / 'venues.db')
+        create_database(db_path, venue_count, seed)
+        conn = connect_db(db_path)
+        ensure_schema(conn)
+
+        indexed, indexed_seconds = timed(
+            lambda lat, lng: sorted(v['id'] for v in find_nearby_venues(conn, lat, lng, radius)), queries)
+        scanned, scan_seconds = timed(lambda lat, lng: scan_nearby(conn, lat, lng, radius), queries[:scan_queries])
+        conn.close()
+
+    print(json.dumps({
+        'venues': venue_count,
+        'radius_miles': radius,
+        'mean_results': round(sum(len(r) for r in indexed) / len(indexed), 1),
+        'indexed_ms_per_query': round(indexed_seconds / len(queries) * 1000, 3),
+        'scan_ms_per_query': round(scan_seconds / len(scanned) * 1000, 3),
+        'matches_scan': indexed[:len(scanned)] == scanned
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,270 @@
+# benchmarks/bench_pipeline.py
+"""
+Time each stage of the event pipeline against recorded fixtures.
+
+    python3 benchmarks/bench_pipeline.py --venues 200 --output pipeline.json
+    python3 benchmarks/bench_pipeline.py --venues 200 --baseline pipeline.json
+
+A local server replays the canned Ticketmaster/Eventbrite JSON, serves the
+saved venue page once per venue and answers Gemini requests with canned
+events, so no API keys or network access are needed. Each stage reports
+latency percentiles and throughput as JSON. With --baseline, the run exits
+non-zero if a stage's p95 latency grew by more than --max-regression.
+"""
+import sys
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import get_context
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import click
+from src import event_scraper_agent
+from src.event_scraper_agent import get_api_events
+from src.utils import llm_utils
+from src.utils.llm_utils import extract_event_data, extract_event_data_batch
+from src.utils.scraping_utils import scrape_websites, scrape_dynamic_website, BrowserPool
+from src.utils.validation_utils import deduplicate_events
+from src.utils.db_utils import writer_connection, upsert_events
+from src.utils.http_utils import PROVIDERS, http_stats
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+SCHEMA = Path(__file__).parent.parent / 'src' / 'schemas' / 'venue_schema.sql'
+BATCH_LINE = re.compile(r'^\[(\d+)\] Source: ', re.M)
+
+def load_fixtures():
+    return {
+        'ticketmaster': (FIXTURES / 'ticketmaster_events.json').read_bytes(),
+        'eventbrite': (FIXTURES / 'eventbrite_events.json').read_bytes(),
+        'venue_page': (FIXTURES / 'venue_events.html').read_text(),
+        'gemini_events': json.loads((FIXTURES / 'gemini_events.json').read_text())
+    }
+
+def venue_page(fixtures, number):
+    # Each venue gets its own page so neither the LLM cache nor Scrapy's cache can answer for another
+    return fixtures['venue_page'].replace('{venue}', f"Venue {number}")
+
+def start_fixture_server(fixtures, latency_ms):
+    """
+    Serve the fixtures on a free localhost port, sleeping latency_ms per request
+    to stand in for upstream response time.
+    """
+
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def reply(self, body, content_type='application/json'):
+            time.sleep(latency_ms / 1000)
+            body = body.encode('utf-8') if isinstance(body, str) else body
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.startswith('/ticketmaster'):
+                self.reply(fixtures['ticketmaster'])
+            elif self.path.startswith('/eventbrite'):
+                self.reply(fixtures['eventbrite'])
+            elif self.path.startswith('/venues/'):
+                self.reply(venue_page(fixtures, self.path.rsplit('/', 1)[-1]), 'text/html; charset=utf-8')
+            else:
+                self.send_error(404)
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            prompt = request['contents'][0]['parts'][0]['text']
+            items = BATCH_LINE.findall(prompt)
+            if items:
+                value = [{'id': int(item), 'result': fixtures['gemini_events']} for item in items]
+            else:
+                value = fixtures['gemini_events']
+            self.reply(json.dumps({'candidates': [{'content': {'parts': [{'text': json.dumps(value)}]}}]}))
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def summarize(latencies, items, wall_seconds, errors=0):
+    """
+    Latency percentiles (ms) and throughput for one stage.
+    """
+    latencies = sorted(latencies)
+
+    def percentile(pct):
+        if not latencies:
+            return None
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * pct / 100))] * 1000, 2)
+
+    return {
+        'calls': len(latencies),
+        'items': items,
+        'errors': errors,
+        'seconds': round(wall_seconds, 3),
+        'p50_ms': percentile(50),
+        'p95_ms': percentile(95),
+        'p99_ms': percentile(99),
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else None,
+        'items_per_second': round(items / wall_seconds, 1) if wall_seconds else None
+    }
+
+def run_stage(func, inputs, concurrency):
+    """
+    Call func on every input with up to concurrency calls in flight.
+
+    Returns:
+        tuple: (results, latencies, wall seconds), results None where func returned None.
+    """
+
+    def call(args):
+        start = time.perf_counter()
+        result = func(*args)
+        return result, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        outcomes = list(executor.map(call, inputs))
+    wall = time.perf_counter() - start
+    return [result for result, _ in outcomes], [latency for _, latency in outcomes], wall
+
+def timed_crawl(urls, cache_dir):
+    """
+    Crawl in this (child) process and return the events with the crawl time.
+    Runs in a spawned process because Scrapy's reactor can only start once.
+    """
+    start = time.perf_counter()
+    events_by_url = scrape_websites(urls, cache_dir=cache_dir)
+    return events_by_url, time.perf_counter() - start
+
+def compare_to_baseline(stages, baseline, max_regression):
+    """
+    List the stages whose p95 latency grew by more than max_regression (a fraction).
+    """
+    regressions = []
+    for name, stage in stages.items():
+        before = baseline.get('stages', {}).get(name, {}).get('p95_ms')
+        after = stage.get('p95_ms')
+        if before and after and after > before * (1 + max_regression):
+            regressions.append({'stage': name, 'baseline_p95_ms': before, 'p95_ms': after,
+                                'change': round(after / before - 1, 3)})
+    return regressions
+
+@click.command()
+@click.option('--venues', default=100, type=int, help='Number of venues run through every stage')
+@click.option('--concurrency', default=4, type=int, help='Calls in flight for the API and extraction stages')
+@click.option('--latency-ms', default=20.0, type=float, help='Simulated upstream latency per fixture request')
+@click.option('--write-batch', default=50, type=int, help='Events per database write transaction')
+@click.option('--dedup-repeat', default=5, type=int, help='Times the deduplication stage is repeated')
+@click.option('--dynamic', is_flag=True, help='Also time scrape_dynamic_website (needs Chrome)')
+@click.option('--rate-limits', is_flag=True, help='Keep the per-provider rate limits instead of disabling them')
+@click.option('--output', type=click.Path(dir_okay=False), help='Also write the results to this file')
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False), help='Earlier results to compare p95 latencies with')
+@click.option('--max-regression', default=0.2, type=float, help='Allowed p95 growth over the baseline, as a fraction')
+def main(venues, concurrency, latency_ms, write_batch, dedup_repeat, dynamic, rate_limits, output, baseline, max_regression):
+    workdir = Path(tempfile.mkdtemp(prefix='bench_pipeline_'))
+    # Cold LLM cache, so every extraction reaches the (mock) model
+    os.environ['LLM_CACHE_PATH'] = str(workdir / 'llm_cache.db')
+    if not rate_limits:
+        # A rate of 0 disables the token bucket (see http_utils.TokenBucket)
+        for provider in PROVIDERS:
+            os.environ[f"{provider.upper()}_RATE_LIMIT"] = '0'
+
+    fixtures = load_fixtures()
+    server = start_fixture_server(fixtures, latency_ms)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    event_scraper_agent.TICKETMASTER_URL = f"{base_url}/ticketmaster"
+    event_scraper_agent.EVENTBRITE_URL = f"{base_url}/eventbrite"
+    llm_utils.GEMINI_URL = f"{base_url}/gemini"
+
+    names = [f"Venue {number}" for number in range(venues)]
+    urls = [f"{base_url}/venues/{number}" for number in range(venues)]
+    pages = [(venue_page(fixtures, number), url) for number, url in enumerate(urls)]
+    stages = {}
+    all_events = []
+
+    results, latencies, wall = run_stage(get_api_events, [(name,) for name in names], concurrency)
+    api_events = [event for events in results for event in events]
+    stages['get_api_events'] = summarize(latencies, venues, wall, sum(1 for events in results if not events))
+    all_events.extend(api_events)
+
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+        start = time.perf_counter()
+        events_by_url, crawl_seconds = executor.submit(timed_crawl, urls, str(workdir / 'httpcache')).result()
+        wall = time.perf_counter() - start
+    website_events = [event for events in events_by_url.values() for event in events]
+    # One crawl covers every page; startup is measured by the wall time
+    stages['scrape_website'] = summarize([crawl_seconds], venues, wall, sum(1 for url in urls if not events_by_url.get(url)))
+    all_events.extend(website_events)
+
+    if dynamic:
+        with BrowserPool(size=concurrency) as pool:
+            results, latencies, wall = run_stage(scrape_dynamic_website, [(url, extract_event_data, pool) for url in urls], concurrency)
+        stages['scrape_dynamic_website'] = summarize(latencies, venues, wall, sum(1 for events in results if not events))
+
+    results, latencies, wall = run_stage(extract_event_data, pages, concurrency)
+    stages['extract_event_data'] = summarize(latencies, venues, wall, sum(1 for events in results if events is None))
+    all_events.extend(event for events in results if events for event in events)
+
+    # Fresh URLs so the batch stage also misses the cache
+    batch_pages = [(html, f"{url}?batch") for html, url in pages]
+    start = time.perf_counter()
+    results = extract_event_data_batch(batch_pages, concurrency)
+    wall = time.perf_counter() - start
+    stages['extract_event_data_batch'] = summarize([wall], venues, wall, sum(1 for events in results if events is None))
+
+    latencies = []
+    for _ in range(dedup_repeat):
+        start = time.perf_counter()
+        deduplicate_events(all_events)
+        latencies.append(time.perf_counter() - start)
+    stages['deduplicate_events'] = summarize(latencies, len(all_events) * dedup_repeat, sum(latencies))
+
+    db_path = workdir / 'venues.db'
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA.read_text())
+    conn.executemany(
+        "INSERT INTO venues (name, x_coordinate, y_coordinate, address, size, category) VALUES (?, ?, ?, ?, ?, ?)",
+        [(name, 42.33, -83.05, f"{number} Woodward Ave, Detroit, MI", 'Small', 'Club') for number, name in enumerate(names)]
+    )
+    conn.commit()
+    venue_ids = dict(conn.execute("SELECT name, id FROM venues"))
+    conn.close()
+    # Events are stored per venue, so every collected event is written, not just the deduplicated set
+    ids = list(venue_ids.values())
+    rows = [dict(event, venue_id=venue_ids.get(event.get('venue')) or ids[number % len(ids)])
+            for number, event in enumerate(all_events)]
+    latencies = []
+    for offset in range(0, len(rows), max(write_batch, 1)):
+        start = time.perf_counter()
+        with writer_connection(db_path) as conn:
+            upsert_events(conn, rows[offset:offset + write_batch])
+        latencies.append(time.perf_counter() - start)
+    stages['upsert_events'] = summarize(latencies, len(rows), sum(latencies))
+    server.shutdown()
+
+    report = {
+        'config': {'venues': venues, 'concurrency': concurrency, 'latency_ms': latency_ms, 'write_batch': write_batch,
+                   'rate_limits': rate_limits},
+        'stages': stages,
+        'http': http_stats()
+    }
+    if baseline:
+        report['regressions'] = compare_to_baseline(stages, json.loads(Path(baseline).read_text()), max_regression)
+    print(json.dumps(report, indent=2))
+    if output:
+        Path(output).write_text(json.dumps(report, indent=2))
+    if report.get('regressions'):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
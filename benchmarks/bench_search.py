@@ -0,0 +1,122 @@
+# benchmarks/bench_search.py
+"""
+Benchmark full-text search over synthetic venues and events.
+
+    python3 benchmarks/bench_search.py --venues 100000 --events 200000 --queries 500
+
+Times search_venues/search_events (FTS5, BM25, prefix terms) against a
+LIKE scan over the same columns, and the cost of keeping the index in sync
+on bulk event writes.
+"""
+import sys
+import json
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import click
+from src.utils.db_utils import connect_db, ensure_schema, upsert_events
+from src.utils.search_utils import search_venues, search_events
+
+SCHEMA = Path(__file__).parent.parent / 'src' / 'schemas' / 'venue_schema.sql'
+WORDS = ['jazz', 'night', 'live', 'comedy', 'show', 'festival', 'detroit', 'techno', 'brunch', 'market',
+         'symphony', 'orchestra', 'tour', 'presents', 'open', 'mic', 'hip', 'hop', 'soul', 'motown', 'revue',
+         'summer', 'series', 'band', 'blues', 'gospel', 'poetry', 'dance', 'karaoke', 'trivia', 'vinyl', 'funk']
+CATEGORIES = ['Stadium', 'Theater', 'Club', 'Community Space', 'Festival Space']
+
+def make_vocabulary(size, seed):
+    """
+    The event words followed by made-up words, drawn with Zipf weights so a few
+    words are very common and most are rare, as in real listings.
+    """
+    rng = random.Random(seed + 3)
+    words = list(WORDS)
+    while len(words) < size:
+        words.append(''.join(rng.choice('abcdefghijklmnoprstuvwy') for _ in range(rng.randint(4, 9))))
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+    return words, weights
+
+def phrase(rng, vocabulary, low, high):
+    words, weights = vocabulary
+    return ' '.join(rng.choices(words, weights, k=rng.randint(low, high)))
+
+def create_database(db_path, venue_count, vocabulary, seed):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA.read_text())
+    conn.executemany(
+        "INSERT INTO venues (name, x_coordinate, y_coordinate, address, size, category, description) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(f"The {phrase(rng, vocabulary, 1, 2).title()} Room {i}", 42.3, -83.0, f"{i} Woodward Ave, Detroit, MI", 'Small',
+          rng.choice(CATEGORIES), f"Venue for {phrase(rng, vocabulary, 4, 12)}") for i in range(venue_count)]
+    )
+    conn.commit()
+    conn.close()
+
+def make_events(count, venue_count, vocabulary, seed):
+    rng = random.Random(seed + 2)
+    return [{
+        'venue_id': rng.randint(1, venue_count),
+        'name': f"{phrase(rng, vocabulary, 2, 5).title()} {i}",
+        'date': f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 20:00:00",
+        'url': f"https://example.com/{i}"
+    } for i in range(count)]
+
+def like_search(conn, words):
+    # Ranking needs every match, so the scan can't stop at the first page
+    clauses = ' AND '.join("(name LIKE ? OR description LIKE ? OR category LIKE ? OR address LIKE ?)" for _ in words)
+    params = [f"%{word}%" for word in words for _ in range(4)]
+    return conn.execute(f"SELECT id FROM venues WHERE {clauses}", params).fetchall()
+
+def timed(func, queries):
+    start = time.perf_counter()
+    results = [func(query) for query in queries]
+    return results, time.perf_counter() - start
+
+@click.command()
+@click.option('--venues', 'venue_count', default=100000, type=int, help='Synthetic venues')
+@click.option('--events', 'event_count', default=200000, type=int, help='Synthetic events')
+@click.option('--queries', 'query_count', default=500, type=int, help='Search queries to time')
+@click.option('--like-queries', default=20, type=int, help='Queries used for the LIKE scan baseline')
+@click.option('--limit', default=20, type=int, help='Results per query')
+@click.option('--vocabulary', 'vocabulary_size', default=5000, type=int, help='Distinct words in names and descriptions')
+@click.option('--seed', default=0, type=int, help='Random seed')
+def main(venue_count, event_count, query_count, like_queries, limit, vocabulary_size, seed):
+    rng = random.Random(seed + 1)
+    vocabulary = make_vocabulary(vocabulary_size, seed)
+    # One or two words, the last often a partial word as typed in a search box
+    queries = []
+    for _ in range(query_count):
+        words = phrase(rng, vocabulary, 1, 2).split()
+        if rng.random() < 0.5:
+            words[-1] = words[-1][:rng.randint(2, len(words[-1]))]
+        queries.append(' '.join(words))
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / 'venues.db')
+        create_database(db_path, venue_count, vocabulary, seed)
+        conn = connect_db(db_path)
+        ensure_schema(conn)
+        events = make_events(event_count, venue_count, vocabulary, seed)
+        start = time.perf_counter()
+        upsert_events(conn, events)
+        write_seconds = time.perf_counter() - start
+
+        venue_results, venue_seconds = timed(lambda query: search_venues(conn, query, limit), queries)
+        _, event_seconds = timed(lambda query: search_events(conn, query, limit), queries)
+        _, like_seconds = timed(lambda query: like_search(conn, query.split()), queries[:like_queries])
+        conn.close()
+
+    print(json.dumps({
+        'venues': venue_count,
+        'events': event_count,
+        'event_write_seconds': round(write_seconds, 3),
+        'mean_venue_results': round(sum(len(r) for r in venue_results) / len(venue_results), 1),
+        'venue_search_ms_per_query': round(venue_seconds / len(queries) * 1000, 3),
+        'event_search_ms_per_query': round(event_seconds / len(queries) * 1000, 3),
+        'like_scan_ms_per_query': round(like_seconds / max(min(like_queries, len(queries)), 1) * 1000, 3)
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
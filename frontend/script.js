@@ -1,77 +1,160 @@
 document.addEventListener('DOMContentLoaded', () => {
     const tableContainer = document.getElementById('table-container');
+    const searchInput = document.getElementById('search');
 
-    fetch('http://127.0.0.1:5000/api/venues')
-        .then(response => {
+    const API_URL = 'http://127.0.0.1:5000/api/venues';
+    const SEARCH_URL = 'http://127.0.0.1:5000/api/search';
+    // Written by the agents at the end of each run (see export_utils.write_static_snapshot)
+    const SNAPSHOT_URL = 'data/venues.json.gz';
+    const PAGE_SIZE = 200;
+    const SEARCH_LIMIT = 100;
+    const SEARCH_DELAY_MS = 250;
+    // Bumped on every new listing so responses for an older one are dropped
+    let generation = 0;
+
+    // Custom columns in desired order
+    const columns = [
+        { key: 'name', label: 'Venue' },
+        { key: 'address', label: 'Address' },
+        { key: 'category', label: 'Category' },
+        { key: 'phone_number', label: 'Phone Number' },
+        { key: 'rating', label: 'Rating' },
+        { key: 'x_coordinate', label: 'X Coordinate' },
+        { key: 'y_coordinate', label: 'Y Coordinate' },
+        { key: 'website_url', label: 'website' },
+        { key: 'instagram', label: 'Instagram' },
+        { key: 'facebook', label: 'Facebook' },
+    ];
+    const fields = columns.map(column => column.key).join(',');
+
+    const table = document.createElement('table');
+    table.className = 'min-w-full bg-white border-collapse';
+    const thead = document.createElement('thead');
+    thead.className = 'bg-gray-800 text-white';
+    const tbody = document.createElement('tbody');
+    tbody.className = 'text-gray-700';
+
+    const headerRow = document.createElement('tr');
+    columns.forEach(column => {
+        const th = document.createElement('th');
+        th.className = 'py-2 px-4 border';
+        th.textContent = column.label;
+        headerRow.appendChild(th);
+    });
+    thead.appendChild(headerRow);
+    table.appendChild(thead);
+    table.appendChild(tbody);
+
+    function appendRows(venues) {
+        // Build each page off-DOM and attach it in one go
+        const fragment = document.createDocumentFragment();
+        venues.forEach(venue => {
+            const row = document.createElement('tr');
+            row.className = 'border-b';
+            columns.forEach(column => {
+                const td = document.createElement('td');
+                td.className = 'py-2 px-4 border';
+                let value = venue[column.key];
+
+                // Format date columns
+                if (column.key === 'upcoming_event_date' && value) {
+                    const date = new Date(value);
+                    value = !isNaN(date) ? date.toLocaleString() : 'Invalid Date';
+                }
+                // Handle boolean flags (if any)
+                else if (typeof value === 'boolean') {
+                    value = value ? 'Yes' : 'No';
+                }
+
+                td.textContent = value !== null && value !== undefined ? value : 'N/A';
+                row.appendChild(td);
+            });
+            fragment.appendChild(row);
+        });
+        tbody.appendChild(fragment);
+    }
+
+    function fetchJson(url) {
+        return fetch(url).then(response => {
             if (!response.ok) throw new Error(`Backend error: ${response.status}`);
             return response.json();
-        })
-        .then(data => {
-            if (!data || data.length === 0) {
-                tableContainer.innerHTML = '<p class="text-gray-500">No venues found.</p>';
-                return;
-            }
-
-            const table = document.createElement('table');
-            table.className = 'min-w-full bg-white border-collapse';
-            const thead = document.createElement('thead');
-            thead.className = 'bg-gray-800 text-white';
-            const tbody = document.createElement('tbody');
-            tbody.className = 'text-gray-700';
-
-            // Custom columns in desired order
-            const columns = [
-                { key: 'name', label: 'Venue' },
-                { key: 'address', label: 'Address' },
-                { key: 'category', label: 'Category' },
-                { key: 'phone_number', label: 'Phone Number' },
-                { key: 'rating', label: 'Rating' },
-                { key: 'x_coordinate', label: 'X Coordinate' },
-                { key: 'y_coordinate', label: 'Y Coordinate' },
-                { key: 'website_url', label: 'website' },
-                { key: 'instagram', label: 'Instagram' },
-                { key: 'facebook', label: 'Facebook' },
-            ];
-
-            const headerRow = document.createElement('tr');
-            columns.forEach(column => {
-                const th = document.createElement('th');
-                th.className = 'py-2 px-4 border';
-                th.textContent = column.label;
-                headerRow.appendChild(th);
+        });
+    }
+
+    function showVenues(venues) {
+        tbody.innerHTML = '';
+        if (venues.length === 0) {
+            tableContainer.innerHTML = '<p class="text-gray-500">No venues found.</p>';
+            return;
+        }
+        tableContainer.replaceChildren(table);
+        appendRows(venues);
+    }
+
+    function loadPage(after, current) {
+        const params = new URLSearchParams({ limit: PAGE_SIZE, fields: fields });
+        if (after) params.set('after', after);
+        return fetchJson(`${API_URL}?${params}`)
+            .then(page => {
+                if (current !== generation) return;
+                if (!after) {
+                    showVenues(page.venues);
+                } else {
+                    appendRows(page.venues);
+                }
+                if (page.next_after) return loadPage(page.next_after, current);
             });
-            thead.appendChild(headerRow);
-            table.appendChild(thead);
-
-            // Rows
-            data.forEach(venue => {
-                const row = document.createElement('tr');
-                row.className = 'border-b';
-                columns.forEach(column => {
-                    const td = document.createElement('td');
-                    td.className = 'py-2 px-4 border';
-                    let value = venue[column.key];
-
-                    // Format date columns
-                    if (column.key === 'upcoming_event_date' && value) {
-                        const date = new Date(value);
-                        value = !isNaN(date) ? date.toLocaleString() : 'Invalid Date';
-                    }
-                    // Handle boolean flags (if any)
-                    else if (typeof value === 'boolean') {
-                        value = value ? 'Yes' : 'No';
-                    }
-
-                    td.textContent = value !== null && value !== undefined ? value : 'N/A';
-                    row.appendChild(td);
-                });
-                tbody.appendChild(row);
+    }
+
+    function loadSnapshot(current) {
+        // Served as a plain file, so the gzip is undone here rather than by the browser
+        if (typeof DecompressionStream === 'undefined') {
+            return Promise.reject(new Error('DecompressionStream is not supported'));
+        }
+        return fetch(SNAPSHOT_URL, { cache: 'no-cache' })
+            .then(response => {
+                if (!response.ok) throw new Error(`Snapshot unavailable: ${response.status}`);
+                return new Response(response.body.pipeThrough(new DecompressionStream('gzip'))).json();
+            })
+            .then(snapshot => {
+                if (current !== generation) return;
+                const venues = snapshot.rows.map(row =>
+                    Object.fromEntries(snapshot.columns.map((column, index) => [column, row[index]])));
+                showVenues(venues);
             });
-            table.appendChild(tbody);
-            tableContainer.appendChild(table);
-        })
-        .catch(error => {
-            console.error('Error:', error);
-            tableContainer.innerHTML = '<p class="text-red-500">Error: Check backend at http://127.0.0.1:5000. Details: ' + error.message + '</p>';
+    }
+
+    function loadAll(current) {
+        return loadSnapshot(current).catch(error => {
+            console.warn('Loading venues from the API instead of the snapshot:', error.message);
+            return loadPage(null, current);
         });
-});
\ No newline at end of file
+    }
+
+    function search(query) {
+        // Server-side full-text search, best matches first
+        const current = ++generation;
+        const params = new URLSearchParams({ q: query, type: 'venues', limit: SEARCH_LIMIT, fields: fields });
+        return fetchJson(`${SEARCH_URL}?${params}`)
+            .then(results => {
+                if (current === generation) showVenues(results.venues);
+            });
+    }
+
+    function showError(error) {
+        console.error('Error:', error);
+        tableContainer.innerHTML = '<p class="text-red-500">Error: Check backend at http://127.0.0.1:5000. Details: ' + error.message + '</p>';
+    }
+
+    let searchTimer = null;
+    searchInput.addEventListener('input', () => {
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(() => {
+            const query = searchInput.value.trim();
+            const loading = query ? search(query) : loadAll(++generation);
+            loading.catch(showError);
+        }, SEARCH_DELAY_MS);
+    });
+
+    loadAll(generation).catch(showError);
+});
@@ -1,21 +1,342 @@
-from flask import Flask, jsonify
-from flask_cors import CORS
+import sys
+import hashlib
+import json
 import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from flask import Flask, Response, jsonify, g, request
+from flask_cors import CORS
+from src.utils.db_utils import ConnectionPool, get_change_counter, VENUE_COLUMNS
+from src.utils.geo_utils import find_nearby_venues
+from src.utils.search_utils import search_venues, search_events
+from src.utils.export_utils import iter_rows, ndjson_chunks, compact_json_chunks
+from src.utils.metrics_utils import count, metrics_enabled, observe, render_metrics
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=['ETag'])
+
+reader_pool = ConnectionPool('data/venues.db', size=8)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+DEFAULT_NEARBY_RADIUS_MILES = 2
+MAX_NEARBY_RADIUS_MILES = 100
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+SEARCH_TYPES = ('all', 'venues', 'events')
+EXPORT_FORMATS = {'ndjson': 'application/x-ndjson', 'compact': 'application/json'}
+
+class BadRequest(ValueError):
+    pass
+
+class ResponseCache:
+    """
+    Small LRU of serialized responses keyed by (change counter, normalized query).
+
+    Entries from before the last database change can never be hit again and
+    age out of the LRU.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+response_cache = ResponseCache()
 
 def get_db_connection():
-    conn = sqlite3.connect('data/venues.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+    # One pooled read-only connection per request, returned in close_db_connection
+    if 'db' not in g:
+        g.db = reader_pool.acquire()
+    return g.db
+
+@app.before_request
+def start_request_timer():
+    if metrics_enabled():
+        g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        endpoint = request.endpoint or 'unmatched'
+        observe('api_request_seconds', time.perf_counter() - start, endpoint=endpoint)
+        count('api_requests_total', endpoint=endpoint, status=response.status_code)
+    return response
+
+@app.teardown_appcontext
+def close_db_connection(exception):
+    conn = g.pop('db', None)
+    if conn is not None:
+        reader_pool.release(conn)
+
+@app.errorhandler(BadRequest)
+def handle_bad_request(error):
+    return jsonify({'error': str(error)}), 400
+
+def parse_int(name, default, minimum=None, maximum=None):
+    value = request.args.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer")
+    if minimum is not None and value < minimum:
+        raise BadRequest(f"{name} must be at least {minimum}")
+    return min(value, maximum) if maximum is not None else value
+
+def parse_fields():
+    fields = request.args.get('fields')
+    if not fields:
+        return list(VENUE_COLUMNS)
+    fields = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in VENUE_COLUMNS]
+    if unknown:
+        raise BadRequest(f"Unknown fields: {', '.join(unknown)}")
+    # The id is always returned so clients can page with it
+    return ['id'] + [field for field in dict.fromkeys(fields) if field != 'id']
+
+def parse_bbox():
+    bbox = request.args.get('bbox')
+    if not bbox:
+        return None
+    try:
+        min_lat, min_lng, max_lat, max_lng = (float(part) for part in bbox.split(','))
+    except ValueError:
+        raise BadRequest("bbox must be min_lat,min_lng,max_lat,max_lng")
+    return min_lat, min_lng, max_lat, max_lng
+
+def venue_filters():
+    """
+    Build the WHERE clauses and parameters for the /api/venues filters.
+    """
+    clauses = []
+    params = []
+    for column in ('category', 'size'):
+        values = [value for value in request.args.get(column, '').split(',') if value]
+        if values:
+            clauses.append(f"{column} IN ({', '.join('?' for _ in values)})")
+            params.extend(values)
+    flag = request.args.get('non_venue_flag')
+    if flag:
+        if flag.lower() not in ('0', '1', 'true', 'false'):
+            raise BadRequest("non_venue_flag must be true or false")
+        clauses.append("non_venue_flag = ?")
+        params.append(flag.lower() in ('1', 'true'))
+    bbox = parse_bbox()
+    if bbox:
+        min_lat, min_lng, max_lat, max_lng = bbox
+        clauses.append("x_coordinate BETWEEN ? AND ? AND y_coordinate BETWEEN ? AND ?")
+        params.extend([min_lat, max_lat, min_lng, max_lng])
+    event_from = request.args.get('event_from')
+    event_to = request.args.get('event_to')
+    if event_from or event_to:
+        # Served by the events (venue_id, date, ...) unique index
+        event_clauses = ["e.venue_id = venues.id"]
+        if event_from:
+            event_clauses.append("e.date >= ?")
+            params.append(event_from)
+        if event_to:
+            event_clauses.append("e.date <= ?")
+            params.append(event_to)
+        clauses.append(f"EXISTS (SELECT 1 FROM events e WHERE {' AND '.join(event_clauses)})")
+    return clauses, params
+
+def request_cache_key(counter):
+    """
+    Key a response by path, change counter and normalized query. Returns (key, ETag).
+    """
+    query = '&'.join(f"{key}={value}" for key, value in sorted(request.args.items(multi=True)))
+    cache_key = (request.path, counter, query)
+    return cache_key, hashlib.sha1(repr(cache_key).encode('utf-8')).hexdigest()
+
+def cached_json_response(conn, build_body):
+    """
+    Serve a JSON body with an ETag derived from the database change counter.
+
+    Answers 304 when the client's copy is current, and reuses the serialized body
+    for repeated queries until the data changes.
+    """
+    counter = get_change_counter(conn)
+    if counter is None:
+        return Response(json.dumps(build_body()), mimetype='application/json')
+    cache_key, etag = request_cache_key(counter)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        body = response_cache.get(cache_key)
+        count('api_response_cache_lookups_total', result='miss' if body is None else 'hit')
+        if body is None:
+            body = json.dumps(build_body())
+            response_cache.put(cache_key, body)
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @app.route('/api/venues')
 def get_venues():
+    """
+    List venues one keyset page at a time.
+
+    Query parameters: limit, after (last id of the previous page), fields
+    (comma-separated columns), category and size (comma-separated values),
+    non_venue_flag, bbox (min_lat,min_lng,max_lat,max_lng), event_from and
+    event_to (venues with an event in that date range).
+    """
+    limit = parse_int('limit', DEFAULT_PAGE_SIZE, minimum=1, maximum=MAX_PAGE_SIZE)
+    after = parse_int('after', 0)
+    fields = parse_fields()
+    clauses, params = venue_filters()
+    clauses.insert(0, "id > ?")
+    params.insert(0, after)
     conn = get_db_connection()
-    venues = conn.execute('SELECT * FROM venues').fetchall()
-    conn.close()
-    return jsonify([dict(ix) for ix in venues])
+
+    def build_body():
+        rows = conn.execute(
+            f"SELECT {', '.join(fields)} FROM venues WHERE {' AND '.join(clauses)} ORDER BY id LIMIT ?",
+            params + [limit + 1]
+        ).fetchall()
+        has_more = len(rows) > limit
+        venues = [dict(row) for row in rows[:limit]]
+        return {'venues': venues, 'next_after': venues[-1]['id'] if has_more else None}
+
+    return cached_json_response(conn, build_body)
+
+def stream_venues(query, params, fields, export_format):
+    # The request's connection goes back to the pool before the body is sent, so the stream holds its own
+    with reader_pool.connection() as conn:
+        rows = iter_rows(conn, query, params)
+        yield from ndjson_chunks(rows, fields) if export_format == 'ndjson' else compact_json_chunks(rows, fields)
+
+@app.route('/api/venues/export')
+def export_venues():
+    """
+    Stream every venue matching the /api/venues filters, read with a single cursor.
+
+    Query parameters: format (ndjson, one venue object per line, or compact, one
+    JSON object listing the columns once and each venue as an array), fields,
+    and the /api/venues filters. Rows are sent as they are read, so memory use
+    doesn't grow with the table.
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        raise BadRequest(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    fields = parse_fields()
+    clauses, params = venue_filters()
+    conn = get_db_connection()
+    counter = get_change_counter(conn)
+    etag = request_cache_key(counter)[1] if counter is not None else None
+    if etag is not None and request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+        query = f"SELECT {', '.join(fields)} FROM venues{where} ORDER BY id"
+        response = Response(stream_venues(query, params, fields, export_format), mimetype=EXPORT_FORMATS[export_format])
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def parse_float(name, required=False, minimum=None, maximum=None):
+    value = request.args.get(name)
+    if value is None or value == '':
+        if required:
+            raise BadRequest(f"{name} is required")
+        return None
+    try:
+        value = float(value)
+    except ValueError:
+        raise BadRequest(f"{name} must be a number")
+    if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+        raise BadRequest(f"{name} must be between {minimum} and {maximum}")
+    return value
+
+@app.route('/api/venues/nearby')
+def get_nearby_venues():
+    """
+    List venues within radius miles of lat/lng, nearest first.
+
+    Query parameters: lat, lng, radius (miles, default 2), limit, fields.
+    """
+    latitude = parse_float('lat', required=True, minimum=-90, maximum=90)
+    longitude = parse_float('lng', required=True, minimum=-180, maximum=180)
+    radius = parse_float('radius', minimum=0, maximum=MAX_NEARBY_RADIUS_MILES)
+    radius = DEFAULT_NEARBY_RADIUS_MILES if radius is None else radius
+    limit = parse_int('limit', DEFAULT_PAGE_SIZE, minimum=1, maximum=MAX_PAGE_SIZE)
+    fields = parse_fields()
+    conn = get_db_connection()
+
+    def build_body():
+        venues = find_nearby_venues(conn, latitude, longitude, radius, limit, fields)
+        return {'venues': venues, 'count': len(venues)}
+
+    return cached_json_response(conn, build_body)
+
+@app.route('/api/search')
+def search():
+    """
+    Full-text search over venues and events, best match first (BM25).
+
+    Query parameters: q (words, each matched as a prefix), type (all, venues
+    or events), limit, offset, fields (venue columns). Each result carries a
+    snippet with matches wrapped in <mark> tags, and a score.
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        raise BadRequest("q is required")
+    search_type = request.args.get('type', 'all')
+    if search_type not in SEARCH_TYPES:
+        raise BadRequest(f"type must be one of {', '.join(SEARCH_TYPES)}")
+    limit = parse_int('limit', DEFAULT_SEARCH_LIMIT, minimum=1, maximum=MAX_SEARCH_LIMIT)
+    offset = parse_int('offset', 0, minimum=0)
+    fields = parse_fields() if request.args.get('fields') else ['id', 'name', 'category', 'address']
+    conn = get_db_connection()
+
+    def build_body():
+        body = {'query': query}
+        try:
+            if search_type in ('all', 'venues'):
+                body['venues'] = search_venues(conn, query, limit, offset, fields)
+            if search_type in ('all', 'events'):
+                body['events'] = search_events(conn, query, limit, offset)
+        except ValueError as e:
+            raise BadRequest(str(e))
+        return body
+
+    try:
+        return cached_json_response(conn, build_body)
+    except sqlite3.OperationalError as e:
+        app.logger.error(f"Search failed: {e}")
+        return jsonify({'error': 'Search index unavailable'}), 503
+
+@app.route('/metrics')
+def get_metrics():
+    """
+    Request and cache metrics in the Prometheus text format. Enabled with METRICS_ENABLED=1.
+    """
+    if not metrics_enabled():
+        return jsonify({'error': 'Metrics are disabled; set METRICS_ENABLED=1'}), 404
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1,60 @@
+# src/backup_db.py
+import sys
+import logging
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import click
+from src.utils.db_utils import DEFAULT_DB_PATH
+from src.utils.backup_utils import create_backup, prune_backups, DEFAULT_STEP_PAGES, DEFAULT_STEP_PAUSE
+from src.utils.metrics_utils import annotate, traced_run
+
+# Setup logging
+Path('data/logs').mkdir(parents=True, exist_ok=True)
+logging.basicConfig(filename='data/logs/backup.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def megabytes(size):
+    return f"{size / (1024 * 1024):.1f} MB"
+
+@click.command()
+@click.option('--db', 'db_path', default=DEFAULT_DB_PATH, help='Database to back up')
+@click.option('--backup-dir', default='data/backups', help='Directory for the backups')
+@click.option('--step-pages', default=DEFAULT_STEP_PAGES, type=int, help='Pages copied per backup step')
+@click.option('--step-pause', default=DEFAULT_STEP_PAUSE, type=float, help='Seconds to pause between backup steps')
+@click.option('--keep', default=7, type=int, help='Number of backups kept')
+@click.option('--max-total-mb', default=None, type=float, help='Also delete the oldest backups while they take more than this')
+@click.option('--no-compress', is_flag=True, help='Keep the snapshot as a plain .db file')
+@click.option('--no-verify', is_flag=True, help='Skip PRAGMA integrity_check on the snapshot')
+@traced_run('backup')
+def main(db_path, backup_dir, step_pages, step_pause, keep, max_total_mb, no_compress, no_verify):
+    """
+    Take a consistent snapshot of the live database while the agents and API keep running.
+    """
+    try:
+        report = create_backup(db_path, backup_dir, step_pages, step_pause, not no_compress, not no_verify)
+    except Exception as e:
+        logging.error(f"Backup of {db_path} failed: {e}")
+        print(f"Backup failed: {e}")
+        annotate(error=str(e))
+        sys.exit(1)
+
+    snapshot = report['snapshot']
+    print(f"Snapshot: {megabytes(snapshot['bytes'])} in {snapshot['seconds']}s ({snapshot['steps']} steps)")
+    if 'verify' in report:
+        print(f"Integrity check: ok in {report['verify']['seconds']}s")
+    if 'compress' in report:
+        compressed = report['compress']
+        ratio = compressed['bytes'] / snapshot['bytes'] if snapshot['bytes'] else 0
+        print(f"Compressed: {megabytes(compressed['bytes'])} ({ratio:.0%}) in {compressed['seconds']}s")
+    print(f"Backup created: {report['path']} in {report['seconds']}s")
+    logging.info(f"Backup created: {report}")
+
+    max_total_bytes = max_total_mb * 1024 * 1024 if max_total_mb is not None else None
+    removed = prune_backups(backup_dir, keep, max_total_bytes)
+    if removed:
+        print(f"Removed {len(removed)} old backups.")
+        logging.info(f"Removed old backups: {', '.join(path.name for path in removed)}")
+    annotate(**report, removed=len(removed))
+
+if __name__ == '__main__':
+    main()
@@ -6,13 +6,19 @@ from pathlib import Path
 # Add project root to sys.path
 sys.path.append(str(Path(__file__).parent.parent))
 
+import asyncio
 import click
 import logging
-import requests
-from src.utils.db_utils import connect_db, execute_query, close_db
-from src.utils.scraping_utils import scrape_website, scrape_dynamic_website
-from src.utils.llm_utils import extract_event_data
+from src.utils.db_utils import connect_db, execute_query, close_db, writer_connection, load_fetch_states, write_fetch_states, write_events
+from src.utils.scraping_utils import scrape_websites, render_dynamic_page, BrowserPool
+from src.utils.llm_utils import extract_event_data_batch
+from src.utils.cache_utils import get_llm_cache
 from src.utils.validation_utils import deduplicate_events
+from src.utils.concurrency_utils import BoundedRunner, host_of
+from src.utils.fetch_utils import FetchTracker
+from src.utils.http_utils import get_client, http_stats
+from src.utils.export_utils import refresh_static_snapshot
+from src.utils.metrics_utils import annotate, count, traced_run
 from dotenv import load_dotenv
 
 # Setup logging
@@ -23,21 +29,56 @@ load_dotenv()
 TICKETMASTER_API_KEY = os.getenv('TICKETMASTER_CONSUMER_KEY')
 EVENTBRITE_API_KEY = os.getenv('EVENTBRITE_API_KEY')
 
-def get_api_events(venue_name):
+TICKETMASTER_HOST = 'app.ticketmaster.com'
+EVENTBRITE_HOST = 'www.eventbriteapi.com'
+TICKETMASTER_URL = f"https://{TICKETMASTER_HOST}/discovery/v2/events.json"
+EVENTBRITE_URL = f"https://{EVENTBRITE_HOST}/v3/events/search/"
+# Rendered pages per extraction, and how many extractions may run while more pages render
+EXTRACTION_CHUNK_PAGES = 40
+EXTRACTION_CHUNKS_IN_FLIGHT = 2
+
+def fetch_source(provider, key, url, params, tracker=None):
     """
-    Fetch events from Ticketmaster and Eventbrite APIs for a given venue.
+    GET a source through the provider's shared client, conditionally when a fetch tracker is given.
+    
+    Args:
+        provider (str): Provider name in http_utils.PROVIDERS.
+        key (str): Source key used in the fetch_state table.
+        url (str): URL without secrets.
+        params (dict): Query parameters, including API keys.
+        tracker (FetchTracker): Optional tracker holding the previous run's fetch state.
+    
+    Returns:
+        requests.Response or None: The response, or None if the source is unchanged.
+    """
+    client = get_client(provider)
+    if tracker is None:
+        return client.get(url, params=params)
+    return tracker.conditional_get(key, url, params, client=client)
+
+def get_ticketmaster_events(venue_name, tracker=None, raise_errors=False):
+    """
+    Fetch events from the Ticketmaster Discovery API for a given venue.
     
     Args:
         venue_name (str): Venue name.
+        tracker (FetchTracker): Optional tracker used to skip unchanged results.
+        raise_errors (bool): Re-raise request and parsing errors instead of returning no events.
     
     Returns:
         list: List of events (name, date, url, venue).
     """
+    key = f"ticketmaster:{venue_name}"
     try:
         events = []
-        # Ticketmaster API
-        url = f"https://app.ticketmaster.com/discovery/v2/events.json?apikey={TICKETMASTER_API_KEY}&keyword={venue_name}&city=Detroit"
-        response = requests.get(url).json()
+        params = {'apikey': TICKETMASTER_API_KEY, 'keyword': venue_name, 'city': 'Detroit'}
+        response = fetch_source('ticketmaster', key, TICKETMASTER_URL, params, tracker)
+        if response is None:
+            logging.info(f"Ticketmaster results unchanged for {venue_name}, skipping")
+            count('source_fetches_total', source='ticketmaster', status='unchanged')
+            return []
+        response.raise_for_status()
+        response = response.json()
         for event in response.get('_embedded', {}).get('events', []):
             events.append({
                 'name': event['name'],
@@ -45,9 +86,42 @@ def get_api_events(venue_name):
                 'url': event['url'],
                 'venue': venue_name
             })
-        # Eventbrite API
-        url = f"https://www.eventbriteapi.com/v3/events/search/?q={venue_name}&location.address=Detroit&token={EVENTBRITE_API_KEY}"
-        response = requests.get(url).json()
+        logging.info(f"Fetched {len(events)} events for {venue_name} from Ticketmaster")
+        count('source_fetches_total', source='ticketmaster', status='ok')
+        count('source_events_total', len(events), source='ticketmaster')
+        return events
+    except Exception as e:
+        logging.error(f"Ticketmaster API error for {venue_name}: {e}")
+        count('source_fetches_total', source='ticketmaster', status='error')
+        if tracker is not None:
+            tracker.discard(key)
+        if raise_errors:
+            raise
+        return []
+
+def get_eventbrite_events(venue_name, tracker=None, raise_errors=False):
+    """
+    Fetch events from the Eventbrite API for a given venue.
+    
+    Args:
+        venue_name (str): Venue name.
+        tracker (FetchTracker): Optional tracker used to skip unchanged results.
+        raise_errors (bool): Re-raise request and parsing errors instead of returning no events.
+    
+    Returns:
+        list: List of events (name, date, url, venue).
+    """
+    key = f"eventbrite:{venue_name}"
+    try:
+        events = []
+        params = {'q': venue_name, 'location.address': 'Detroit', 'token': EVENTBRITE_API_KEY}
+        response = fetch_source('eventbrite', key, EVENTBRITE_URL, params, tracker)
+        if response is None:
+            logging.info(f"Eventbrite results unchanged for {venue_name}, skipping")
+            count('source_fetches_total', source='eventbrite', status='unchanged')
+            return []
+        response.raise_for_status()
+        response = response.json()
         for event in response.get('events', []):
             events.append({
                 'name': event['name']['text'],
@@ -55,12 +129,31 @@ def get_api_events(venue_name):
                 'url': event['url'],
                 'venue': venue_name
             })
-        logging.info(f"Fetched {len(events)} events for {venue_name} from APIs")
+        logging.info(f"Fetched {len(events)} events for {venue_name} from Eventbrite")
+        count('source_fetches_total', source='eventbrite', status='ok')
+        count('source_events_total', len(events), source='eventbrite')
         return events
     except Exception as e:
-        logging.error(f"API error for {venue_name}: {e}")
+        logging.error(f"Eventbrite API error for {venue_name}: {e}")
+        count('source_fetches_total', source='eventbrite', status='error')
+        if tracker is not None:
+            tracker.discard(key)
+        if raise_errors:
+            raise
         return []
 
+def get_api_events(venue_name):
+    """
+    Fetch events from Ticketmaster and Eventbrite APIs for a given venue.
+    
+    Args:
+        venue_name (str): Venue name.
+    
+    Returns:
+        list: List of events (name, date, url, venue).
+    """
+    return get_ticketmaster_events(venue_name) + get_eventbrite_events(venue_name)
+
 def get_local_events():
     """
     Scrape non-venue events from local sources (e.g., Visit Detroit).
@@ -77,48 +170,235 @@ def get_local_events():
         logging.error(f"Local events scraping error: {e}")
         return []
 
+def venue_page_url(venue):
+    """
+    Return the page rendered for a venue's dynamic events (website, Instagram or Facebook).
+    """
+    return venue['website_url'] or venue['instagram'] or venue['facebook']
+
+def check_page(tracker, url, key=None):
+    """
+    Conditionally fetch a venue page and report whether it is unchanged since the last run.
+    
+    The page's fetch state is stored under key, 'page:<url>' by default.
+    """
+    try:
+        unchanged = tracker.conditional_get(key or f"page:{url}", url, client=get_client('web')) is None
+        count('source_fetches_total', source='page_check', status='unchanged' if unchanged else 'ok')
+        return unchanged
+    except Exception as e:
+        # Let the scrapers try the page and report their own errors
+        logging.error(f"Page check error for {url}: {e}")
+        count('source_fetches_total', source='page_check', status='error')
+        return False
+
+async def find_unchanged_pages_async(venues, tracker, concurrency, host_interval):
+    """
+    Check every venue page concurrently against its stored ETag, Last-Modified and body hash.
+    
+    Returns:
+        set: URLs of pages unchanged since the last run.
+    """
+    urls = list(dict.fromkeys(url for venue in venues if not venue['non_venue_flag']
+                              for url in (venue['website_url'], venue_page_url(venue)) if url))
+    runner = BoundedRunner(concurrency, host_interval)
+    try:
+        unchanged = await asyncio.gather(*(runner.run(host_of(url), check_page, tracker, url) for url in urls))
+    finally:
+        runner.close()
+    return {url for url, skip in zip(urls, unchanged) if skip}
+
+def get_website_events(venues, unchanged_pages=(), tracker=None):
+    """
+    Crawl every venue website in a single Scrapy run.
+    
+    Args:
+        venues (list): Venue rows with name, website_url and non_venue_flag.
+        unchanged_pages (set): Website URLs to skip because they haven't changed.
+        tracker (FetchTracker): Optional tracker whose page state is discarded for sites that failed to crawl.
+    
+    Returns:
+        dict: Events (name, date, url, venue) keyed by venue name.
+    """
+    sites = {venue['name']: venue['website_url'] for venue in venues
+             if not venue['non_venue_flag'] and venue['website_url'] and venue['website_url'] not in unchanged_pages}
+    events_by_url = scrape_websites(sites.values())
+    count('source_events_total', sum(len(events) for events in events_by_url.values()), source='website')
+    website_events = {}
+    for venue_name, url in sites.items():
+        if url not in events_by_url and tracker:
+            # The page check already saved this site's new hash; crawl it again next run
+            tracker.discard(f"page:{url}")
+        # Copy the events since several venues may share one website
+        website_events[venue_name] = [dict(event, venue=venue_name) for event in events_by_url.get(url, [])]
+    return website_events
+
+def get_dynamic_page(url, pool, tracker=None):
+    """
+    Render a venue page (website, Instagram or Facebook) for batched event extraction.
+    
+    Args:
+        url (str): Page URL.
+        pool (BrowserPool): Shared headless browsers used to render the page.
+        tracker (FetchTracker): Optional tracker whose page state is discarded if rendering fails.
+    
+    Returns:
+        list: A single (html, url) tuple, or nothing if the page failed to render.
+    """
+    content = render_dynamic_page(url, pool)
+    count('source_fetches_total', source='dynamic', status='error' if content is None else 'ok')
+    if content is None:
+        if tracker:
+            tracker.discard(f"page:{url}")
+        return []
+    return [(content, url)]
+
+def venue_sources(venue, pool, tracker=None, unchanged_pages=()):
+    """
+    List the per-source fetches for a venue that can run independently.
+    
+    Args:
+        venue (dict): Venue row with name, website_url, instagram, facebook, non_venue_flag.
+        pool (BrowserPool): Shared headless browsers for dynamic pages.
+        tracker (FetchTracker): Optional tracker used to skip unchanged API results.
+        unchanged_pages (set): Page URLs to skip because they haven't changed.
+    
+    Returns:
+        list: (host, function, args) tuples, in the order their events are collected.
+    """
+    # Skip non-venue locations for API/website scraping
+    if venue['non_venue_flag']:
+        return []
+    venue_name = venue['name']
+    sources = [
+        (TICKETMASTER_HOST, get_ticketmaster_events, (venue_name, tracker)),
+        (EVENTBRITE_HOST, get_eventbrite_events, (venue_name, tracker)),
+    ]
+    # Dynamic website/X posts with Gemini
+    page_url = venue_page_url(venue)
+    if page_url and page_url not in unchanged_pages:
+        sources.append((host_of(page_url), get_dynamic_page, (page_url, pool, tracker)))
+    return sources
+
+async def collect_events_async(venues, website_events, pool, concurrency, host_interval, tracker=None, unchanged_pages=(),
+                               chunk_pages=EXTRACTION_CHUNK_PAGES):
+    """
+    Fan out per-venue, per-source fetches across a bounded pool of workers.
+    
+    Rendered dynamic pages are extracted with batched Gemini requests in chunks
+    of chunk_pages as they arrive, so only a few chunks of HTML are held at once.
+    
+    Args:
+        venues (list): Venue rows.
+        website_events (dict): Scrapy events already collected, keyed by venue name.
+        pool (BrowserPool): Shared headless browsers for dynamic pages.
+        concurrency (int): Maximum number of fetches (and batched Gemini requests) in flight.
+        host_interval (float): Minimum seconds between two requests to the same host.
+        tracker (FetchTracker): Optional tracker used to skip unchanged API results.
+        unchanged_pages (set): Page URLs to skip because they haven't changed.
+        chunk_pages (int): Rendered pages handed to each extraction.
+    
+    Returns:
+        list: One list of events per venue, in the same order as venues.
+    """
+    runner = BoundedRunner(concurrency, host_interval)
+    # Rendered pages waiting for extraction, as ((venue index, url), (html, url))
+    pending_pages = []
+    page_events = {}
+    extractions = []
+    # Venues finishing while every slot is busy wait, rather than piling up more HTML
+    extraction_slots = asyncio.Semaphore(EXTRACTION_CHUNKS_IN_FLIGHT)
+
+    async def extract(chunk):
+        try:
+            results = await asyncio.to_thread(extract_event_data_batch, [page for key, page in chunk], concurrency)
+            page_events.update(zip((key for key, page in chunk), results))
+        finally:
+            extraction_slots.release()
+
+    async def flush():
+        chunk = pending_pages[:]
+        pending_pages.clear()
+        await extraction_slots.acquire()
+        extractions.append(asyncio.create_task(extract(chunk)))
+
+    async def collect_venue(index, venue):
+        sources = venue_sources(venue, pool, tracker, unchanged_pages)
+        results = await asyncio.gather(*(runner.run(host, func, *args) for host, func, args in sources))
+        # Keep only the URLs of rendered pages; their HTML goes to the next chunk
+        page_urls = [[url for content, url in result] for result in results[2:]]
+        pending_pages.extend(((index, url), (content, url)) for result in results[2:] for content, url in result)
+        if len(pending_pages) >= chunk_pages:
+            await flush()
+        return results[:2] + page_urls
+
+    try:
+        per_venue_results = await asyncio.gather(*(collect_venue(index, venue) for index, venue in enumerate(venues)))
+        if pending_pages:
+            await flush()
+        await asyncio.gather(*extractions)
+    finally:
+        runner.close()
+    
+    per_venue_events = []
+    for index, (venue, results) in enumerate(zip(venues, per_venue_results)):
+        events = []
+        if results:
+            # Keep the sequential order: API events, website events, dynamic events
+            for result in results[:2]:
+                events.extend(result)
+            events.extend(website_events.get(venue['name'], []))
+            for urls in results[2:]:
+                for url in urls:
+                    extracted = page_events[(index, url)]
+                    if extracted is None:
+                        count('source_fetches_total', source='dynamic', status='extraction_error')
+                        # Fetch the page again next run instead of treating it as processed
+                        if tracker is not None:
+                            tracker.discard(f"page:{url}")
+                        continue
+                    count('source_events_total', len(extracted), source='dynamic')
+                    events.extend(dict(event, venue=venue['name']) for event in extracted)
+        per_venue_events.append(events)
+    return per_venue_events
+
 @click.command()
-def scrape_events():
+@click.option('--concurrency', default=1, type=int, help='Number of venue sources fetched in parallel')
+@click.option('--host-interval', default=1.0, type=float, help='Minimum seconds between requests to the same host')
+@click.option('--browsers', default=1, type=int, help='Number of headless browsers rendering dynamic pages')
+@click.option('--browser-max-pages', default=50, type=int, help='Page loads before a browser is restarted')
+@click.option('--page-load-timeout', default=30, type=int, help='Seconds before a dynamic page load is abandoned')
+@click.option('--force', is_flag=True, help='Refetch and reprocess every source, even if unchanged')
+@traced_run('event_scraper')
+def scrape_events(concurrency, host_interval, browsers, browser_max_pages, page_load_timeout, force):
     """
     Scrape events daily and update the database.
     """
     try:
-        logging.info("Starting event scraping")
+        logging.info(f"Starting event scraping with concurrency {concurrency}")
         conn = connect_db()
         
         # Get all venues
-        venues = execute_query(conn, "SELECT name, website_url, instagram, facebook, non_venue_flag FROM venues")
+        venues = execute_query(conn, "SELECT id, name, website_url, instagram, facebook, non_venue_flag FROM venues")
         if not venues:
             logging.warning("No venues found in database")
             print("Error: No venues found in database.")
             close_db(conn)
             return
         
-        all_events = []
-        for venue in venues:
-            venue_name = venue['name']
-            events = []
-            
-            # Skip non-venue locations for API/website scraping
-            if not venue['non_venue_flag']:
-                # API events
-                events.extend(get_api_events(venue_name))
-                
-                # Website events
-                if venue['website_url']:
-                    website_events = scrape_website(venue['website_url'])
-                    for event in website_events:
-                        event['venue'] = venue_name
-                    events.extend(website_events)
-                
-                # Dynamic website/X posts with Gemini
-                if venue['website_url'] or venue['instagram'] or venue['facebook']:
-                    dynamic_events = scrape_dynamic_website(venue['website_url'] or venue['instagram'] or venue['facebook'], extract_event_data)
-                    for event in dynamic_events:
-                        event['venue'] = venue_name
-                    events.extend(dynamic_events)
-            
-            all_events.extend(events)
+        # Skip pages whose ETag, Last-Modified or body hash hasn't changed since the last run
+        tracker = FetchTracker(load_fetch_states(conn), force=force)
+        close_db(conn)
+        unchanged_pages = asyncio.run(find_unchanged_pages_async(venues, tracker, max(concurrency, 1), host_interval))
+        
+        # Website events: one Scrapy run on the main thread for every venue site
+        website_events = get_website_events(venues, unchanged_pages, tracker)
+        
+        with BrowserPool(max(browsers, 1), browser_max_pages, page_load_timeout) as pool:
+            per_venue_events = asyncio.run(collect_events_async(
+                venues, website_events, pool, max(concurrency, 1), host_interval, tracker, unchanged_pages
+            ))
+        all_events = [event for events in per_venue_events for event in events]
         
         # Non-venue events
         all_events.extend(get_local_events())
@@ -127,20 +407,30 @@ def scrape_events():
         all_events = deduplicate_events(all_events)
         
         # Update database
+        venue_ids = {venue['name']: venue['id'] for venue in venues}
+        events_to_store = []
         for event in all_events:
-            query = """
-                UPDATE venues
-                SET upcoming_event_name = ?, upcoming_event_date = ?, upcoming_event_page_url = ?, last_updated = CURRENT_TIMESTAMP
-                WHERE name = ?
-            """
-            params = (event['name'], event['date'], event['url'], event['venue'])
-            execute_query(conn, query, params)
-            logging.info(f"Updated event for {event['venue']}: {event['name']}")
-        
-        conn.commit()
-        close_db(conn)
-        print(f"Successfully updated {len(all_events)} events in the database.")
-        logging.info(f"Completed event scraping: {len(all_events)} events")
+            event['venue_id'] = venue_ids.get(event.get('venue'))
+            if event['venue_id'] is None or not event.get('name') or not event.get('date'):
+                logging.warning(f"Skipping event without a known venue, name or date: {event}")
+                continue
+            events_to_store.append(event)
+        # Events and the fetch states that let the next run skip their sources commit together
+        with writer_connection() as conn:
+            stored_count = write_events(conn, events_to_store)
+            write_fetch_states(conn, tracker.states)
+        # Venue rows now point at their next events; give static readers the new data
+        snapshot = refresh_static_snapshot()
+        print(f"Successfully updated {stored_count} events in the database.")
+        print(f"Skipped {tracker.skipped} of {tracker.checked} sources unchanged since the last run.")
+        logging.info(f"Completed event scraping: {stored_count} events, fetch stats {tracker.stats()}")
+        llm_cache = get_llm_cache()
+        if llm_cache is not None:
+            logging.info(f"LLM cache stats: {llm_cache.stats()}")
+        logging.info(f"HTTP stats: {http_stats()}")
+        count('events_stored_total', stored_count)
+        annotate(events=stored_count, fetch=tracker.stats(), http=http_stats(),
+                 llm_cache=llm_cache.stats() if llm_cache is not None else None, snapshot=snapshot)
     
     except Exception as e:
         logging.error(f"Error in scrape_events: {e}")
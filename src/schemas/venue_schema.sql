@@ -3,6 +3,7 @@
 -- Create the venues table
 CREATE TABLE venues (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
+    place_id TEXT,
     name VARCHAR(255) NOT NULL,
     x_coordinate FLOAT NOT NULL,
     y_coordinate FLOAT NOT NULL,
@@ -37,3 +38,8 @@ VALUES
 ('Hart Plaza Festivals', 42.3286, -83.0459, '1 Hart Plaza, Detroit, MI', 
 'Large', 'Festival Space', 'Outdoor space for festivals like Movement', 
 '@hartplazadetroit', 'facebook.com/hartplazadetroit', NULL, TRUE);
+
+-- The events, fetch state, indexes, change counter, spatial and full-text
+-- search indexes and the scrape job queue are defined once, in ensure_schema()
+-- (src/utils/db_utils.py). The agents run it on every write connection, so it
+-- also brings a database created from this file up to date.
@@ -0,0 +1,283 @@
+# src/scrape_worker.py
+
+import sys
+import os
+from pathlib import Path
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import asyncio
+import click
+import logging
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from src.utils.db_utils import connect_db, close_db, execute_query, writer_connection, load_fetch_states, write_fetch_states, write_events
+from src.utils.queue_utils import enqueue_jobs, lease_jobs, complete_job, fail_job, queue_stats, job_priority
+from src.utils.scraping_utils import scrape_websites, render_dynamic_page, BrowserPool
+from src.utils.llm_utils import extract_event_data_batch
+from src.utils.validation_utils import EventIndex, deduplicate_events, normalize_event_name
+from src.utils.html_utils import normalize_event_date
+from src.utils.concurrency_utils import BoundedRunner, host_of
+from src.utils.fetch_utils import FetchTracker
+from src.utils.http_utils import http_stats
+from src.utils.export_utils import refresh_static_snapshot
+from src.utils.metrics_utils import annotate, count, metrics_enabled, set_gauge, span, traced_run
+from src.event_scraper_agent import (get_ticketmaster_events, get_eventbrite_events, check_page, venue_page_url,
+                                     TICKETMASTER_HOST, EVENTBRITE_HOST)
+
+# API sources: host used for rate limiting and the fetch function
+API_SOURCES = {
+    'ticketmaster': (TICKETMASTER_HOST, get_ticketmaster_events),
+    'eventbrite': (EVENTBRITE_HOST, get_eventbrite_events),
+}
+
+def job_key(job):
+    """
+    Fetch state key for a job. Website and dynamic jobs may share a page but
+    process it separately, so each source keeps its own state.
+    """
+    return f"{job['source']}:{job['target']}"
+
+def venue_jobs(venue):
+    """
+    List the queue jobs for a venue: one per API source, its website and its dynamic page.
+    """
+    # Skip non-venue locations for API/website scraping
+    if venue['non_venue_flag']:
+        return []
+    priority = job_priority(venue['upcoming_event_date'])
+    jobs = [{'venue_id': venue['id'], 'source': source, 'target': venue['name'], 'priority': priority} for source in API_SOURCES]
+    if venue['website_url']:
+        jobs.append({'venue_id': venue['id'], 'source': 'website', 'target': venue['website_url'], 'priority': priority})
+    page_url = venue_page_url(venue)
+    if page_url:
+        jobs.append({'venue_id': venue['id'], 'source': 'dynamic', 'target': page_url, 'priority': priority})
+    return jobs
+
+def fetch_dynamic_page(tracker, url, key, pool):
+    """
+    Render a dynamic page unless it is unchanged. Returns its HTML, or None if unchanged.
+    """
+    if check_page(tracker, url, key):
+        return None
+    content = render_dynamic_page(url, pool)
+    if content is None:
+        raise RuntimeError(f"Could not render {url}")
+    return content
+
+def scrape_websites_isolated(urls):
+    """
+    Crawl websites in a child process, so each batch gets a fresh Twisted reactor
+    and a reactor crash only fails that batch.
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+        return executor.submit(scrape_websites, urls).result()
+
+async def run_jobs_async(jobs, tracker, pool, concurrency, host_interval):
+    """
+    Run the network and extraction steps for a batch of leased jobs.
+
+    Returns:
+        list: Per job, its events or the exception that failed it.
+    """
+    runner = BoundedRunner(concurrency, host_interval)
+    try:
+        steps = []
+        for job in jobs:
+            if job['source'] in API_SOURCES:
+                host, fetch = API_SOURCES[job['source']]
+                steps.append(runner.run(host, fetch, job['target'], tracker, True))
+            elif job['source'] == 'website':
+                steps.append(runner.run(host_of(job['target']), check_page, tracker, job['target'], job_key(job)))
+            else:
+                steps.append(runner.run(host_of(job['target']), fetch_dynamic_page, tracker, job['target'], job_key(job), pool))
+        outcomes = list(await asyncio.gather(*steps, return_exceptions=True))
+    finally:
+        runner.close()
+
+    rendered = [index for index, job in enumerate(jobs) if job['source'] == 'dynamic' and isinstance(outcomes[index], str)]
+    changed_sites = [index for index, job in enumerate(jobs) if job['source'] == 'website' and outcomes[index] is False]
+    for index, job in enumerate(jobs):
+        # Unchanged pages have nothing new to extract
+        if job['source'] == 'dynamic' and outcomes[index] is None or job['source'] == 'website' and outcomes[index] is True:
+            outcomes[index] = []
+
+    if rendered:
+        page_events = await asyncio.to_thread(extract_event_data_batch, [(outcomes[index], jobs[index]['target']) for index in rendered], concurrency)
+        for index, events in zip(rendered, page_events):
+            outcomes[index] = RuntimeError("Event extraction failed") if events is None else events
+
+    if changed_sites:
+        try:
+            events_by_url = await asyncio.to_thread(scrape_websites_isolated, [jobs[index]['target'] for index in changed_sites])
+            for index in changed_sites:
+                target = jobs[index]['target']
+                outcomes[index] = events_by_url[target] if target in events_by_url else RuntimeError(f"Could not crawl {target}")
+        except Exception as e:
+            for index in changed_sites:
+                outcomes[index] = e
+    return outcomes
+
+def drop_stored_duplicates(conn, events):
+    """
+    Drop events that fuzzily match a differently named event already stored for
+    the same venue and date, e.g. found earlier by another source. Exact matches
+    are kept so the upsert refreshes them.
+    """
+    kept = []
+    stored_by_day = {}
+    for event in events:
+        day = (event['venue_id'], normalize_event_date(event['date']))
+        if day not in stored_by_day:
+            names = {row[0] for row in conn.execute("SELECT normalized_name FROM events WHERE venue_id = ? AND date = ?", day)}
+            index = EventIndex()
+            for name in names:
+                index.add(name, day[1])
+            stored_by_day[day] = (names, index)
+        names, index = stored_by_day[day]
+        name = normalize_event_name(event['name'])
+        if name not in names and index.is_duplicate(name, day[1]):
+            continue
+        kept.append(event)
+    return kept
+
+def store_job_result(job, events, tracker, worker_id):
+    """
+    Write a finished job's events and fetch state and mark it done, in one transaction.
+
+    Returns:
+        int: Number of events written.
+    """
+    events = [dict(event, venue_id=job['venue_id']) for event in events if event.get('name') and event.get('date')]
+    key = job_key(job)
+    with writer_connection() as conn:
+        events = drop_stored_duplicates(conn, deduplicate_events(events))
+        stored_count = write_events(conn, events)
+        if key in tracker.states:
+            write_fetch_states(conn, {key: tracker.states[key]})
+        # Marked done last, so the job is only done once its results are committed with it
+        if not complete_job(conn, job, worker_id):
+            conn.rollback()
+            return 0
+    return stored_count
+
+def process_batch(jobs, pool, worker_id, concurrency, host_interval, force):
+    """
+    Run a batch of leased jobs and record each outcome as soon as the batch finishes.
+    """
+    conn = connect_db()
+    tracker = FetchTracker(load_fetch_states(conn, [job_key(job) for job in jobs]), force=force)
+    close_db(conn)
+    outcomes = asyncio.run(run_jobs_async(jobs, tracker, pool, concurrency, host_interval))
+    stored_count = 0
+    for job, outcome in zip(jobs, outcomes):
+        if not isinstance(outcome, BaseException):
+            try:
+                job_count = store_job_result(job, outcome, tracker, worker_id)
+            except Exception as e:
+                # One job's bad results shouldn't lose the rest of the batch
+                outcome = e
+        if isinstance(outcome, BaseException):
+            count('scrape_jobs_finished_total', source=job['source'], status='failed')
+            with writer_connection() as conn:
+                fail_job(conn, job, worker_id, outcome)
+            continue
+        count('scrape_jobs_finished_total', source=job['source'], status='done')
+        logging.info(f"Worker {worker_id}: {job['source']} {job['target']} stored {job_count} events")
+        stored_count += job_count
+    return stored_count
+
+@click.group()
+def cli():
+    """
+    Queue-based event scraping: enqueue per-venue, per-source jobs, then run one or more workers.
+    """
+
+@cli.command()
+@click.option('--max-attempts', default=3, type=int, help='Leases allowed per job before it is marked failed')
+def enqueue(max_attempts):
+    """
+    Queue a job for every venue source, venues with the soonest events first.
+    """
+    try:
+        conn = connect_db()
+        venues = execute_query(conn, "SELECT id, name, website_url, instagram, facebook, non_venue_flag, upcoming_event_date FROM venues")
+        close_db(conn)
+        jobs = [job for venue in venues for job in venue_jobs(venue)]
+        with writer_connection() as conn:
+            queued = enqueue_jobs(conn, jobs, max_attempts)
+        print(f"Queued {queued} jobs for {len(venues)} venues.")
+        logging.info(f"Queued {queued} of {len(jobs)} jobs")
+    except Exception as e:
+        logging.error(f"Error in enqueue: {e}")
+        print(f"Error: {e}")
+
+@cli.command()
+@click.option('--worker-id', default=None, help='Name recorded on leased jobs (default: host-pid)')
+@click.option('--batch-size', default=10, type=int, help='Jobs leased at a time')
+@click.option('--lease-seconds', default=900, type=int, help='Seconds before a leased job may be taken over by another worker')
+@click.option('--concurrency', default=4, type=int, help='Number of job sources fetched in parallel')
+@click.option('--host-interval', default=1.0, type=float, help='Minimum seconds between requests to the same host')
+@click.option('--browsers', default=1, type=int, help='Number of headless browsers rendering dynamic pages')
+@click.option('--browser-max-pages', default=50, type=int, help='Page loads before a browser is restarted')
+@click.option('--page-load-timeout', default=30, type=int, help='Seconds before a dynamic page load is abandoned')
+@click.option('--poll-interval', default=10.0, type=float, help='Seconds to wait when no job is ready')
+@click.option('--exit-when-empty', is_flag=True, help='Stop once no job is ready instead of polling')
+@click.option('--force', is_flag=True, help='Refetch and reprocess every source, even if unchanged')
+@traced_run('scrape_worker')
+def work(worker_id, batch_size, lease_seconds, concurrency, host_interval, browsers, browser_max_pages,
+         page_load_timeout, poll_interval, exit_when_empty, force):
+    """
+    Lease jobs from the queue and stream their events into the database. Several workers can run at once.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    logging.info(f"Worker {worker_id} starting")
+    processed = 0
+    stored = 0
+    # Set once a batch finishes; the static snapshot is rewritten when the queue runs dry
+    snapshot_stale = False
+    with BrowserPool(max(browsers, 1), browser_max_pages, page_load_timeout) as pool:
+        while True:
+            with writer_connection() as conn:
+                jobs = lease_jobs(conn, worker_id, batch_size, lease_seconds)
+                if metrics_enabled():
+                    for source, counts in queue_stats(conn).items():
+                        for status, jobs_count in counts.items():
+                            set_gauge('scrape_jobs', jobs_count, source=source, status=status)
+            if not jobs:
+                if snapshot_stale:
+                    refresh_static_snapshot()
+                    snapshot_stale = False
+                if exit_when_empty:
+                    break
+                time.sleep(poll_interval)
+                continue
+            try:
+                with span('scrape_worker.batch', jobs=len(jobs)):
+                    stored += process_batch(jobs, pool, worker_id, max(concurrency, 1), host_interval, force)
+            except Exception as e:
+                # Leases expire, so another worker (or this one) retries the batch
+                logging.error(f"Worker {worker_id} batch error: {e}")
+            processed += len(jobs)
+            snapshot_stale = True
+            print(f"Worker {worker_id}: processed {processed} jobs, stored {stored} events.")
+    logging.info(f"Worker {worker_id} finished: {processed} jobs, {stored} events")
+    annotate(worker_id=worker_id, jobs=processed, events=stored, http=http_stats())
+
+@cli.command()
+def status():
+    """
+    Show job counts by source and status.
+    """
+    conn = connect_db()
+    stats = queue_stats(conn)
+    close_db(conn)
+    statuses = ('pending', 'leased', 'done', 'failed')
+    print(f"{'source':<14}" + ''.join(f"{status:>10}" for status in statuses))
+    for source, counts in sorted(stats.items()):
+        print(f"{source:<14}" + ''.join(f"{counts.get(status, 0):>10}" for status in statuses))
+
+if __name__ == '__main__':
+    cli()
@@ -1,12 +1,33 @@
 # src/utils/api_utils.py
-import requests
 from dotenv import load_dotenv
 import os
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
 import click
+from src.utils.http_utils import get_client
+from src.utils.metrics_utils import bind_context, count, traced
+from src.utils.geo_utils import MILES_PER_DEGREE_LAT, haversine_miles
 
 load_dotenv()
 GOOGLE_MAPS_API_KEY = os.getenv('GOOGLE_MAPS_API_KEY')
+GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+NEARBY_SEARCH_URL = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+PLACE_DETAILS_URL = "https://maps.googleapis.com/maps/api/place/details/json"
+DEFAULT_CATEGORIES = ['stadium', 'theater', 'concert_hall', 'park', 'community_center', 'night_club', 'event_venue', 'museum', 'performing_arts_theater']
+METERS_PER_MILE = 1609.34
+# A nearbysearch returns at most 3 pages of 20 results
+PLACES_PAGE_SIZE = 20
+# Largest radius nearbysearch accepts
+PLACES_MAX_RADIUS_METERS = 50000
+MAX_SEARCH_RADIUS_MILES = PLACES_MAX_RADIUS_METERS / METERS_PER_MILE
+# Saturated tiles are not split below this radius
+MIN_TILE_RADIUS_MILES = 0.25
+# Seconds before a next_page_token becomes usable, and how often to retry it
+PAGE_TOKEN_DELAY = 2
+PAGE_TOKEN_RETRIES = 3
 
 def geocode_address(address):
     """
@@ -19,8 +40,8 @@ def geocode_address(address):
         tuple: (latitude, longitude) or None if geocoding fails.
     """
     try:
-        url = f"https://maps.googleapis.com/maps/api/geocode/json?address={address}&key={GOOGLE_MAPS_API_KEY}"
-        response = requests.get(url).json()
+        params = {'address': address, 'key': GOOGLE_MAPS_API_KEY}
+        response = get_client('google_maps').get(GEOCODE_URL, params=params).json()
         if response['status'] == 'OK':
             location = response['results'][0]['geometry']['location']
             return location['lat'], location['lng']
@@ -31,41 +52,187 @@ def geocode_address(address):
         print(f"Geocoding request error: {e}")
         return None
 
-def find_venues(latitude, longitude, radius_miles, categories=['stadium', 'theater', 'concert_hall', 'park', 'community_center', 'night_club', 'event_venue', 'museum', 'performing_arts_theater']):
+def place_to_venue(place):
+    place_types = place.get('types', [])
+    return {
+        'name': place.get('name', ''),
+        'address': place.get('vicinity', ''),
+        'x_coordinate': place['geometry']['location']['lat'],
+        'y_coordinate': place['geometry']['location']['lng'],
+        'category': place_types[0] if place_types else 'unknown',
+        'place_id': place.get('place_id', '')  # Added place_id
+    }
+
+def venue_key(venue):
+    """
+    Identify a discovered venue: its place_id, or its name and address when Google gave none.
+    """
+    return venue['place_id'] or f"{venue['name']}|{venue['address']}"
+
+@traced('places.search_nearby')
+def search_nearby(latitude, longitude, radius_meters, category, max_pages=3):
+    """
+    Run one Places nearbysearch for a category, following next_page_token.
+    
+    Args:
+        latitude (float): Latitude of the center point.
+        longitude (float): Longitude of the center point.
+        radius_meters (float): Search radius in meters.
+        category (str): Venue type from Google Places API Table A.
+        max_pages (int): Result pages to fetch (the API serves at most 3 pages of 20).
+    
+    Returns:
+        list: Raw place results.
+    """
+    places = []
+    params = {'location': f"{latitude},{longitude}", 'radius': radius_meters, 'type': category, 'key': GOOGLE_MAPS_API_KEY}
+    for page in range(max_pages):
+        for attempt in range(PAGE_TOKEN_RETRIES):
+            response = get_client('google_maps').get(NEARBY_SEARCH_URL, params=params).json()
+            # A fresh next_page_token is rejected until it becomes valid a moment later
+            if response['status'] != 'INVALID_REQUEST' or 'pagetoken' not in params:
+                break
+            time.sleep(PAGE_TOKEN_DELAY)
+        count('places_pages_total', category=category, status=response['status'])
+        if response['status'] not in ('OK', 'ZERO_RESULTS'):
+            print(f"Places API error for {category}: {response['status']}")
+            break
+        places.extend(response.get('results', []))
+        token = response.get('next_page_token')
+        if not token:
+            break
+        params = {'pagetoken': token, 'key': GOOGLE_MAPS_API_KEY}
+        time.sleep(PAGE_TOKEN_DELAY)
+    return places
+
+def tile_circle(latitude, longitude, radius_miles, tile_radius_miles):
+    """
+    Cover a circle with a square grid of overlapping circular tiles.
+    
+    Each tile circumscribes one grid square, so together the tiles leave no gaps.
+    
+    Args:
+        latitude (float): Latitude of the center point.
+        longitude (float): Longitude of the center point.
+        radius_miles (float): Radius of the circle to cover.
+        tile_radius_miles (float): Radius of each tile.
+    
+    Returns:
+        list: (latitude, longitude, radius_miles) tuples, one per tile.
+    """
+    step = tile_radius_miles * math.sqrt(2)
+    rings = max(math.ceil(radius_miles / step - 0.5), 0)
+    miles_per_degree_lng = MILES_PER_DEGREE_LAT * max(math.cos(math.radians(latitude)), 0.01)
+    tiles = []
+    for row in range(-rings, rings + 1):
+        for col in range(-rings, rings + 1):
+            # Skip squares lying entirely outside the circle
+            dx = max(abs(col) * step - step / 2, 0)
+            dy = max(abs(row) * step - step / 2, 0)
+            if math.hypot(dx, dy) <= radius_miles:
+                tiles.append((latitude + row * step / MILES_PER_DEGREE_LAT,
+                              longitude + col * step / miles_per_degree_lng,
+                              tile_radius_miles))
+    return tiles
+
+def split_tile(tile):
+    """
+    Split a tile into the four tiles covering the quadrants of its grid square.
+    """
+    latitude, longitude, radius_miles = tile
+    offset = radius_miles * math.sqrt(2) / 4
+    miles_per_degree_lng = MILES_PER_DEGREE_LAT * max(math.cos(math.radians(latitude)), 0.01)
+    return [(latitude + dy * offset / MILES_PER_DEGREE_LAT, longitude + dx * offset / miles_per_degree_lng, radius_miles / 2)
+            for dy in (-1, 1) for dx in (-1, 1)]
+
+@traced('places.find_venues')
+def find_venues(latitude, longitude, radius_miles, categories=DEFAULT_CATEGORIES, concurrency=4, tile_radius_miles=None, max_pages=3):
     """
     Find venues near a location using Google Places API.
     
+    Categories are searched concurrently, each following pagination, and places
+    matching several categories are returned once (under the first category).
+    
+    A single nearbysearch returns at most 60 places, so large areas are
+    truncated. With tile_radius_miles set, the circle is instead covered with
+    tiles of that radius, tiles that hit the result cap are split into four
+    smaller tiles until MIN_TILE_RADIUS_MILES, and every tile search runs in
+    the same thread pool. Radii over the Places limit of 50,000 m (about 31
+    miles) are always tiled, with tiles no larger than that limit.
+    
     Args:
         latitude (float): Latitude of the center point.
         longitude (float): Longitude of the center point.
         radius_miles (float): Search radius in miles.
         categories (list): List of venue types from Google Places API Table A.
+        concurrency (int): Searches run in parallel.
+        tile_radius_miles (float): Radius of the initial tiles, or None for one search per category.
+        max_pages (int): Result pages fetched per search.
     
     Returns:
         list: List of venue dictionaries (name, address, x_coordinate, y_coordinate, category, place_id).
+            A failed search is logged and the venues from the other searches are still returned.
     """
     try:
-        radius_meters = radius_miles * 1609.34
-        venues = []
         # If categories is empty, use default event-relevant types
         if not categories:
-            categories = ['stadium', 'theater', 'concert_hall', 'park', 'community_center', 'night_club', 'event_venue', 'museum', 'performing_arts_theater']
+            categories = DEFAULT_CATEGORIES
+        if not tile_radius_miles and radius_miles > MAX_SEARCH_RADIUS_MILES:
+            print(f"A {radius_miles:g} mile radius is over the Places limit of {MAX_SEARCH_RADIUS_MILES:.1f} miles; "
+                  f"tiling the search instead")
+            tile_radius_miles = MAX_SEARCH_RADIUS_MILES
+        if tile_radius_miles:
+            tiles = tile_circle(latitude, longitude, radius_miles, min(tile_radius_miles, radius_miles, MAX_SEARCH_RADIUS_MILES))
+        else:
+            tiles = [(latitude, longitude, radius_miles)]
+        result_cap = max_pages * PLACES_PAGE_SIZE
+        places_by_category = {category: [] for category in categories}
+        searches = failed = 0
+        with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+            def submit(tile, category):
+                tile_lat, tile_lng, tile_radius = tile
+                radius_meters = min(tile_radius * METERS_PER_MILE, PLACES_MAX_RADIUS_METERS)
+                return executor.submit(bind_context(search_nearby), tile_lat, tile_lng, radius_meters, category, max_pages)
+            
+            pending = {submit(tile, category): (tile, category) for category in categories for tile in tiles}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    tile, category = pending.pop(future)
+                    searches += 1
+                    try:
+                        places = future.result()
+                    except Exception as e:
+                        # Keep what the other searches found rather than dropping the whole run
+                        failed += 1
+                        count('places_failed_searches_total', category=category)
+                        logging.error(f"Places search error for {category} within {tile[2]:.2f} miles of ({tile[0]:.4f}, {tile[1]:.4f}): {e}")
+                        continue
+                    places_by_category[category].extend(places)
+                    if len(places) < result_cap:
+                        continue
+                    if tile_radius_miles and tile[2] / 2 >= MIN_TILE_RADIUS_MILES:
+                        count('places_tile_splits_total', category=category)
+                        for child in split_tile(tile):
+                            pending[submit(child, category)] = (child, category)
+                    else:
+                        count('places_capped_searches_total', category=category)
+                        print(f"Places results for {category} capped at {result_cap} within {tile[2]:.2f} miles of "
+                              f"({tile[0]:.4f}, {tile[1]:.4f}); some venues may be missing")
+        
+        venues = {}
         for category in categories:
-            url = f"https://maps.googleapis.com/maps/api/place/nearbysearch/json?location={latitude},{longitude}&radius={radius_meters}&type={category}&key={GOOGLE_MAPS_API_KEY}"
-            response = requests.get(url).json()
-            if response['status'] == 'OK':
-                for place in response.get('results', []):
-                    place_types = place.get('types', [])
-                    venue = {
-                        'name': place.get('name', ''),
-                        'address': place.get('vicinity', ''),
-                        'x_coordinate': place['geometry']['location']['lat'],
-                        'y_coordinate': place['geometry']['location']['lng'],
-                        'category': place_types[0] if place_types else 'unknown',
-                        'place_id': place.get('place_id', '')  # Added place_id
-                    }
-                    venues.append(venue)
-        return venues
+            for place in places_by_category[category]:
+                venue = place_to_venue(place)
+                # Tiles overhang the search circle
+                if tile_radius_miles and haversine_miles(latitude, longitude, venue['x_coordinate'], venue['y_coordinate']) > radius_miles:
+                    continue
+                venues.setdefault(venue_key(venue), venue)
+        if tile_radius_miles:
+            print(f"Ran {searches} tile searches across {len(categories)} categories, found {len(venues)} venues")
+        if failed:
+            print(f"{failed} of {searches} Places searches failed; some venues may be missing")
+        return list(venues.values())
     except Exception as e:
         print(f"Places API error: {e}")
         return []
@@ -81,8 +248,8 @@ def get_place_details(place_id):
         dict: Dictionary containing website, phone_number, and rating, or None if not available.
     """
     try:
-        url = f"https://maps.googleapis.com/maps/api/place/details/json?place_id={place_id}&fields=website,formatted_phone_number,rating&key={GOOGLE_MAPS_API_KEY}"
-        response = requests.get(url).json()
+        params = {'place_id': place_id, 'fields': 'website,formatted_phone_number,rating', 'key': GOOGLE_MAPS_API_KEY}
+        response = get_client('google_maps').get(PLACE_DETAILS_URL, params=params).json()
         if response['status'] == 'OK':
             details = {
                 'website': response['result'].get('website'),
@@ -0,0 +1,174 @@
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from pathlib import Path
+
+BACKUP_PREFIX = 'venues_backup_'
+# Pages copied per backup step, with a pause after each so the copy doesn't hog disk I/O
+DEFAULT_STEP_PAGES = 256
+DEFAULT_STEP_PAUSE = 0.01
+COPY_BUFFER_BYTES = 1024 * 1024
+
+def snapshot_database(db_path, target_path, step_pages=DEFAULT_STEP_PAGES, step_pause=DEFAULT_STEP_PAUSE):
+    """
+    Copy a live database with the SQLite online backup API, a few pages at a time.
+
+    A read transaction is held on the source for the whole copy, so the snapshot
+    is consistent as of its start and writes made meanwhile don't restart it.
+    Under WAL this blocks neither readers nor writers; checkpoints just can't
+    pass the snapshot until it is done.
+
+    Args:
+        db_path (str): Database to back up.
+        target_path (str): File the snapshot is written to (replaced if it exists).
+        step_pages (int): Pages copied per step.
+        step_pause (float): Seconds slept between steps, leaving I/O for the live API.
+
+    Returns:
+        dict: Pages and bytes copied, backup steps and elapsed seconds.
+    """
+    Path(target_path).unlink(missing_ok=True)
+    source = sqlite3.connect(db_path, timeout=10)
+    target = sqlite3.connect(target_path)
+    steps = 0
+
+    def progress(status, remaining, total):
+        nonlocal steps
+        steps += 1
+        if remaining and step_pause:
+            time.sleep(step_pause)
+
+    start = time.perf_counter()
+    try:
+        source.execute("BEGIN")
+        # The first read opens the read transaction the backup steps reuse
+        source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        source.backup(target, pages=max(step_pages, 1), progress=progress)
+        source.rollback()
+        # The copied header keeps the source's WAL mode; a plain file is simpler to verify and restore
+        target.execute("PRAGMA journal_mode = DELETE")
+        pages = target.execute("PRAGMA page_count").fetchone()[0]
+        page_size = target.execute("PRAGMA page_size").fetchone()[0]
+    finally:
+        target.close()
+        source.close()
+    return {
+        'pages': pages,
+        'bytes': pages * page_size,
+        'steps': steps,
+        'seconds': round(time.perf_counter() - start, 3)
+    }
+
+def verify_database(path):
+    """
+    Run PRAGMA integrity_check on a database file.
+
+    Returns:
+        tuple: (ok, problems reported by SQLite, elapsed seconds)
+    """
+    start = time.perf_counter()
+    conn = sqlite3.connect(f"file:{Path(path).resolve()}?mode=ro", uri=True)
+    try:
+        problems = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+    finally:
+        conn.close()
+    ok = problems == ['ok']
+    return ok, [] if ok else problems, round(time.perf_counter() - start, 3)
+
+def compress_file(path, target_path, level=6):
+    """
+    Gzip a file in chunks.
+
+    Returns:
+        dict: Compressed size in bytes and elapsed seconds.
+    """
+    start = time.perf_counter()
+    with open(path, 'rb') as source, gzip.open(target_path, 'wb', compresslevel=level) as target:
+        shutil.copyfileobj(source, target, COPY_BUFFER_BYTES)
+    return {'bytes': os.path.getsize(target_path), 'seconds': round(time.perf_counter() - start, 3)}
+
+def list_backups(backup_dir):
+    """
+    Backups in backup_dir, newest first. Covers older uncompressed .db copies too.
+    """
+    backups = [path for pattern in ('*.db', '*.db.gz') for path in Path(backup_dir).glob(BACKUP_PREFIX + pattern)]
+    return sorted(backups, key=lambda path: path.stat().st_mtime, reverse=True)
+
+def prune_backups(backup_dir, keep=7, max_total_bytes=None):
+    """
+    Delete the oldest backups beyond keep, then more of the oldest while they
+    take more than max_total_bytes. The newest backup is always kept.
+
+    Returns:
+        list: Paths of the deleted backups.
+    """
+    backups = list_backups(backup_dir)
+    kept = backups[:max(keep, 1)]
+    removed = backups[len(kept):]
+    if max_total_bytes is not None:
+        total = sum(path.stat().st_size for path in kept)
+        while len(kept) > 1 and total > max_total_bytes:
+            oldest = kept.pop()
+            total -= oldest.stat().st_size
+            removed.append(oldest)
+    for path in removed:
+        try:
+            path.unlink()
+        except OSError as e:
+            logging.error(f"Could not delete old backup {path}: {e}")
+    return removed
+
+def create_backup(db_path, backup_dir, step_pages=DEFAULT_STEP_PAGES, step_pause=DEFAULT_STEP_PAUSE,
+                  compress=True, verify=True):
+    """
+    Snapshot, verify and compress a database into backup_dir.
+
+    The snapshot is written to a .partial file and only renamed into place once
+    it has passed verification, so a failed run never leaves a bad backup behind.
+
+    Args:
+        db_path (str): Database to back up.
+        backup_dir (str): Directory for the backups.
+        step_pages (int): Pages copied per backup step.
+        step_pause (float): Seconds slept between backup steps.
+        compress (bool): Gzip the snapshot.
+        verify (bool): Run PRAGMA integrity_check on the snapshot before keeping it.
+
+    Returns:
+        dict: Backup path plus snapshot, verify and compress sizes and timings.
+
+    Raises:
+        RuntimeError: If the snapshot fails its integrity check.
+    """
+    if not Path(db_path).exists():
+        raise FileNotFoundError(f"No database at {db_path}")
+    backup_dir = Path(backup_dir)
+    backup_dir.mkdir(parents=True, exist_ok=True)
+    name = f"{BACKUP_PREFIX}{time.strftime('%Y-%m-%d_%H-%M-%S')}.db"
+    snapshot_path = backup_dir / f"{name}.partial"
+    final_path = backup_dir / (f"{name}.gz" if compress else name)
+    report = {'path': str(final_path)}
+    start = time.perf_counter()
+    try:
+        report['snapshot'] = snapshot_database(db_path, snapshot_path, step_pages, step_pause)
+        if verify:
+            ok, problems, seconds = verify_database(snapshot_path)
+            report['verify'] = {'ok': ok, 'seconds': seconds}
+            if not ok:
+                raise RuntimeError(f"Snapshot failed integrity check: {'; '.join(problems[:5])}")
+        if compress:
+            compressed_path = backup_dir / f"{name}.gz.partial"
+            try:
+                report['compress'] = compress_file(snapshot_path, compressed_path)
+                os.replace(compressed_path, final_path)
+            finally:
+                compressed_path.unlink(missing_ok=True)
+        else:
+            os.replace(snapshot_path, final_path)
+    finally:
+        snapshot_path.unlink(missing_ok=True)
+    report['seconds'] = round(time.perf_counter() - start, 3)
+    return report
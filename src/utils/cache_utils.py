@@ -0,0 +1,183 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+def normalize_text(text):
+    """
+    Collapse runs of whitespace so formatting-only changes hit the same cache entry.
+    """
+    return ' '.join(str(text).split())
+
+def cache_key(model, prompt):
+    """
+    Build a cache key from the model name and the normalized prompt.
+    """
+    return hashlib.sha256(f"{model}\n{normalize_text(prompt)}".encode('utf-8')).hexdigest()
+
+class LLMCache:
+    """
+    SQLite-backed cache of LLM responses with a TTL and size-bounded LRU eviction.
+
+    The same file holds a ledger of prompts whose replies could not be parsed or
+    validated, so failed items are told apart from real results and retried a
+    bounded number of times. Safe to share between threads; several processes
+    can use the same file.
+    """
+
+    def __init__(self, db_path='data/llm_cache.db', ttl_seconds=7 * 24 * 3600, max_entries=10000):
+        """
+        Args:
+            db_path (str): SQLite file holding the cache.
+            ttl_seconds (int): Age after which an entry is ignored and replaced.
+            max_entries (int): Entries kept before the least recently used are evicted.
+        """
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_accessed REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_llm_cache_last_accessed ON llm_cache(last_accessed);
+            CREATE TABLE IF NOT EXISTS llm_failures (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                item TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 1,
+                first_failed REAL NOT NULL,
+                last_failed REAL NOT NULL
+            );
+        """)
+        self._conn.commit()
+
+    def get(self, key):
+        """
+        Return the cached response for a key, or None on a miss or expired entry.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, model, response):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, response, created_at, last_accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, now, now)
+            )
+            # Drop expired entries first, then the least recently used ones over the limit
+            cursor = self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+            evicted = cursor.rowcount
+            cursor = self._conn.execute("""
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY last_accessed
+                    LIMIT MAX((SELECT COUNT(*) FROM llm_cache) - ?, 0)
+                )
+            """, (self.max_entries,))
+            self.evictions += evicted + cursor.rowcount
+            self._conn.commit()
+
+    def record_failure(self, key, kind, item, error):
+        """
+        Add a failed attempt for a prompt to the ledger.
+
+        Args:
+            key (str): Cache key of the prompt.
+            kind (str): What was being extracted, e.g. 'venue_details' or 'events'.
+            item (str): Short description of the input, for inspection.
+            error (str): Why the reply was rejected.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO llm_failures (key, kind, item, error, attempts, first_failed, last_failed)
+                VALUES (?, ?, ?, ?, 1, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET error = excluded.error, attempts = attempts + 1,
+                    last_failed = excluded.last_failed
+            """, (key, kind, (item or '')[:500], (error or '')[:500], now, now))
+            self._conn.commit()
+
+    def clear_failure(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_failures WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def failure_attempts(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT attempts FROM llm_failures WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def failures(self, kind=None):
+        """
+        List ledger entries, most recent first.
+        """
+        columns = ('key', 'kind', 'item', 'error', 'attempts', 'first_failed', 'last_failed')
+        query = f"SELECT {', '.join(columns)} FROM llm_failures"
+        params = ()
+        if kind:
+            query += " WHERE kind = ?"
+            params = (kind,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY last_failed DESC", params).fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+def get_llm_cache():
+    """
+    Return the process-wide LLM cache configured from the environment, or None if disabled.
+
+    LLM_CACHE_PATH, LLM_CACHE_TTL (seconds) and LLM_CACHE_MAX_ENTRIES override
+    the defaults; LLM_CACHE_DISABLED=1 turns caching off.
+    """
+    global _llm_cache
+    if os.getenv('LLM_CACHE_DISABLED', '').lower() in ('1', 'true', 'yes'):
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            try:
+                _llm_cache = LLMCache(
+                    os.getenv('LLM_CACHE_PATH', 'data/llm_cache.db'),
+                    int(os.getenv('LLM_CACHE_TTL', 7 * 24 * 3600)),
+                    int(os.getenv('LLM_CACHE_MAX_ENTRIES', 10000))
+                )
+            except (sqlite3.Error, ValueError) as e:
+                logging.error(f"LLM cache unavailable, continuing without it: {e}")
+                return None
+        return _llm_cache
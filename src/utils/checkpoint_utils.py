@@ -0,0 +1,51 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+class Checkpoint:
+    """
+    A JSON checkpoint file for resuming long runs, written atomically.
+    """
+
+    def __init__(self, name, params, directory='data/checkpoints'):
+        """
+        Args:
+            name (str): Kind of run, used as the file name prefix.
+            params (dict): Run parameters; runs with the same parameters share a checkpoint.
+            directory (str): Directory holding checkpoint files.
+        """
+        digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+        self.path = Path(directory) / f"{name}_{digest}.json"
+        self.params = params
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Return the saved state, or None if there is no usable checkpoint.
+        """
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.error(f"Ignoring unreadable checkpoint {self.path}: {e}")
+            return None
+        if data.get('params') != self.params:
+            return None
+        return data.get('state')
+
+    def save(self, state):
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump({'params': self.params, 'state': state}, f)
+            os.replace(tmp_path, self.path)
+
+    def clear(self):
+        with self._lock:
+            self.path.unlink(missing_ok=True)
@@ -0,0 +1,85 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from src.utils.metrics_utils import bind_context, set_gauge
+
+
+def host_of(url):
+    """
+    Return the lower-cased host part of a URL, or the URL itself if it has none.
+    """
+    return (urlparse(url).netloc or url).lower()
+
+
+class HostRateLimiter:
+    """
+    Async rate limiter that spaces out requests to the same host.
+
+    Each host gets its own lock and "next allowed" timestamp, so requests to
+    different hosts never wait on each other.
+    """
+
+    def __init__(self, default_interval=1.0, intervals=None):
+        """
+        Args:
+            default_interval (float): Minimum seconds between two requests to one host.
+            intervals (dict): Optional per-host overrides of the interval.
+        """
+        self.default_interval = default_interval
+        self.intervals = intervals or {}
+        self._locks = {}
+        self._next_allowed = {}
+
+    async def acquire(self, host, ready=None):
+        """
+        Wait until the host may be called again.
+
+        Args:
+            host (str): Host about to be called.
+            ready (callable): Optional coroutine function awaited after the wait,
+                e.g. taking a concurrency slot. The host's interval starts once it returns.
+        """
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            loop = asyncio.get_running_loop()
+            wait = self._next_allowed.get(host, 0) - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            if ready is not None:
+                await ready()
+            interval = self.intervals.get(host, self.default_interval)
+            self._next_allowed[host] = loop.time() + interval
+
+
+class BoundedRunner:
+    """
+    Runs blocking callables in worker threads with a global concurrency bound
+    and a per-host rate limit.
+    """
+
+    def __init__(self, concurrency, host_interval=1.0):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.limiter = HostRateLimiter(host_interval)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+        self.waiting = 0
+
+    async def run(self, host, func, *args):
+        # Calls not yet running, i.e. the runner's queue depth
+        self.waiting += 1
+        set_gauge('runner_queue_depth', self.waiting)
+        try:
+            # Slots are only taken once the host may be called, so calls spaced out
+            # for one host never hold a slot another host could use
+            await self.limiter.acquire(host, self.semaphore.acquire)
+        finally:
+            self.waiting -= 1
+            set_gauge('runner_queue_depth', self.waiting)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, bind_context(func), *args)
+        finally:
+            self.semaphore.release()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
@@ -1,16 +1,110 @@
+import logging
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
+from src.utils.validation_utils import normalize_event_name
+from src.utils.html_utils import normalize_event_date
 
-def connect_db(db_path='data/venues.db'):
+DEFAULT_DB_PATH = 'data/venues.db'
+
+# WAL lets readers keep going while a writer commits; NORMAL sync is durable enough under WAL
+CONNECTION_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('busy_timeout', 10000),
+    ('synchronous', 'NORMAL'),
+    ('cache_size', -20000),
+    ('temp_store', 'MEMORY'),
+)
+
+def configure_connection(conn, readonly=False):
+    for pragma, value in CONNECTION_PRAGMAS:
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    if readonly:
+        conn.execute("PRAGMA query_only = ON")
+    return conn
+
+def connect_db(db_path=DEFAULT_DB_PATH, readonly=False, check_same_thread=True):
     try:
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
-        conn = sqlite3.connect(db_path)
+        conn = sqlite3.connect(db_path, timeout=10, check_same_thread=check_same_thread)
         conn.row_factory = sqlite3.Row
-        return conn
+        return configure_connection(conn, readonly)
     except sqlite3.Error as e:
         print(f"Error connecting to database: {e}")
         raise
 
+class ConnectionPool:
+    """
+    A fixed set of read-only connections shared between threads (e.g. Flask request handlers).
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, size=4):
+        self.db_path = db_path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=10):
+        with self._lock:
+            create = self._idle.empty() and self._created < self.size
+            if create:
+                self._created += 1
+        if create:
+            try:
+                return connect_db(self.db_path, readonly=True, check_same_thread=False)
+            except sqlite3.Error:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._idle.get(timeout=timeout)
+
+    def release(self, conn):
+        # Never hand out a connection with a read transaction still open
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+_writer_locks = {}
+_writer_locks_guard = threading.Lock()
+# Databases whose schema this process has already brought up to date
+_schema_ready = set()
+
+@contextmanager
+def writer_connection(db_path=DEFAULT_DB_PATH):
+    """
+    The single write path for the agents: one writer per database at a time in this process.
+
+    Other processes (API readers, other agents) are handled by WAL and busy_timeout.
+    The schema is brought up to date on the first writer for a database in this process.
+    """
+    key = str(Path(db_path).resolve())
+    with _writer_locks_guard:
+        lock = _writer_locks.setdefault(key, threading.Lock())
+    with lock:
+        conn = connect_db(db_path)
+        try:
+            if key not in _schema_ready:
+                ensure_schema(conn)
+                _schema_ready.add(key)
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
 def execute_query(conn, query, params=()):
     try:
         cursor = conn.cursor()
@@ -30,3 +124,411 @@ def close_db(conn):
     except sqlite3.Error as e:
         print(f"Error closing database: {e}")
         raise
+
+FETCH_STATE_COLUMNS = ('source_key', 'url', 'etag', 'last_modified', 'content_hash', 'last_checked', 'last_changed')
+
+def ensure_fetch_state_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS fetch_state (
+            source_key TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            content_hash TEXT,
+            last_checked DATETIME,
+            last_changed DATETIME
+        )
+    """)
+    conn.commit()
+
+def load_fetch_states(conn, keys=None):
+    """
+    Load the per-source fetch state (ETag, Last-Modified, body hash) keyed by source key.
+
+    Args:
+        conn (sqlite3.Connection): Database connection.
+        keys (list): Only load these source keys; all states if omitted.
+    """
+    query = f"SELECT {', '.join(FETCH_STATE_COLUMNS)} FROM fetch_state"
+    try:
+        if keys is None:
+            rows = conn.execute(query).fetchall()
+        else:
+            keys = list(keys)
+            rows = conn.execute(f"{query} WHERE source_key IN ({', '.join('?' for _ in keys)})", keys).fetchall() if keys else []
+    except sqlite3.OperationalError:
+        # No writer has created the table yet, so nothing has been fetched
+        return {}
+    return {row['source_key']: dict(row) for row in rows}
+
+def write_fetch_states(conn, states):
+    """
+    Upsert fetch states in the caller's transaction, without committing.
+
+    The fetch_state table must exist (see ensure_schema).
+    """
+    placeholders = ', '.join('?' for _ in FETCH_STATE_COLUMNS)
+    conn.executemany(
+        f"INSERT OR REPLACE INTO fetch_state ({', '.join(FETCH_STATE_COLUMNS)}) VALUES ({placeholders})",
+        [tuple(state.get(column) for column in FETCH_STATE_COLUMNS) for state in states.values()]
+    )
+
+def save_fetch_states(conn, states):
+    """
+    Upsert fetch states in a single transaction.
+    """
+    with conn:
+        write_fetch_states(conn, states)
+
+def ensure_events_table(conn):
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            venue_id INTEGER NOT NULL REFERENCES venues(id) ON DELETE CASCADE,
+            name VARCHAR(255) NOT NULL,
+            normalized_name VARCHAR(255) NOT NULL,
+            date DATETIME NOT NULL,
+            url VARCHAR(255),
+            first_seen DATETIME DEFAULT CURRENT_TIMESTAMP,
+            last_seen DATETIME DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (venue_id, date, normalized_name)
+        );
+        -- The unique constraint's index also serves (venue_id, date) lookups
+        CREATE INDEX IF NOT EXISTS idx_events_date ON events(date);
+        CREATE INDEX IF NOT EXISTS idx_venues_name ON venues(name);
+    """)
+    conn.commit()
+
+def write_events(conn, events):
+    """
+    Write events and point each venue's upcoming_event_* columns at its next
+    event, in the caller's transaction and without committing.
+
+    Schema changes commit any pending transaction, so the events table must
+    already exist (see ensure_schema).
+
+    Args:
+        conn (sqlite3.Connection): Database connection.
+        events (list): Events with venue_id, name, date and url.
+
+    Returns:
+        int: Number of events written.
+    """
+    rows = [
+        (event['venue_id'], event['name'], normalize_event_name(event['name']), normalize_event_date(event['date']), event.get('url'))
+        for event in events
+    ]
+    venue_ids = sorted({row[0] for row in rows})
+    # Stage the rows and write them in one statement, so the search index
+    # triggers flush FTS5's pending terms once rather than once per row
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS event_staging (venue_id, name, normalized_name, date, url)")
+    conn.execute("DELETE FROM temp.event_staging")
+    conn.executemany("INSERT INTO temp.event_staging VALUES (?, ?, ?, ?, ?)", rows)
+    conn.execute("""
+        INSERT INTO events (venue_id, name, normalized_name, date, url)
+        SELECT venue_id, name, normalized_name, date, url FROM temp.event_staging WHERE true ORDER BY rowid
+        ON CONFLICT (venue_id, date, normalized_name) DO UPDATE SET
+            name = excluded.name, url = excluded.url, last_seen = CURRENT_TIMESTAMP
+    """)
+    conn.execute("DELETE FROM temp.event_staging")
+    # Only ISO dates can be compared with the current time. Event dates are local
+    # and date-only ones are stored at midnight, so compare against today's local date
+    conn.executemany("""
+        UPDATE venues
+        SET (upcoming_event_name, upcoming_event_date, upcoming_event_page_url) = (
+            SELECT name, date, url FROM events
+            WHERE venue_id = ? AND date GLOB '[0-9][0-9][0-9][0-9]-*' AND date >= date('now', 'localtime')
+            ORDER BY date LIMIT 1
+        ), last_updated = CURRENT_TIMESTAMP
+        WHERE id = ?
+    """, [(venue_id, venue_id) for venue_id in venue_ids])
+    return len(rows)
+
+def upsert_events(conn, events):
+    """
+    Write events in one transaction and point each venue's upcoming_event_* columns at its next event.
+
+    Args:
+        conn (sqlite3.Connection): Database connection.
+        events (list): Events with venue_id, name, date and url.
+
+    Returns:
+        int: Number of events written.
+    """
+    with conn:
+        return write_events(conn, events)
+
+def ensure_change_tracking(conn):
+    """
+    Keep a counter that increases on every change to venues or events, used for API ETags.
+    """
+    statements = ["""
+        CREATE TABLE IF NOT EXISTS db_changes (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            counter INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO db_changes (id, counter) VALUES (1, 0);
+    """]
+    for table in ('venues', 'events'):
+        for action in ('INSERT', 'UPDATE', 'DELETE'):
+            statements.append(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_{action.lower()}_changes AFTER {action} ON {table}
+                BEGIN
+                    UPDATE db_changes SET counter = counter + 1 WHERE id = 1;
+                END;
+            """)
+    conn.executescript(''.join(statements))
+    conn.commit()
+
+def get_change_counter(conn):
+    """
+    Return the venues/events change counter, or None if change tracking isn't set up yet.
+    """
+    try:
+        row = conn.execute("SELECT counter FROM db_changes WHERE id = 1").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+def ensure_venue_indexes(conn):
+    conn.executescript("""
+        CREATE INDEX IF NOT EXISTS idx_venues_category ON venues(category);
+        CREATE INDEX IF NOT EXISTS idx_venues_size ON venues(size);
+        CREATE INDEX IF NOT EXISTS idx_venues_non_venue_flag ON venues(non_venue_flag);
+        CREATE INDEX IF NOT EXISTS idx_venues_coordinates ON venues(x_coordinate, y_coordinate);
+    """)
+    conn.commit()
+
+def ensure_spatial_index(conn):
+    """
+    Mirror venue coordinates into an R*Tree kept in sync by triggers, filled
+    from existing venues when first created.
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'venues_rtree'").fetchone():
+        return
+    try:
+        conn.executescript("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS venues_rtree USING rtree(id, min_lat, max_lat, min_lng, max_lng);
+            CREATE TRIGGER IF NOT EXISTS trg_venues_rtree_insert AFTER INSERT ON venues
+            WHEN NEW.x_coordinate IS NOT NULL AND NEW.y_coordinate IS NOT NULL
+            BEGIN
+                INSERT OR REPLACE INTO venues_rtree VALUES (NEW.id, NEW.x_coordinate, NEW.x_coordinate, NEW.y_coordinate, NEW.y_coordinate);
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_venues_rtree_update AFTER UPDATE OF id, x_coordinate, y_coordinate ON venues
+            BEGIN
+                DELETE FROM venues_rtree WHERE id = OLD.id;
+                INSERT INTO venues_rtree SELECT NEW.id, NEW.x_coordinate, NEW.x_coordinate, NEW.y_coordinate, NEW.y_coordinate
+                WHERE NEW.x_coordinate IS NOT NULL AND NEW.y_coordinate IS NOT NULL;
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_venues_rtree_delete AFTER DELETE ON venues
+            BEGIN
+                DELETE FROM venues_rtree WHERE id = OLD.id;
+            END;
+            INSERT OR REPLACE INTO venues_rtree
+            SELECT id, x_coordinate, x_coordinate, y_coordinate, y_coordinate FROM venues
+            WHERE x_coordinate IS NOT NULL AND y_coordinate IS NOT NULL;
+        """)
+        conn.commit()
+    except sqlite3.OperationalError as e:
+        # SQLite builds without R*Tree fall back to the coordinates index
+        logging.warning(f"R*Tree spatial index unavailable: {e}")
+
+# Weekday name of an event date, indexed so searches like "comedy friday" match
+EVENT_WEEKDAY_SQL = """CASE CAST(strftime('%w', {date}) AS INTEGER) WHEN 0 THEN 'Sunday' WHEN 1 THEN 'Monday'
+    WHEN 2 THEN 'Tuesday' WHEN 3 THEN 'Wednesday' WHEN 4 THEN 'Thursday' WHEN 5 THEN 'Friday' WHEN 6 THEN 'Saturday' END"""
+
+def ensure_search_index(conn):
+    """
+    Create the FTS5 full-text indexes used by /api/search, kept in sync by triggers.
+
+    venues_fts indexes venue name, description, category and address straight
+    from the venues table. events_fts stores each event's name with its venue
+    name and weekday. Both are filled from existing rows when first created.
+    """
+    existing = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('venues_fts', 'events_fts')")}
+    if len(existing) == 2:
+        return
+    weekday = EVENT_WEEKDAY_SQL.format(date='NEW.date')
+    try:
+        conn.executescript(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS venues_fts USING fts5(
+                name, description, category, address,
+                content='venues', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            );
+            CREATE TRIGGER IF NOT EXISTS trg_venues_fts_insert AFTER INSERT ON venues
+            BEGIN
+                INSERT INTO venues_fts (rowid, name, description, category, address)
+                VALUES (NEW.id, NEW.name, NEW.description, NEW.category, NEW.address);
+            END;
+            -- Upserts rewrite every column, so only reindex when indexed text changed
+            CREATE TRIGGER IF NOT EXISTS trg_venues_fts_update AFTER UPDATE ON venues
+            WHEN NEW.id IS NOT OLD.id OR NEW.name IS NOT OLD.name OR NEW.description IS NOT OLD.description
+                OR NEW.category IS NOT OLD.category OR NEW.address IS NOT OLD.address
+            BEGIN
+                INSERT INTO venues_fts (venues_fts, rowid, name, description, category, address)
+                VALUES ('delete', OLD.id, OLD.name, OLD.description, OLD.category, OLD.address);
+                INSERT INTO venues_fts (rowid, name, description, category, address)
+                VALUES (NEW.id, NEW.name, NEW.description, NEW.category, NEW.address);
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_venues_fts_delete AFTER DELETE ON venues
+            BEGIN
+                INSERT INTO venues_fts (venues_fts, rowid, name, description, category, address)
+                VALUES ('delete', OLD.id, OLD.name, OLD.description, OLD.category, OLD.address);
+            END;
+
+            CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+                name, venue, weekday, tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            );
+            CREATE TRIGGER IF NOT EXISTS trg_events_fts_insert AFTER INSERT ON events
+            BEGIN
+                INSERT INTO events_fts (rowid, name, venue, weekday)
+                VALUES (NEW.id, NEW.name, (SELECT name FROM venues WHERE id = NEW.venue_id), {weekday});
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_events_fts_update AFTER UPDATE ON events
+            WHEN NEW.id IS NOT OLD.id OR NEW.name IS NOT OLD.name OR NEW.date IS NOT OLD.date OR NEW.venue_id IS NOT OLD.venue_id
+            BEGIN
+                DELETE FROM events_fts WHERE rowid = OLD.id;
+                INSERT INTO events_fts (rowid, name, venue, weekday)
+                VALUES (NEW.id, NEW.name, (SELECT name FROM venues WHERE id = NEW.venue_id), {weekday});
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_events_fts_delete AFTER DELETE ON events
+            BEGIN
+                DELETE FROM events_fts WHERE rowid = OLD.id;
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_venues_fts_rename AFTER UPDATE OF name ON venues
+            WHEN NEW.name IS NOT OLD.name
+            BEGIN
+                UPDATE events_fts SET venue = NEW.name WHERE rowid IN (SELECT id FROM events WHERE venue_id = NEW.id);
+            END;
+        """)
+        if 'venues_fts' not in existing:
+            conn.execute("INSERT INTO venues_fts (venues_fts) VALUES ('rebuild')")
+            # Rank venue name matches above description and address matches
+            conn.execute("INSERT INTO venues_fts (venues_fts, rank) VALUES ('rank', 'bm25(10.0, 2.0, 4.0, 1.0)')")
+        if 'events_fts' not in existing:
+            conn.execute(f"""
+                INSERT INTO events_fts (rowid, name, venue, weekday)
+                SELECT e.id, e.name, v.name, {EVENT_WEEKDAY_SQL.format(date='e.date')}
+                FROM events e LEFT JOIN venues v ON v.id = e.venue_id
+            """)
+            conn.execute("INSERT INTO events_fts (events_fts, rank) VALUES ('rank', 'bm25(10.0, 2.0, 1.0)')")
+        conn.commit()
+    except sqlite3.OperationalError as e:
+        # SQLite builds without FTS5 just don't offer search
+        conn.rollback()
+        logging.warning(f"FTS5 search index unavailable: {e}")
+
+def ensure_venue_place_id(conn):
+    """
+    Add the Google place_id column used to upsert venues, for databases created before it existed.
+    """
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(venues)")]
+    if columns and 'place_id' not in columns:
+        conn.execute("ALTER TABLE venues ADD COLUMN place_id TEXT")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_venues_place_id ON venues(place_id) WHERE place_id IS NOT NULL")
+    conn.commit()
+
+# Venue columns served by the API and the static snapshot
+VENUE_COLUMNS = (
+    'id', 'place_id', 'name', 'x_coordinate', 'y_coordinate', 'address', 'phone_number', 'rating', 'size', 'category',
+    'description', 'instagram', 'facebook', 'upcoming_event_name', 'upcoming_event_date',
+    'upcoming_event_page_url', 'website_url', 'non_venue_flag', 'last_updated'
+)
+
+VENUE_UPSERT_COLUMNS = (
+    'place_id', 'name', 'x_coordinate', 'y_coordinate', 'address', 'size', 'category',
+    'description', 'instagram', 'facebook', 'website_url', 'phone_number', 'rating', 'non_venue_flag'
+)
+
+def upsert_venues(conn, venues):
+    """
+    Insert or update venues by place_id in one transaction, keeping existing venue ids stable.
+
+    Rows without a place_id (stored before the column existed, or venues Google
+    didn't identify) are matched by name and address instead, and adopt the
+    venue's place_id so later runs match them directly.
+
+    Columns missing from a venue dictionary (e.g. details whose extraction
+    failed) are left unchanged on existing rows and take their defaults on new ones.
+
+    Args:
+        conn (sqlite3.Connection): Database connection.
+        venues (list): Venue dictionaries.
+
+    Returns:
+        int: Number of venues written.
+    """
+    # One executemany per set of present columns
+    groups = {}
+    for venue in venues:
+        # Empty place ids would all collide on the unique index
+        values = dict(venue, place_id=venue.get('place_id') or None)
+        if 'non_venue_flag' in values:
+            values['non_venue_flag'] = values['non_venue_flag'] or False
+        columns = tuple(column for column in VENUE_UPSERT_COLUMNS if column in values)
+        groups.setdefault((columns, values['place_id'] is not None), []).append({column: values[column] for column in columns})
+    with conn:
+        # Give matching rows without a place_id this venue's, so the upsert below updates them
+        conn.executemany("""
+            UPDATE venues SET place_id = :place_id
+            WHERE id = (SELECT id FROM venues WHERE place_id IS NULL AND name = :name AND address = :address ORDER BY id LIMIT 1)
+              AND NOT EXISTS (SELECT 1 FROM venues WHERE place_id = :place_id)
+        """, [{'place_id': venue['place_id'], 'name': venue.get('name'), 'address': venue.get('address')}
+              for (_, has_place_id), rows in groups.items() if has_place_id for venue in rows])
+        for (columns, has_place_id), rows in groups.items():
+            insert = f"INSERT INTO venues ({', '.join(columns)}) VALUES ({', '.join(f':{column}' for column in columns)})"
+            if has_place_id:
+                updates = ', '.join(f"{column} = excluded.{column}" for column in columns if column != 'place_id')
+                conn.executemany(f"""
+                    {insert}
+                    ON CONFLICT (place_id) WHERE place_id IS NOT NULL DO UPDATE SET {updates}, last_updated = CURRENT_TIMESTAMP
+                """, rows)
+                continue
+            updates = ', '.join(f"{column} = :{column}" for column in columns if column != 'place_id')
+            for row in rows:
+                matched = conn.execute(f"""
+                    UPDATE venues SET {updates}, last_updated = CURRENT_TIMESTAMP
+                    WHERE id = (SELECT id FROM venues WHERE place_id IS NULL AND name = :name AND address = :address ORDER BY id LIMIT 1)
+                """, dict(row, name=row.get('name'), address=row.get('address'))).rowcount
+                if not matched:
+                    conn.execute(insert, row)
+    return len(venues)
+
+def ensure_scrape_jobs_table(conn):
+    """
+    Create the work queue used by src/scrape_worker.py: one job per venue and source.
+    """
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS scrape_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            venue_id INTEGER NOT NULL REFERENCES venues(id) ON DELETE CASCADE,
+            source TEXT NOT NULL,
+            target TEXT NOT NULL,
+            priority INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'pending' CHECK(status IN ('pending', 'leased', 'done', 'failed')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 3,
+            available_at REAL NOT NULL,
+            lease_owner TEXT,
+            lease_expires REAL,
+            last_error TEXT,
+            updated_at REAL,
+            UNIQUE (venue_id, source)
+        );
+        CREATE INDEX IF NOT EXISTS idx_scrape_jobs_ready ON scrape_jobs(status, priority DESC, available_at);
+    """)
+    conn.commit()
+
+def ensure_schema(conn):
+    """
+    Bring an existing database up to date with the tables, indexes and triggers the agents and API use.
+    """
+    ensure_fetch_state_table(conn)
+    ensure_venue_place_id(conn)
+    ensure_events_table(conn)
+    ensure_venue_indexes(conn)
+    ensure_spatial_index(conn)
+    ensure_search_index(conn)
+    ensure_scrape_jobs_table(conn)
+    ensure_change_tracking(conn)
@@ -0,0 +1,152 @@
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import ExitStack
+from pathlib import Path
+from src.utils.db_utils import DEFAULT_DB_PATH, VENUE_COLUMNS, connect_db, close_db, get_change_counter
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Rows read from the cursor (and sent to the client) at a time
+EXPORT_CHUNK_ROWS = 500
+DEFAULT_SNAPSHOT_DIR = 'frontend/data'
+SNAPSHOT_NAME = 'venues.json'
+# Snapshots are written once per run and read many times, so compress hard;
+# brotli past quality 9 is orders of magnitude slower for a few percent
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 5
+
+def iter_rows(conn, query, params=(), chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Run one query and yield its rows a chunk at a time, so the result is never held in memory.
+    """
+    cursor = conn.execute(query, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+def _dumps(value):
+    return json.dumps(value, separators=(',', ':'), default=str)
+
+def ndjson_chunks(row_chunks, columns):
+    """
+    One JSON object per row and line.
+    """
+    for rows in row_chunks:
+        yield ''.join(_dumps(dict(zip(columns, row))) + '\n' for row in rows)
+
+def compact_json_chunks(row_chunks, columns, **fields):
+    """
+    A JSON object naming the columns once, with each row as an array:
+    {...fields, "columns": [...], "rows": [[...], ...]}. Rows are written as they are read.
+    """
+    yield '{' + ''.join(f"{_dumps(name)}:{_dumps(value)}," for name, value in fields.items()) + f'"columns":{_dumps(list(columns))},"rows":['
+    separator = ''
+    for rows in row_chunks:
+        # One dumps call per chunk, without the enclosing brackets
+        yield separator + _dumps([tuple(row) for row in rows])[1:-1]
+        separator = ','
+    yield ']}'
+
+def write_static_snapshot(conn, output_dir=DEFAULT_SNAPSHOT_DIR, columns=VENUE_COLUMNS):
+    """
+    Write every venue to output_dir/venues.json in the compact export format,
+    with precompressed venues.json.gz and, if the brotli package is installed,
+    venues.json.br copies for static servers and CDNs.
+
+    All files are written in one pass under temporary names and then renamed,
+    so a server never sees a half-written snapshot.
+
+    Args:
+        conn (sqlite3.Connection): Database connection.
+        output_dir (str): Directory for the snapshot files.
+        columns (tuple): Venue columns included.
+
+    Returns:
+        dict: Venue count, size of each file in bytes and elapsed seconds.
+    """
+    start = time.perf_counter()
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = {'json': output_dir / SNAPSHOT_NAME, 'gzip': output_dir / f"{SNAPSHOT_NAME}.gz"}
+    if brotli is not None:
+        paths['brotli'] = output_dir / f"{SNAPSHOT_NAME}.br"
+    temp_paths = {kind: path.with_name(f".{path.name}.tmp") for kind, path in paths.items()}
+    venue_count = 0
+
+    def counted(row_chunks):
+        nonlocal venue_count
+        for rows in row_chunks:
+            venue_count += len(rows)
+            yield rows
+
+    try:
+        with ExitStack() as stack:
+            files = {kind: stack.enter_context(open(path, 'wb')) for kind, path in temp_paths.items()}
+            # mtime=0 keeps the gzip bytes identical when the data hasn't changed
+            gzip_file = stack.enter_context(gzip.GzipFile(fileobj=files['gzip'], mode='wb', compresslevel=GZIP_LEVEL, mtime=0))
+            compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY) if brotli is not None else None
+            # The counter and the rows come from the same read transaction
+            conn.execute("BEGIN")
+            try:
+                counter = get_change_counter(conn)
+                rows = counted(iter_rows(conn, f"SELECT {', '.join(columns)} FROM venues ORDER BY id"))
+                for chunk in compact_json_chunks(rows, columns, generated_at=time.strftime('%Y-%m-%dT%H:%M:%S'),
+                                                 change_counter=counter):
+                    data = chunk.encode('utf-8')
+                    files['json'].write(data)
+                    gzip_file.write(data)
+                    if compressor is not None:
+                        files['brotli'].write(compressor.process(data))
+            finally:
+                conn.rollback()
+            if compressor is not None:
+                files['brotli'].write(compressor.finish())
+        for kind, path in paths.items():
+            os.replace(temp_paths[kind], path)
+    finally:
+        for path in temp_paths.values():
+            path.unlink(missing_ok=True)
+    return {
+        'venues': venue_count,
+        'bytes': {kind: path.stat().st_size for kind, path in paths.items()},
+        'seconds': round(time.perf_counter() - start, 3)
+    }
+
+def refresh_static_snapshot(db_path=DEFAULT_DB_PATH, output_dir=None):
+    """
+    Rewrite the static venue snapshot at the end of an agent run.
+
+    The directory comes from STATIC_SNAPSHOT_DIR (frontend/data by default);
+    setting it to an empty string turns the snapshot off. Failures are logged,
+    never raised, so they can't fail the run that just finished.
+
+    Returns:
+        dict: Snapshot stats (see write_static_snapshot), or None if skipped or failed.
+    """
+    if output_dir is None:
+        output_dir = os.getenv('STATIC_SNAPSHOT_DIR', DEFAULT_SNAPSHOT_DIR)
+    if not output_dir:
+        return None
+    try:
+        conn = connect_db(db_path, readonly=True)
+        try:
+            stats = write_static_snapshot(conn, output_dir)
+        finally:
+            close_db(conn)
+        logging.info(f"Static snapshot written to {output_dir}: {stats}")
+        return stats
+    except (sqlite3.Error, OSError) as e:
+        logging.error(f"Could not write static snapshot: {e}")
+        return None
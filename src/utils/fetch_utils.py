@@ -0,0 +1,109 @@
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+import requests
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def _now():
+    return datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+class FetchTracker:
+    """
+    Conditional fetching against the per-source state stored in the fetch_state table.
+
+    Each source (an API query or a venue page) is identified by a key. Requests
+    carry If-None-Match/If-Modified-Since from the last run, and a response whose
+    body hash is unchanged is treated like a 304, so callers can skip parsing.
+    """
+
+    def __init__(self, states=None, force=False, stale_after_hours=168):
+        """
+        Args:
+            states (dict): Previous fetch states keyed by source key (see db_utils.load_fetch_states).
+            force (bool): Ignore stored state and treat every source as changed.
+            stale_after_hours (int): Treat a source as changed if it was last processed longer ago than this.
+        """
+        self.states = dict(states or {})
+        self.force = force
+        self.stale_after = timedelta(hours=stale_after_hours)
+        self.checked = 0
+        self.skipped = 0
+        self._previous = {}
+        self._lock = threading.Lock()
+
+    def _is_stale(self, state):
+        try:
+            changed = datetime.strptime(state['last_changed'], TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+        except (TypeError, ValueError):
+            return True
+        return datetime.now(timezone.utc) - changed > self.stale_after
+
+    def conditional_get(self, key, url, params=None, timeout=30, client=None):
+        """
+        GET a source unless it is unchanged since the last run.
+
+        Args:
+            key (str): Source key, e.g. 'ticketmaster:Ford Field' or 'page:https://...'.
+            url (str): URL without secrets; it is stored in the fetch_state table.
+            params (dict): Query parameters, including API keys.
+            timeout (int): Request timeout in seconds.
+            client (HttpClient): Client to send the request with; plain requests if omitted.
+
+        Returns:
+            requests.Response or None: The response, or None if the source is unchanged.
+        """
+        with self._lock:
+            state = self.states.get(key)
+        use_state = state is not None and not self.force and not self._is_stale(state)
+        headers = {}
+        if use_state and state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if use_state and state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
+
+        response = (client or requests).get(url, params=params, headers=headers, timeout=timeout)
+        now = _now()
+        with self._lock:
+            self.checked += 1
+            if response.status_code == 304:
+                self.skipped += 1
+                self.states[key] = dict(state or {'source_key': key, 'url': url}, last_checked=now)
+                return None
+            content_hash = hashlib.sha256(response.content).hexdigest()
+            if use_state and response.ok and content_hash == state.get('content_hash'):
+                self.skipped += 1
+                self.states[key] = dict(state, last_checked=now,
+                                        etag=response.headers.get('ETag') or state.get('etag'),
+                                        last_modified=response.headers.get('Last-Modified') or state.get('last_modified'))
+                return None
+            if response.ok:
+                self._previous.setdefault(key, state)
+                self.states[key] = {
+                    'source_key': key,
+                    'url': url,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'content_hash': content_hash,
+                    'last_checked': now,
+                    'last_changed': now
+                }
+        return response
+
+    def discard(self, key):
+        """
+        Restore a source's previous state after its content failed to process,
+        so the next run fetches it again.
+        """
+        with self._lock:
+            if key in self._previous:
+                previous = self._previous.pop(key)
+                if previous is None:
+                    self.states.pop(key, None)
+                else:
+                    self.states[key] = previous
+                logging.info(f"Discarded fetch state for {key}")
+
+    def stats(self):
+        return {'checked': self.checked, 'skipped': self.skipped}
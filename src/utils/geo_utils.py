@@ -0,0 +1,82 @@
+import logging
+import math
+import sqlite3
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LAT = 69.0
+
+def bounding_box(latitude, longitude, radius_miles):
+    """
+    Return (min_lat, max_lat, min_lng, max_lng) enclosing a circle around a point.
+    """
+    dlat = radius_miles / MILES_PER_DEGREE_LAT
+    # Longitude degrees shrink towards the poles; clamp to avoid dividing by ~0
+    dlng = radius_miles / (MILES_PER_DEGREE_LAT * max(math.cos(math.radians(latitude)), 0.01))
+    return latitude - dlat, latitude + dlat, longitude - dlng, longitude + dlng
+
+def haversine_miles(lat1, lng1, lat2, lng2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(min(1.0, math.sqrt(a)))
+
+def haversine_many(latitude, longitude, points):
+    """
+    Distances in miles from one origin to many (lat, lng) points.
+
+    The origin's trigonometry is computed once for the whole batch.
+    """
+    phi1 = math.radians(latitude)
+    cos_phi1 = math.cos(phi1)
+    lng1 = math.radians(longitude)
+    radians, sin, cos, asin, sqrt = math.radians, math.sin, math.cos, math.asin, math.sqrt
+    distances = []
+    for lat, lng in points:
+        phi2 = radians(lat)
+        a = sin((phi2 - phi1) / 2) ** 2 + cos_phi1 * cos(phi2) * sin((radians(lng) - lng1) / 2) ** 2
+        distances.append(2 * EARTH_RADIUS_MILES * asin(min(1.0, sqrt(a))))
+    return distances
+
+def find_nearby_venues(conn, latitude, longitude, radius_miles, limit=None, columns=('id', 'name', 'x_coordinate', 'y_coordinate')):
+    """
+    Find venues within a radius of a point, nearest first.
+
+    Candidates come from the venues_rtree R*Tree (or the coordinates index if the
+    R*Tree is unavailable) using the enclosing bounding box, then are refined with
+    the haversine distance.
+
+    Args:
+        conn (sqlite3.Connection): Database connection.
+        latitude (float): Latitude of the center point.
+        longitude (float): Longitude of the center point.
+        radius_miles (float): Search radius in miles.
+        limit (int): Maximum number of venues returned.
+        columns (tuple): Venue columns to return.
+
+    Returns:
+        list: Venue dictionaries with an added distance_miles, sorted by distance.
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_miles)
+    select = ', '.join(f"v.{column}" for column in dict.fromkeys(('x_coordinate', 'y_coordinate') + tuple(columns)))
+    try:
+        rows = conn.execute(f"""
+            SELECT {select} FROM venues_rtree r JOIN venues v ON v.id = r.id
+            WHERE r.min_lat <= ? AND r.max_lat >= ? AND r.min_lng <= ? AND r.max_lng >= ?
+        """, (max_lat, min_lat, max_lng, min_lng)).fetchall()
+    except sqlite3.OperationalError as e:
+        logging.warning(f"Spatial index unavailable, using coordinate index: {e}")
+        rows = conn.execute(f"""
+            SELECT {select} FROM venues v
+            WHERE v.x_coordinate BETWEEN ? AND ? AND v.y_coordinate BETWEEN ? AND ?
+        """, (min_lat, max_lat, min_lng, max_lng)).fetchall()
+
+    distances = haversine_many(latitude, longitude, ((row['x_coordinate'], row['y_coordinate']) for row in rows))
+    nearby = []
+    for row, distance in zip(rows, distances):
+        if distance <= radius_miles:
+            venue = {column: row[column] for column in columns}
+            venue['distance_miles'] = round(distance, 3)
+            nearby.append(venue)
+    nearby.sort(key=lambda venue: venue['distance_miles'])
+    return nearby[:limit] if limit else nearby
@@ -0,0 +1,250 @@
+import json
+import logging
+import re
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+# Subtrees that never hold event listings
+SKIPPED_TAGS = {'script', 'style', 'noscript', 'nav', 'svg', 'template', 'iframe', 'head'}
+# Tags that end a block of text
+BLOCK_TAGS = {
+    'p', 'div', 'li', 'ul', 'ol', 'tr', 'td', 'th', 'table', 'section', 'article', 'aside', 'main',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'br', 'dt', 'dd', 'dl', 'blockquote', 'pre', 'body'
+}
+VOID_TAGS = {'br', 'img', 'meta', 'link', 'input', 'hr', 'source', 'wbr', 'area', 'base', 'col', 'embed', 'track'}
+
+EVENT_PATTERNS = [
+    re.compile(r'\b(jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?\s+\d{1,2}\b', re.I),
+    re.compile(r'\b(mon|tue|tues|wed|thu|thur|thurs|fri|sat|sun)(day)?\b', re.I),
+    re.compile(r'\b\d{1,2}/\d{1,2}(/\d{2,4})?\b'),
+    re.compile(r'\b\d{4}-\d{2}-\d{2}\b'),
+    re.compile(r'\b\d{1,2}(:\d{2})?\s*(am|pm)\b', re.I),
+    re.compile(r'\b(tickets?|doors|live|presents|show|concert|tour|festival|performance|admission)\b', re.I),
+]
+ISO_DATE = re.compile(r'^(\d{4}-\d{2}-\d{2})(?:[T ](\d{2}:\d{2})(:\d{2})?)?')
+
+CHARS_PER_TOKEN = 4
+
+def normalize_event_date(value):
+    """
+    Convert ISO 8601 dates to the 'YYYY-MM-DD HH:MM:SS' format used by the LLM extractor.
+    """
+    match = ISO_DATE.match(str(value or '').strip())
+    if not match:
+        return value
+    day, time, seconds = match.groups()
+    return f"{day} {time or '00:00'}{seconds or ':00'}"
+
+def _is_event_type(value):
+    types = value if isinstance(value, list) else [value]
+    return any(isinstance(t, str) and t.split('/')[-1].endswith('Event') for t in types)
+
+def _json_ld_events(data, page_url):
+    """
+    Walk a JSON-LD document (including @graph and nested lists) for schema.org Event objects.
+    """
+    events = []
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+        elif isinstance(node, dict):
+            if _is_event_type(node.get('@type')) and node.get('name') and node.get('startDate'):
+                url = node.get('url')
+                if isinstance(url, list):
+                    url = url[0] if url else None
+                events.append({
+                    'name': str(node['name']).strip(),
+                    'date': normalize_event_date(node['startDate']),
+                    'url': urljoin(page_url, url) if isinstance(url, str) else page_url
+                })
+            else:
+                stack.extend(reversed([v for v in node.values() if isinstance(v, (dict, list))]))
+    return events
+
+class PageReducer(HTMLParser):
+    """
+    Streaming HTML reducer: drops boilerplate subtrees, collects schema.org
+    Event data from JSON-LD and microdata, and splits visible text into blocks.
+    """
+
+    def __init__(self, page_url):
+        super().__init__(convert_charrefs=True)
+        self.page_url = page_url
+        self.blocks = []
+        self.events = []
+        self._text = []
+        # Skipped subtree: its tag and how many of that tag are open
+        self._skip_tag = None
+        self._skip_depth = 0
+        self._article_depth = 0
+        self._json_ld = None
+        # Microdata: open itemscope elements as [tag, open count, item dict or None]
+        self._items = []
+        # Open itemprop element without a value attribute: [prop, text parts, tag, open count]
+        self._itemprop = None
+
+    def _flush(self):
+        # Data can arrive split at any point, so pieces are joined as is and tags add the spaces
+        text = ' '.join(''.join(self._text).split())
+        if text:
+            self.blocks.append(text)
+        self._text = []
+
+    def _starts_skip(self, tag):
+        if tag in ('header', 'footer'):
+            # Page-level headers and footers are boilerplate, ones inside an event card are not
+            return self._article_depth == 0
+        return tag in SKIPPED_TAGS
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'script' and (attrs.get('type') or '').lower() == 'application/ld+json':
+            self._json_ld = []
+        if self._skip_tag:
+            if tag == self._skip_tag:
+                self._skip_depth += 1
+            return
+        if self._starts_skip(tag):
+            if tag not in VOID_TAGS:
+                self._skip_tag = tag
+                self._skip_depth = 1
+            return
+        if tag in ('article', 'section'):
+            self._article_depth += 1
+        if tag in BLOCK_TAGS:
+            self._flush()
+        else:
+            self._text.append(' ')
+        self._handle_microdata(tag, attrs)
+
+    def _handle_microdata(self, tag, attrs):
+        for entry in self._items:
+            if entry[0] == tag:
+                entry[1] += 1
+        if self._itemprop:
+            self._itemprop[1].append(' ')
+            if self._itemprop[2] == tag:
+                self._itemprop[3] += 1
+        if 'itemscope' in attrs:
+            item = {} if _is_event_type(attrs.get('itemtype', '')) else None
+            self._items.append([tag, 1, item])
+        current = self._items[-1][2] if self._items else None
+        prop = attrs.get('itemprop')
+        if current is None or prop not in ('name', 'startDate', 'url') or prop in current:
+            return
+        value = attrs.get('content') or attrs.get('datetime') or attrs.get('href')
+        if value:
+            current[prop] = value
+        elif tag not in VOID_TAGS:
+            self._itemprop = [prop, [], tag, 1]
+
+    def handle_endtag(self, tag):
+        if tag == 'script' and self._json_ld is not None:
+            self._parse_json_ld(''.join(self._json_ld))
+            self._json_ld = None
+        if self._skip_tag:
+            if tag == self._skip_tag:
+                self._skip_depth -= 1
+                if not self._skip_depth:
+                    self._skip_tag = None
+            return
+        if tag in ('article', 'section') and self._article_depth:
+            self._article_depth -= 1
+        self._close_microdata(tag)
+        if tag in BLOCK_TAGS:
+            self._flush()
+        else:
+            self._text.append(' ')
+
+    def _close_microdata(self, tag):
+        if self._itemprop:
+            self._itemprop[1].append(' ')
+            if self._itemprop[2] == tag:
+                self._itemprop[3] -= 1
+            if not self._itemprop[3]:
+                prop, parts, _, _ = self._itemprop
+                if self._items and self._items[-1][2] is not None:
+                    self._items[-1][2].setdefault(prop, ' '.join(''.join(parts).split()))
+                self._itemprop = None
+        for entry in self._items:
+            if entry[0] == tag:
+                entry[1] -= 1
+        while self._items and self._items[-1][1] <= 0:
+            _, _, item = self._items.pop()
+            if item and item.get('name') and item.get('startDate'):
+                self.events.append({
+                    'name': item['name'],
+                    'date': normalize_event_date(item['startDate']),
+                    'url': urljoin(self.page_url, item.get('url') or '')
+                })
+
+    def handle_data(self, data):
+        if self._json_ld is not None:
+            self._json_ld.append(data)
+            return
+        if self._skip_tag:
+            return
+        if self._itemprop:
+            self._itemprop[1].append(data)
+        self._text.append(data)
+
+    def _parse_json_ld(self, raw):
+        try:
+            self.events.extend(_json_ld_events(json.loads(raw), self.page_url))
+        except ValueError as e:
+            logging.info(f"Ignoring invalid JSON-LD on {self.page_url}: {e}")
+
+    def close(self):
+        super().close()
+        self._flush()
+
+def score_block(text):
+    """
+    Rough likelihood that a block of text describes an event.
+    """
+    return sum(1 for pattern in EVENT_PATTERNS if pattern.search(text))
+
+def pack_blocks(blocks, budget_chars):
+    """
+    Pick the most event-like blocks that fit the budget, kept in page order.
+
+    Falls back to the leading blocks when nothing looks like an event.
+    """
+    scored = [(score_block(block), i, block) for i, block in enumerate(blocks)]
+    candidates = [entry for entry in scored if entry[0] > 0] or scored
+    chosen = []
+    used = 0
+    for score, i, block in sorted(candidates, key=lambda entry: (-entry[0], entry[1])):
+        if used + len(block) + 1 > budget_chars:
+            continue
+        chosen.append((i, block))
+        used += len(block) + 1
+    return '\n'.join(block for _, block in sorted(chosen))
+
+def reduce_html(html, page_url, budget_tokens=1500, chunk_size=65536):
+    """
+    Reduce a rendered page to structured events and a compact text excerpt.
+
+    Args:
+        html (str): Page HTML.
+        page_url (str): URL the page was loaded from, used to resolve links.
+        budget_tokens (int): Approximate token budget for the text excerpt.
+        chunk_size (int): Characters fed to the parser at a time.
+
+    Returns:
+        tuple: (events found in JSON-LD/microdata, event-like text packed into the budget).
+    """
+    parser = PageReducer(page_url)
+    for start in range(0, len(html), chunk_size):
+        parser.feed(html[start:start + chunk_size])
+    parser.close()
+    # The same event is often published as both JSON-LD and microdata
+    events = {}
+    for event in parser.events:
+        key = (event['name'], event['date'])
+        # Prefer a copy with its own link over one that only points back to the page
+        if key not in events or events[key]['url'] == page_url:
+            events[key] = event
+    return list(events.values()), pack_blocks(parser.blocks, budget_tokens * CHARS_PER_TOKEN)
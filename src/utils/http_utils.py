@@ -0,0 +1,189 @@
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+import requests
+from requests.adapters import HTTPAdapter
+from src.utils.metrics_utils import count, observe
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Latencies kept per client for percentiles
+LATENCY_WINDOW = 1000
+
+# Default quotas per outbound API. Rates are requests per second and can be
+# overridden with <NAME>_RATE_LIMIT, e.g. GEMINI_RATE_LIMIT=2.
+PROVIDERS = {
+    'google_maps': {'rate': 10, 'burst': 10, 'timeout': 15, 'retries': 3},
+    'ticketmaster': {'rate': 5, 'burst': 5, 'timeout': 15, 'retries': 3},
+    'eventbrite': {'rate': 0.5, 'burst': 5, 'timeout': 15, 'retries': 3},
+    'gemini': {'rate': 5, 'burst': 5, 'timeout': 60, 'retries': 3},
+    # Venue websites: pacing is per host (see concurrency_utils), so no global quota
+    'web': {'rate': None, 'burst': 1, 'timeout': 30, 'retries': 1}
+}
+
+class TokenBucket:
+    """
+    Thread-safe token bucket allowing `rate` requests per second with bursts of `burst`.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take one token, sleeping until one is available. Returns the seconds waited.
+        """
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Going negative reserves a future token, so waiters queue up in order
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+class HttpClient:
+    """
+    Keep-alive session for one provider with a token-bucket quota, bounded
+    retries with jittered exponential backoff, and latency/error counters.
+
+    Safe to share between threads.
+    """
+
+    def __init__(self, name, rate=None, burst=1, timeout=30, retries=3, backoff=0.5, max_backoff=30, pool_size=16):
+        """
+        Args:
+            name (str): Provider name, used in logs and stats.
+            rate (float): Requests per second, or None for no quota.
+            burst (int): Requests allowed back to back before the rate applies.
+            timeout (float): Default request timeout in seconds.
+            retries (int): Retries after the first attempt on 429/5xx and connection errors.
+            backoff (float): Base delay in seconds, doubled on each retry.
+            max_backoff (float): Cap on a single retry delay.
+            pool_size (int): Keep-alive connections kept per host.
+        """
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.limiter = TokenBucket(rate, burst)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.errors = 0
+        self.retried = 0
+        self.throttled_seconds = 0.0
+
+    def _retry_delay(self, attempt, response):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass
+        # Full jitter keeps concurrent workers from retrying in lockstep
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def request(self, method, url, **kwargs):
+        """
+        Send a request, retrying rate-limited, failed and 5xx attempts.
+
+        Returns:
+            requests.Response: The last response, whatever its status.
+
+        Raises:
+            requests.RequestException: If the last attempt failed to connect or timed out.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        for attempt in range(self.retries + 1):
+            waited = self.limiter.acquire()
+            start = time.perf_counter()
+            response = None
+            try:
+                response = self.session.request(method, url, **kwargs)
+                failed = response.status_code in RETRY_STATUSES
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+                failed = True
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.requests += 1
+                self.throttled_seconds += waited
+                self._latencies.append(elapsed)
+                if failed:
+                    self.errors += 1
+            observe('http_client_request_seconds', elapsed, provider=self.name)
+            count('http_client_requests_total', provider=self.name,
+                  status=response.status_code if response is not None else 'error')
+            if not failed or attempt == self.retries:
+                break
+            with self._lock:
+                self.retried += 1
+            delay = self._retry_delay(attempt, response)
+            logging.warning(f"{self.name} request failed ({response.status_code if response is not None else error}), "
+                            f"retrying in {delay:.1f}s")
+            time.sleep(delay)
+        if response is None:
+            raise error
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                'requests': self.requests,
+                'errors': self.errors,
+                'retries': self.retried,
+                'throttled_seconds': round(self.throttled_seconds, 2)
+            }
+        if latencies:
+            stats['p50_ms'] = round(latencies[len(latencies) // 2] * 1000, 1)
+            stats['p95_ms'] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1)
+        return stats
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_client(provider):
+    """
+    Return the shared HttpClient for a provider in PROVIDERS, creating it on first use.
+    """
+    with _clients_lock:
+        client = _clients.get(provider)
+        if client is None:
+            config = dict(PROVIDERS[provider])
+            rate = os.getenv(f"{provider.upper()}_RATE_LIMIT")
+            if rate:
+                config['rate'] = float(rate)
+            client = _clients[provider] = HttpClient(provider, **config)
+        return client
+
+def http_stats():
+    """
+    Request, error, retry and latency stats for every client used so far.
+    """
+    with _clients_lock:
+        clients = list(_clients.values())
+    return {client.name: client.stats() for client in clients}
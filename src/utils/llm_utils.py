@@ -1,74 +1,466 @@
-import requests
 from dotenv import load_dotenv
 import os
 import logging
 import json
+import re
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+from src.utils.cache_utils import cache_key, get_llm_cache
+from src.utils.html_utils import reduce_html, CHARS_PER_TOKEN
+from src.utils.http_utils import get_client
+from src.utils.metrics_utils import bind_context, count, span
+from src.utils.validation_utils import VENUE_SIZES, validate_venue_details, validate_events
 
 load_dotenv()
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+GEMINI_MODEL = 'gemini-1.5-flash'
+# Approximate token budget for page text sent with an event extraction prompt
+EVENT_TEXT_TOKEN_BUDGET = 1500
+# Approximate prompt tokens and items packed into one batched request
+BATCH_TOKEN_BUDGET = 8000
+BATCH_MAX_ITEMS = 20
+# Prompts whose replies failed validation this many times are not sent again
+LLM_MAX_ATTEMPTS = int(os.getenv('LLM_MAX_ATTEMPTS', 3))
+GEMINI_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent"
 
-def extract_venue_details(text):
-    try:
-        url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
-        headers = {'Content-Type': 'application/json'}
-        prompt = f"""
-        Given the following venue information: {text}
-        Extract:
-        - Size (Large: >10,000 capacity, Medium: 1,000-10,000, Small: <1,000)
-        - Description (brief, max 100 words)
-        - Instagram handle
-        - Facebook page
-        - Website URL
-        - Non-venue flag (True if not a fixed venue, e.g., festival space)
-        Return a JSON object with these fields. If data is unavailable, use reasonable defaults or null.
-        """
-        data = {
-            "contents": [{"parts": [{"text": prompt}]}],
-            "generationConfig": {"temperature": 0.7}
+class ExtractionError(ValueError):
+    """
+    Raised when Gemini gives no usable reply for an item.
+    """
+
+def _nullable(schema):
+    return dict(schema, nullable=True)
+
+# Response schemas in the OpenAPI subset accepted by generationConfig.responseSchema
+VENUE_DETAILS_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'size': {'type': 'STRING', 'enum': list(VENUE_SIZES)},
+        'description': {'type': 'STRING'},
+        'instagram': _nullable({'type': 'STRING'}),
+        'facebook': _nullable({'type': 'STRING'}),
+        'website_url': _nullable({'type': 'STRING'}),
+        'non_venue_flag': {'type': 'BOOLEAN'}
+    },
+    'required': ['size', 'description', 'non_venue_flag']
+}
+EVENTS_SCHEMA = {
+    'type': 'ARRAY',
+    'items': {
+        'type': 'OBJECT',
+        'properties': {
+            'name': {'type': 'STRING'},
+            'date': {'type': 'STRING', 'description': 'YYYY-MM-DD HH:MM:SS'},
+            'url': _nullable({'type': 'STRING'})
+        },
+        'required': ['name', 'date']
+    }
+}
+
+def batch_schema(item_schema):
+    """
+    Schema for a batched reply: one {id, result} object per input item.
+    """
+    return {
+        'type': 'ARRAY',
+        'items': {
+            'type': 'OBJECT',
+            'properties': {'id': {'type': 'STRING'}, 'result': item_schema},
+            'required': ['id', 'result']
         }
-        response = requests.post(f"{url}?key={GEMINI_API_KEY}", headers=headers, json=data)
+    }
+
+JSON_START = re.compile(r'[\[{]')
+
+def _salvage_array(text, start):
+    """
+    Parse the complete elements of a top-level array that was cut off mid-reply.
+    """
+    decoder = json.JSONDecoder()
+    items = []
+    position = start + 1
+    while True:
+        while position < len(text) and text[position] in ' \t\r\n,':
+            position += 1
+        if position >= len(text) or text[position] == ']':
+            return items
+        try:
+            item, position = decoder.raw_decode(text, position)
+        except ValueError:
+            return items
+        items.append(item)
+
+def extract_json(text, salvage=False):
+    """
+    Parse the first JSON value in a model reply.
+
+    Code fences, leading prose and trailing text are ignored. With salvage, a
+    truncated top-level array yields its complete elements.
+
+    Raises:
+        ValueError: If the reply holds no JSON value.
+    """
+    decoder = json.JSONDecoder()
+    for match in JSON_START.finditer(text):
+        try:
+            value, _ = decoder.raw_decode(text, match.start())
+            return value
+        except ValueError:
+            if salvage and match.group() == '[':
+                items = _salvage_array(text, match.start())
+                if items:
+                    logging.warning(f"Salvaged {len(items)} items from a truncated reply")
+                    return items
+    raise ValueError(f"No JSON value in reply: {text[:200]!r}")
+
+def request_json(prompt, schema=None, salvage=False):
+    """
+    Send a prompt to Gemini and parse the JSON in its reply, bypassing the cache.
+
+    Args:
+        prompt (str): Prompt text.
+        schema (dict): Optional response schema; the reply is then constrained to JSON matching it.
+        salvage (bool): Keep the complete elements of a truncated top-level array.
+
+    Returns:
+        The parsed value.
+    """
+    headers = {'Content-Type': 'application/json'}
+    generation_config = {"temperature": 0.7}
+    if schema is not None:
+        generation_config.update(responseMimeType='application/json', responseSchema=schema)
+    data = {
+        "contents": [{"parts": [{"text": prompt}]}],
+        "generationConfig": generation_config
+    }
+    with span('llm.request', model=GEMINI_MODEL):
+        response = get_client('gemini').post(GEMINI_URL, params={'key': GEMINI_API_KEY}, headers=headers, json=data)
         response.raise_for_status()
         result = response.json()
-        content = result['candidates'][0]['content']['parts'][0]['text']
-        content = content.strip().strip('```json\n').strip('```')
-        details = json.loads(content)
+    usage = result.get('usageMetadata') or {}
+    count('llm_tokens_total', usage.get('promptTokenCount', 0), type='prompt')
+    count('llm_tokens_total', usage.get('candidatesTokenCount', 0), type='output')
+    candidates = result.get('candidates') or []
+    if not candidates or not candidates[0].get('content', {}).get('parts'):
+        raise ValueError(f"No reply candidates (finish reason {candidates[0].get('finishReason') if candidates else None}, "
+                         f"feedback {result.get('promptFeedback')})")
+    content = ''.join(part.get('text', '') for part in candidates[0]['content']['parts'])
+    return extract_json(content, salvage)
+
+def cached_result(cache, key, validate):
+    """
+    Return the validated cached value for a key, or None on a miss or an invalid entry.
+    """
+    cached = cache.get(key)
+    count('llm_cache_lookups_total', result='miss' if cached is None else 'hit')
+    if cached is None:
+        return None
+    try:
+        value = json.loads(cached)
+        return validate(value) if validate else value
+    except ValueError as e:
+        logging.warning(f"Ignoring invalid cached reply {key}: {e}")
+        return None
+
+def generate_json(prompt, schema=None, validate=None, kind='json', item=None):
+    """
+    Send a prompt to Gemini and parse and validate the JSON in its reply.
+
+    Validated replies are cached by model and normalized prompt, so an unchanged
+    input skips the network round trip. Replies that fail to parse or validate
+    are recorded in the cache's failure ledger, and a prompt that failed
+    LLM_MAX_ATTEMPTS times is not sent again. Network errors are not recorded,
+    so the item is simply retried on the next run.
+
+    Args:
+        prompt (str): Prompt text.
+        schema (dict): Optional response schema.
+        validate (callable): Returns the normalized value or raises ValueError.
+        kind (str): Ledger category, e.g. 'venue_details'.
+        item (str): Short description of the input for the ledger.
+
+    Raises:
+        ExtractionError: If no valid value could be obtained.
+    """
+    cache = get_llm_cache()
+    key = cache_key(GEMINI_MODEL, prompt)
+    if cache is not None:
+        value = cached_result(cache, key, validate)
+        if value is not None:
+            return value
+        attempts = cache.failure_attempts(key)
+        if LLM_MAX_ATTEMPTS and attempts >= LLM_MAX_ATTEMPTS:
+            raise ExtractionError(f"Gave up on {item or key} after {attempts} failed attempts")
+
+    try:
+        value = request_json(prompt, schema)
+        if validate:
+            value = validate(value)
+    except requests.RequestException as e:
+        count('llm_extraction_failures_total', kind=kind, reason='request')
+        raise ExtractionError(f"Gemini request failed for {item or key}: {e}") from e
+    except (ValueError, KeyError, TypeError) as e:
+        count('llm_extraction_failures_total', kind=kind, reason='invalid')
+        if cache is not None:
+            cache.record_failure(key, kind, item, str(e))
+        raise ExtractionError(f"Invalid reply for {item or key}: {e}") from e
+    if cache is not None:
+        cache.put(key, GEMINI_MODEL, json.dumps(value))
+        cache.clear_failure(key)
+    return value
+
+def pack_batches(items, budget_tokens=BATCH_TOKEN_BUDGET, max_items=BATCH_MAX_ITEMS):
+    """
+    Group (index, text) items into batches under a token budget and item limit.
+
+    An item larger than the budget gets a batch of its own.
+    """
+    batches = []
+    current = []
+    tokens = 0
+    for index, text in items:
+        item_tokens = len(text) // CHARS_PER_TOKEN + 1
+        if current and (tokens + item_tokens > budget_tokens or len(current) >= max_items):
+            batches.append(current)
+            current = []
+            tokens = 0
+        current.append((index, text))
+        tokens += item_tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def batch_values(parsed):
+    """
+    Map item ids to values in a batched reply, given as [{id, result}, ...] or {id: result}.
+    """
+    if isinstance(parsed, dict):
+        return {str(key): value for key, value in parsed.items()}
+    if isinstance(parsed, list):
+        return {str(entry['id']): entry.get('result') for entry in parsed if isinstance(entry, dict) and 'id' in entry}
+    return {}
+
+def generate_json_batch(texts, single_prompt, batch_instructions, validate, schema=None, kind='json', concurrency=4,
+                        budget_tokens=BATCH_TOKEN_BUDGET, max_items=BATCH_MAX_ITEMS):
+    """
+    Extract JSON for many inputs with as few Gemini requests as possible.
+
+    Inputs are packed into batched prompts whose reply holds one {id, result}
+    object per item. Each value is validated and cached under its single-item
+    prompt, so batched and single calls share cache entries. Items missing
+    from a reply or failing validation are retried with a single call (see
+    generate_json), and items that already failed LLM_MAX_ATTEMPTS times are
+    skipped.
+
+    Args:
+        texts (list): Input snippets, one per item.
+        single_prompt (callable): Builds the one-item prompt for a snippet.
+        batch_instructions (str): Task description placed before the numbered snippets.
+        validate (callable): Returns the normalized value for one item or raises ValueError.
+        schema (dict): Response schema for one item.
+        kind (str): Ledger category for failed items.
+        concurrency (int): Batched requests sent in parallel.
+        budget_tokens (int): Approximate prompt tokens per batched request.
+        max_items (int): Items per batched request.
+
+    Returns:
+        list: Validated value per input, or None where extraction failed.
+    """
+    cache = get_llm_cache()
+    keys = [cache_key(GEMINI_MODEL, single_prompt(text)) for text in texts]
+    results = [None] * len(texts)
+    pending = []
+    for index, key in enumerate(keys):
+        if cache is not None:
+            results[index] = cached_result(cache, key, validate)
+            if results[index] is not None:
+                continue
+            if LLM_MAX_ATTEMPTS and cache.failure_attempts(key) >= LLM_MAX_ATTEMPTS:
+                logging.info(f"Skipping {kind} item that failed {LLM_MAX_ATTEMPTS} times: {texts[index][:100]}")
+                continue
+        pending.append((index, texts[index]))
+
+    def run_batch(batch):
+        if len(batch) == 1:
+            return []
+        prompt = batch_instructions + "\n" + "\n".join(f"[{number}] {text}" for number, (index, text) in enumerate(batch))
+        count('llm_batch_requests_total', kind=kind)
+        count('llm_batch_items_total', len(batch), kind=kind)
+        try:
+            values = batch_values(request_json(prompt, batch_schema(schema) if schema else None, salvage=True))
+        except Exception as e:
+            logging.error(f"Gemini batch request failed for {len(batch)} items: {e}")
+            return batch
+        failed = []
+        for number, (index, text) in enumerate(batch):
+            try:
+                results[index] = validate(values[str(number)])
+            except (KeyError, ValueError) as e:
+                logging.info(f"Batched reply missing or invalid for item {number}, retrying alone: {e}")
+                count('llm_batch_fallbacks_total', kind=kind)
+                failed.append((index, text))
+                continue
+            if cache is not None:
+                cache.put(keys[index], GEMINI_MODEL, json.dumps(results[index]))
+                cache.clear_failure(keys[index])
+        return failed
+
+    batches = pack_batches(pending, budget_tokens, max_items)
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        failed = [item for batch_failed in executor.map(bind_context(run_batch), batches) for item in batch_failed]
+        # Single-item batches are sent with the plain prompt, like a fallback
+        failed.extend(batch[0] for batch in batches if len(batch) == 1)
+
+        def run_single(item):
+            index, text = item
+            try:
+                results[index] = generate_json(single_prompt(text), schema, validate, kind, text[:200])
+            except ExtractionError as e:
+                logging.error(f"Gemini extraction failed for {kind}: {e}")
+
+        list(executor.map(bind_context(run_single), failed))
+    logging.info(f"Batched {len(pending)} uncached items into {sum(len(batch) > 1 for batch in batches)} requests, "
+                 f"{len(failed)} single calls")
+    return results
+
+VENUE_DETAILS_FIELDS = """
+        - size: Large (>10,000 capacity), Medium (1,000-10,000) or Small (<1,000)
+        - description: brief, max 100 words
+        - instagram: Instagram handle
+        - facebook: Facebook page
+        - website_url: Website URL
+        - non_venue_flag: true if not a fixed venue, e.g., festival space"""
+
+EVENT_FIELDS = """
+        - name: event title
+        - date: YYYY-MM-DD HH:MM:SS format
+        - url: event page or source URL"""
+
+def venue_details_prompt(text):
+    return f"""
+        Given the following venue information: {text}
+        Extract:{VENUE_DETAILS_FIELDS}
+        Return a JSON object with these fields. Use null for a handle or URL you don't know; don't guess.
+        """
+
+def event_data_prompt(page_text, url):
+    return f"""
+        Given the following text from {url}:
+        {page_text}
+        Extract a list of events with:{EVENT_FIELDS}
+        Return a JSON array of objects with these fields. If no events, return an empty array.
+        """
+
+def extract_venue_details(text):
+    """
+    Extract venue details with Gemini.
+
+    Returns:
+        dict: Validated details (see validation_utils.validate_venue_details), or None if extraction failed.
+    """
+    try:
+        details = generate_json(venue_details_prompt(text), VENUE_DETAILS_SCHEMA, validate_venue_details, 'venue_details', text)
         logging.info(f"Extracted venue details for: {text}")
         return details
-    except Exception as e:
-        logging.error(f"Gemini API error for venue details: {e}")
-        return {
-            'size': 'Medium',
-            'description': 'Unknown venue',
-            'instagram': None,
-            'facebook': None,
-            'website_url': None,
-            'non_venue_flag': False
-        }
+    except ExtractionError as e:
+        logging.error(f"Gemini extraction failed for venue details: {e}")
+        return None
+
+def extract_venue_details_batch(texts, concurrency=4):
+    """
+    Extract details for many venues, several venues per Gemini request.
+
+    Args:
+        texts (list): Venue descriptions (name, address, category).
+        concurrency (int): Batched requests sent in parallel.
+
+    Returns:
+        list: Validated details per venue in input order, None where extraction failed.
+    """
+    instructions = f"""
+        For each venue below, extract:{VENUE_DETAILS_FIELDS}
+        Each venue is preceded by its id in square brackets. Return a JSON array with one
+        {{"id": ..., "result": {{...these fields...}}}} object per venue. Use null for a handle or URL you don't know.
+        """
+    return generate_json_batch(texts, venue_details_prompt, instructions, validate_venue_details,
+                               VENUE_DETAILS_SCHEMA, 'venue_details', concurrency)
+
+def _with_page_url(events, url):
+    # Resolve relative links against the page, like the structured-data and Scrapy extractors
+    return [dict(event, url=urljoin(url, event['url']) if event['url'] else url) for event in events]
 
 def extract_event_data(text, url):
+    """
+    Extract events from a page: structured data first, Gemini for the rest.
+
+    Returns:
+        list: Events (name, date, url), or None if extraction failed.
+    """
     try:
-        url_api = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
-        headers = {'Content-Type': 'application/json'}
-        prompt = f"""
-        Given the following text from {url}: {text[:1000]}...
-        Extract a list of events with:
-        - Name (event title)
-        - Date (YYYY-MM-DD HH:MM:SS format)
-        - URL (event page or source URL)
-        Return a JSON array of objects with these fields. If no events, return an empty array.
-        """
-        data = {
-            "contents": [{"parts": [{"text": prompt}]}],
-            "generationConfig": {"temperature": 0.7}
-        }
-        response = requests.post(f"{url_api}?key={GEMINI_API_KEY}", headers=headers, json=data)
-        response.raise_for_status()
-        result = response.json()
-        content = result['candidates'][0]['content']['parts'][0]['text']
-        content = content.strip().strip('```json\n').strip('```')
-        events = json.loads(content)
+        # Pages that publish schema.org events need no LLM call at all
+        structured_events, page_text = reduce_html(text, url, EVENT_TEXT_TOKEN_BUDGET)
+        if structured_events:
+            logging.info(f"Found {len(structured_events)} structured events on: {url}")
+            return structured_events
+        if not page_text:
+            logging.info(f"No event-like text on: {url}")
+            return []
+        events = generate_json(event_data_prompt(page_text, url), EVENTS_SCHEMA, validate_events, 'events', url)
         logging.info(f"Extracted {len(events)} events from: {url}")
-        return events
+        return _with_page_url(events, url)
     except Exception as e:
-        logging.error(f"Gemini API error for events: {e}")
-        return []
+        logging.error(f"Gemini extraction failed for events on {url}: {e}")
+        return None
+
+def extract_event_data_batch(pages, concurrency=4):
+    """
+    Extract events from many pages, packing several page excerpts per Gemini request.
+
+    Args:
+        pages (list): (html, url) tuples.
+        concurrency (int): Batched requests sent in parallel.
+
+    Returns:
+        list: Events per page in input order, None where extraction failed.
+    """
+    events = [[] for _ in pages]
+    excerpts = []
+    for index, (html, url) in enumerate(pages):
+        try:
+            structured_events, page_text = reduce_html(html, url, EVENT_TEXT_TOKEN_BUDGET)
+        except Exception as e:
+            logging.error(f"Could not reduce page {url}: {e}")
+            events[index] = None
+            continue
+        if structured_events:
+            logging.info(f"Found {len(structured_events)} structured events on: {url}")
+            events[index] = structured_events
+        elif page_text:
+            excerpts.append((index, url, page_text))
+        else:
+            logging.info(f"No event-like text on: {url}")
+    if not excerpts:
+        return events
+
+    # Each snippet carries its URL; the single prompt is rebuilt from it for caching and fallbacks
+    snippets = [f"Source: {url}\n{page_text}" for index, url, page_text in excerpts]
+
+    def single_prompt(snippet):
+        url, page_text = snippet[len("Source: "):].split("\n", 1)
+        return event_data_prompt(page_text, url)
+
+    instructions = f"""
+        Below are text excerpts from several web pages, each preceded by its id in square brackets.
+        For each excerpt, extract a list of events with:{EVENT_FIELDS}
+        Return a JSON array with one {{"id": ..., "result": [...events...]}} object per excerpt,
+        using an empty result for excerpts without events.
+        """
+    results = generate_json_batch(snippets, single_prompt, instructions, validate_events, EVENTS_SCHEMA, 'events', concurrency)
+    for (index, url, page_text), result in zip(excerpts, results):
+        if result is None:
+            events[index] = None
+            continue
+        logging.info(f"Extracted {len(result)} events from: {url}")
+        events[index] = _with_page_url(result, url)
+    return events
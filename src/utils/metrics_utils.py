@@ -0,0 +1,324 @@
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Histogram bucket upper bounds, in seconds for latencies
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Finished spans kept in memory for the trace file
+MAX_SPANS = 10000
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _series(name, labels):
+    if not labels:
+        return name
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return name + '{' + ','.join(f'{label}="{value}"' for (label, _), value in zip(labels, escaped)) + '}'
+
+class MetricsRegistry:
+    """
+    Thread-safe counters, gauges, histograms and finished spans for one process.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._spans = deque(maxlen=MAX_SPANS)
+
+    def count(self, name, value, labels):
+        with self._lock:
+            self._counters[(name, labels)] = self._counters.get((name, labels), 0) + value
+
+    def set_gauge(self, name, value, labels):
+        with self._lock:
+            self._gauges[(name, labels)] = value
+
+    def observe(self, name, value, labels):
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                # Per-bucket counts (the last one is +Inf), sum, count
+                histogram = self._histograms[(name, labels)] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            index = 0
+            while index < len(self.buckets) and value > self.buckets[index]:
+                index += 1
+            histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def record_span(self, span):
+        with self._lock:
+            self._spans.append(span)
+
+    def drain_spans(self):
+        with self._lock:
+            spans = list(self._spans)
+            self._spans.clear()
+        return spans
+
+    def _quantile(self, counts, total, q):
+        # Upper bound of the bucket holding the q-th observation
+        rank = q * total
+        seen = 0
+        for bound, count in zip(self.buckets + (None,), counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def snapshot(self):
+        """
+        Current values as JSON-friendly dictionaries keyed by series name.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {key: (list(counts), total, count) for key, (counts, total, count) in self._histograms.items()}
+        return {
+            'counters': {_series(name, labels): value for (name, labels), value in sorted(counters.items())},
+            'gauges': {_series(name, labels): value for (name, labels), value in sorted(gauges.items())},
+            'histograms': {
+                _series(name, labels): {
+                    'count': count,
+                    'sum': round(total, 6),
+                    'p50': self._quantile(counts, count, 0.5),
+                    'p95': self._quantile(counts, count, 0.95),
+                    'p99': self._quantile(counts, count, 0.99)
+                }
+                for (name, labels), (counts, total, count) in sorted(histograms.items())
+            }
+        }
+
+    def render_prometheus(self):
+        """
+        Current values in the Prometheus text exposition format.
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._histograms.items())
+        lines = []
+        typed = set()
+        for kind, series in (('counter', counters), ('gauge', gauges)):
+            for (name, labels), value in series:
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{_series(name, labels)} {value}")
+        for (name, labels), (counts, total, count) in histograms:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                lines.append(f"{_series(name + '_bucket', labels + (('le', str(bound)),))} {cumulative}")
+            lines.append(f"{_series(name + '_sum', labels)} {total}")
+            lines.append(f"{_series(name + '_count', labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+registry = MetricsRegistry()
+# Unset until first checked: METRICS_ENABLED may come from .env, loaded after this module is imported
+_enabled = None
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+def metrics_enabled():
+    global _enabled
+    if _enabled is None:
+        load_dotenv()
+        _enabled = os.getenv('METRICS_ENABLED', '').lower() in ('1', 'true', 'yes')
+    return _enabled
+
+def enable_metrics(enabled=True):
+    """
+    Turn collection on or off for this process (METRICS_ENABLED=1 sets the default).
+    """
+    global _enabled
+    _enabled = enabled
+
+def count(name, value=1, **labels):
+    """
+    Add value to a counter. A no-op unless metrics are enabled, like every recording function here.
+    """
+    if metrics_enabled():
+        registry.count(name, value, _label_key(labels))
+
+def set_gauge(name, value, **labels):
+    if metrics_enabled():
+        registry.set_gauge(name, value, _label_key(labels))
+
+def observe(name, value, **labels):
+    """
+    Record a histogram observation, e.g. a latency in seconds.
+    """
+    if metrics_enabled():
+        registry.observe(name, value, _label_key(labels))
+
+class Span:
+    """
+    A timed operation. Spans opened inside it (in the same context) become its children.
+
+    On exit the duration is observed in span_duration_seconds{span=name},
+    errors are counted in span_errors_total, and the span is kept for the trace file.
+    """
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex
+        self.parent_id = parent.span_id if parent is not None else None
+        self.span_id = uuid.uuid4().hex[:16]
+        self._token = _current_span.set(self)
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._start
+        _current_span.reset(self._token)
+        labels = (('span', self.name),)
+        registry.observe('span_duration_seconds', duration, labels)
+        if exc_type is not None:
+            registry.count('span_errors_total', 1, labels)
+        registry.record_span({
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': round(self.start_time, 6),
+            'duration_ms': round(duration * 1000, 3),
+            'error': repr(exc) if exc_type is not None else None,
+            'attributes': self.attributes
+        })
+        return False
+
+class _NoopSpan:
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOOP_SPAN = _NoopSpan()
+
+def span(name, **attributes):
+    """
+    Context manager timing an operation as a span, or a shared no-op when metrics are disabled.
+    """
+    if not metrics_enabled():
+        return _NOOP_SPAN
+    return Span(name, attributes)
+
+def traced(name):
+    """
+    Decorator running each call of a function in a span.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not metrics_enabled():
+                return func(*args, **kwargs)
+            with Span(name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def annotate(**attributes):
+    """
+    Add attributes to the current span, e.g. result counts for the run summary.
+    """
+    if metrics_enabled():
+        current = _current_span.get()
+        if current is not None:
+            current.set(**attributes)
+
+def traced_run(run):
+    """
+    Decorator for agent entry points: runs the command in a root span, then
+    writes the run summary (see write_run_summary) with the root span's attributes.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not metrics_enabled():
+                return func(*args, **kwargs)
+            root = Span(run, {})
+            try:
+                with root:
+                    return func(*args, **kwargs)
+            finally:
+                write_run_summary(run, **root.attributes)
+        return wrapper
+    return decorator
+
+def bind_context(func):
+    """
+    Wrap func so calls from executor threads run in the caller's context and
+    their spans nest under the caller's current span.
+
+    asyncio tasks and asyncio.to_thread propagate context on their own;
+    ThreadPoolExecutor and run_in_executor do not.
+    """
+    if not metrics_enabled():
+        return func
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # A context can only be entered by one thread at a time
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
+
+def render_metrics():
+    return registry.render_prometheus()
+
+def write_run_summary(run, **fields):
+    """
+    Append a JSON line summarizing this run's metrics to METRICS_SUMMARY_PATH
+    (data/logs/metrics.jsonl by default), and its spans to METRICS_TRACE_PATH if set.
+
+    Args:
+        run (str): Name of the agent or command.
+        **fields: Extra values stored with the summary, e.g. HTTP client stats.
+
+    Returns:
+        dict: The summary, or None if metrics are disabled.
+    """
+    if not metrics_enabled():
+        return None
+    summary = {'run': run, 'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'), **fields, **registry.snapshot()}
+    try:
+        path = Path(os.getenv('METRICS_SUMMARY_PATH', 'data/logs/metrics.jsonl'))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'a') as summary_file:
+            summary_file.write(json.dumps(summary, default=str) + '\n')
+        trace_path = os.getenv('METRICS_TRACE_PATH')
+        if trace_path:
+            Path(trace_path).parent.mkdir(parents=True, exist_ok=True)
+            with open(trace_path, 'a') as trace_file:
+                for finished in registry.drain_spans():
+                    trace_file.write(json.dumps(dict(finished, run=run), default=str) + '\n')
+    except OSError as e:
+        logging.error(f"Could not write metrics summary: {e}")
+    return summary
@@ -0,0 +1,129 @@
+import logging
+import sqlite3
+import time
+from datetime import datetime
+
+JOB_COLUMNS = ('id', 'venue_id', 'source', 'target', 'priority', 'status', 'attempts', 'max_attempts',
+               'available_at', 'lease_owner', 'lease_expires', 'last_error')
+# Venues with an event within this many days are scraped first, soonest first
+PRIORITY_HORIZON_DAYS = 100
+
+def job_priority(upcoming_event_date, now=None):
+    """
+    Priority for a venue's jobs: higher the sooner its next known event is.
+    """
+    try:
+        event_date = datetime.strptime(str(upcoming_event_date)[:10], '%Y-%m-%d')
+    except ValueError:
+        return 0
+    days = (event_date - (now or datetime.now())).days
+    return max(PRIORITY_HORIZON_DAYS - max(days, 0), 0)
+
+def enqueue_jobs(conn, jobs, max_attempts=3):
+    """
+    Add jobs to the queue, re-queueing finished or failed jobs for the same venue and source.
+
+    Jobs currently leased by a worker are left alone.
+
+    Args:
+        conn (sqlite3.Connection): Database connection.
+        jobs (list): Dictionaries with venue_id, source, target and priority.
+        max_attempts (int): Leases allowed before a job is marked failed.
+
+    Returns:
+        int: Number of jobs queued.
+    """
+    now = time.time()
+    with conn:
+        cursor = conn.executemany("""
+            INSERT INTO scrape_jobs (venue_id, source, target, priority, max_attempts, available_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (venue_id, source) DO UPDATE SET
+                target = excluded.target, priority = excluded.priority, max_attempts = excluded.max_attempts,
+                status = 'pending', attempts = 0, available_at = excluded.available_at,
+                lease_owner = NULL, lease_expires = NULL, last_error = NULL, updated_at = excluded.updated_at
+            WHERE scrape_jobs.status != 'leased'
+        """, [(job['venue_id'], job['source'], job['target'], job.get('priority', 0), max_attempts, now, now) for job in jobs])
+    return cursor.rowcount
+
+def lease_jobs(conn, worker_id, limit=10, lease_seconds=600):
+    """
+    Claim up to limit ready jobs, highest priority first.
+
+    Pending jobs whose retry delay has passed and leased jobs whose lease
+    expired (their worker died) are both ready. The claim runs in an
+    IMMEDIATE transaction, so concurrent workers never lease the same job.
+
+    Returns:
+        list: Leased jobs as dictionaries.
+    """
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # A job whose worker died on its last attempt counts as failed
+        conn.execute("""
+            UPDATE scrape_jobs SET status = 'failed', last_error = 'Lease expired', lease_owner = NULL, updated_at = ?
+            WHERE status = 'leased' AND lease_expires < ? AND attempts >= max_attempts
+        """, (now, now))
+        rows = conn.execute(f"""
+            UPDATE scrape_jobs
+            SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ?
+            WHERE id IN (
+                SELECT id FROM scrape_jobs
+                WHERE (status = 'pending' AND available_at <= ?) OR (status = 'leased' AND lease_expires < ?)
+                ORDER BY priority DESC, id
+                LIMIT ?
+            )
+            RETURNING {', '.join(JOB_COLUMNS)}
+        """, (worker_id, now + lease_seconds, now, now, now, limit)).fetchall()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    jobs = [dict(zip(JOB_COLUMNS, row)) for row in rows]
+    return sorted(jobs, key=lambda job: (-job['priority'], job['id']))
+
+def complete_job(conn, job, worker_id):
+    """
+    Mark a leased job done. Call inside the transaction that stores its results.
+
+    Returns:
+        bool: False if the lease was lost to another worker in the meantime.
+    """
+    cursor = conn.execute("""
+        UPDATE scrape_jobs SET status = 'done', lease_owner = NULL, lease_expires = NULL, last_error = NULL, updated_at = ?
+        WHERE id = ? AND lease_owner = ?
+    """, (time.time(), job['id'], worker_id))
+    if cursor.rowcount == 0:
+        logging.warning(f"Lease lost for job {job['id']} ({job['source']} {job['target']})")
+    return cursor.rowcount > 0
+
+def fail_job(conn, job, worker_id, error, retry_delay=60):
+    """
+    Record a failed attempt: retry later with exponential backoff, or mark the job failed.
+    """
+    now = time.time()
+    if job['attempts'] >= job['max_attempts']:
+        status, available_at = 'failed', now
+    else:
+        status, available_at = 'pending', now + retry_delay * 2 ** (job['attempts'] - 1)
+    with conn:
+        conn.execute("""
+            UPDATE scrape_jobs SET status = ?, available_at = ?, last_error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ?
+            WHERE id = ? AND lease_owner = ?
+        """, (status, available_at, str(error)[:500], now, job['id'], worker_id))
+    logging.error(f"Job {job['id']} ({job['source']} {job['target']}) attempt {job['attempts']} failed, {status}: {error}")
+
+def queue_stats(conn):
+    """
+    Job counts by source and status.
+    """
+    stats = {}
+    try:
+        rows = conn.execute("SELECT source, status, COUNT(*) FROM scrape_jobs GROUP BY source, status").fetchall()
+    except sqlite3.OperationalError:
+        # Nothing has been queued on this database yet
+        return stats
+    for source, status, count in rows:
+        stats.setdefault(source, {})[status] = count
+    return stats
@@ -3,45 +3,99 @@ from scrapy.crawler import CrawlerProcess
 from scrapy.settings import Settings
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import TimeoutException
+from concurrent.futures import ThreadPoolExecutor
 import logging
+import queue
+import threading
+from pathlib import Path
+from src.utils.metrics_utils import count, span
 
-def scrape_website(url):
-    try:
-        events = []
+class EventSpider(scrapy.Spider):
+    name = "event_spider"
 
-        class EventSpider(scrapy.Spider):
-            name = "event_spider"
-            start_urls = [url]
+    def __init__(self, urls, events_by_url, **kwargs):
+        super().__init__(**kwargs)
+        self.urls = urls
+        self.events_by_url = events_by_url
 
-            def __init__(self, events_list, **kwargs):
-                super().__init__(**kwargs)
-                self.events_list = events_list
+    async def start(self):
+        for request in self.start_requests():
+            yield request
 
-            def parse(self, response):
-                for event in response.css(".event-item"):
-                    name = event.css(".event-title::text").get()
-                    date = event.css(".event-date::text").get()
-                    link = event.css("a::attr(href)").get()
+    def start_requests(self):
+        # Scrapy < 2.13 only calls start_requests(); newer versions call start()
+        for url in self.urls:
+            # Key results by the requested URL so redirects still map back to the venue
+            yield scrapy.Request(url, callback=self.parse, errback=self.on_error, cb_kwargs={'source_url': url})
 
-                    if name and date:
-                        self.events_list.append({
-                            "name": name.strip(),
-                            "date": date.strip(),
-                            "url": response.urljoin(link) if link else response.url
-                        })
+    def parse(self, response, source_url):
+        count('scrapy_pages_total', status=response.status)
+        # Only sites that loaded get an entry, so callers can tell a failed crawl from an empty one
+        self.events_by_url.setdefault(source_url, [])
+        for event in response.css(".event-item"):
+            name = event.css(".event-title::text").get()
+            date = event.css(".event-date::text").get()
+            link = event.css("a::attr(href)").get()
 
-        settings = Settings()
-        settings.set('LOG_ENABLED', False)
+            if name and date:
+                self.events_by_url[source_url].append({
+                    "name": name.strip(),
+                    "date": date.strip(),
+                    "url": response.urljoin(link) if link else response.url
+                })
 
-        process = CrawlerProcess(settings)
-        process.crawl(EventSpider, events_list=events)
-        process.start()
+    def on_error(self, failure):
+        count('scrapy_errors_total', error=type(failure.value).__name__)
+        logging.error(f"Scraping error for {failure.request.url}: {failure.value}")
 
-        return events
+def crawl_settings(concurrency=16, per_domain=2, cache_dir='data/httpcache'):
+    settings = Settings()
+    settings.set('LOG_ENABLED', False)
+    settings.set('CONCURRENT_REQUESTS', concurrency)
+    settings.set('CONCURRENT_REQUESTS_PER_DOMAIN', per_domain)
+    settings.set('AUTOTHROTTLE_ENABLED', True)
+    settings.set('AUTOTHROTTLE_TARGET_CONCURRENCY', float(per_domain))
+    settings.set('DOWNLOAD_TIMEOUT', 30)
+    settings.set('RETRY_TIMES', 1)
+    settings.set('HTTPCACHE_ENABLED', True)
+    settings.set('HTTPCACHE_DIR', str(Path(cache_dir).resolve()))
+    settings.set('HTTPCACHE_POLICY', 'scrapy.extensions.httpcache.RFC2616Policy')
+    return settings
+
+def scrape_websites(urls, concurrency=16, per_domain=2, cache_dir='data/httpcache'):
+    """
+    Crawl many venue websites in a single Scrapy reactor run.
 
+    The Twisted reactor can only be started once per process, so this should be
+    called once per run with every URL rather than once per venue.
+
+    Args:
+        urls (list): Venue website URLs.
+        concurrency (int): Maximum concurrent requests across all sites.
+        per_domain (int): Maximum concurrent requests per domain.
+        cache_dir (str): Directory for Scrapy's HTTP cache.
+
+    Returns:
+        dict: Events (name, date, url) keyed by the requested URL. Websites that
+            failed to load are left out.
+    """
+    urls = list(dict.fromkeys(url for url in urls if url))
+    events_by_url = {}
+    if not urls:
+        return events_by_url
+    try:
+        with span('scrapy.crawl', urls=len(urls)):
+            process = CrawlerProcess(crawl_settings(concurrency, per_domain, cache_dir))
+            process.crawl(EventSpider, urls=urls, events_by_url=events_by_url)
+            process.start()
+        logging.info(f"Crawled {len(urls)} websites, found {sum(len(e) for e in events_by_url.values())} events")
     except Exception as e:
-        logging.error(f"Scraping error for {url}: {e}")
-        return []
+        logging.error(f"Batch scraping error: {e}")
+    return events_by_url
+
+def scrape_website(url):
+    return scrape_websites([url]).get(url, [])
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
@@ -50,17 +104,175 @@ if __name__ == "__main__":
     for e in events:
         print(e)
 
-def scrape_dynamic_website(url, llm_func):
-    try:
+BLOCKED_RESOURCE_PATTERNS = [
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.mp4', '*.webm', '*.ogg', '*.mp3', '*.wav', '*.m4a', '*.mov',
+]
+
+class BrowserPool:
+    """
+    A fixed-size pool of long-lived headless Chrome drivers.
+
+    Drivers are started lazily, shared across threads, and replaced after
+    max_pages page loads or as soon as one raises a WebDriver error.
+    """
+
+    def __init__(self, size=2, max_pages=50, page_load_timeout=30, block_resources=True):
+        """
+        Args:
+            size (int): Maximum number of live browsers.
+            max_pages (int): Page loads before a browser is recycled.
+            page_load_timeout (int): Seconds before a page load is abandoned.
+            block_resources (bool): Skip images, fonts and media while rendering.
+        """
+        self.size = size
+        self.max_pages = max_pages
+        self.page_load_timeout = page_load_timeout
+        self.block_resources = block_resources
+        self._idle = queue.LifoQueue()
+        self._pages = {}
+        self._lock = threading.Lock()
+        self._live = 0
+        self._closed = False
+
+    def _start_driver(self):
         options = Options()
         options.add_argument('--headless')
+        options.add_argument('--disable-gpu')
+        options.add_argument('--disable-dev-shm-usage')
+        if self.block_resources:
+            options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
         driver = webdriver.Chrome(options=options)
-        driver.get(url)
-        content = driver.page_source
-        driver.quit()
+        driver.set_page_load_timeout(self.page_load_timeout)
+        if self.block_resources:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_RESOURCE_PATTERNS})
+        return driver
+
+    def _quit_driver(self, driver):
+        self._pages.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception as e:
+            logging.error(f"Error closing browser: {e}")
+
+    def _acquire(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Browser pool is closed")
+            start_new = self._idle.empty() and self._live < self.size
+            if start_new:
+                self._live += 1
+        if not start_new:
+            return self._idle.get()
+        try:
+            driver = self._start_driver()
+            count('browser_starts_total')
+        except Exception:
+            with self._lock:
+                self._live -= 1
+            # Threads may be waiting for this browser; wake one to try starting its own
+            self._idle.put(None)
+            raise
+        self._pages[id(driver)] = 0
+        return driver
+
+    def _release(self, driver, healthy):
+        pages = self._pages.get(id(driver), 0)
+        if healthy and pages < self.max_pages and not self._closed:
+            self._idle.put(driver)
+            return
+        self._quit_driver(driver)
+        with self._lock:
+            self._live -= 1
+        # Wake a waiting thread so it can start a replacement browser
+        self._idle.put(None)
+
+    def render(self, url):
+        """
+        Load a page in a pooled browser and return its rendered HTML.
+        """
+        while True:
+            driver = self._acquire()
+            if driver is not None:
+                break
+        healthy = False
+        try:
+            with span('browser.render', url=url):
+                self._pages[id(driver)] += 1
+                driver.get(url)
+                content = driver.page_source
+            healthy = True
+            count('browser_renders_total', status='ok')
+            return content
+        except TimeoutException:
+            # A slow page doesn't mean the browser is broken
+            healthy = True
+            count('browser_renders_total', status='timeout')
+            raise
+        except Exception:
+            count('browser_renders_total', status='error')
+            raise
+        finally:
+            self._release(driver, healthy)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        while not self._idle.empty():
+            driver = self._idle.get()
+            if driver is not None:
+                self._quit_driver(driver)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def render_dynamic_page(url, pool=None):
+    """
+    Render a page in a headless browser, returning its HTML or None on failure.
+    """
+    try:
+        if pool is None:
+            with BrowserPool(size=1) as own_pool:
+                return own_pool.render(url)
+        return pool.render(url)
+    except Exception as e:
+        logging.error(f"Dynamic rendering error for {url}: {e}")
+        return None
+
+def scrape_dynamic_website(url, llm_func, pool=None):
+    try:
+        content = render_dynamic_page(url, pool)
+        if content is None:
+            return []
         events = llm_func(content, url)
-        logging.info(f"Scraped dynamic website: {url}")
+        if events is not None:
+            logging.info(f"Scraped dynamic website: {url}")
         return events
     except Exception as e:
         logging.error(f"Dynamic scraping error for {url}: {e}")
         return []
+
+def scrape_dynamic_websites(urls, llm_func, pool_size=2, max_pages=50, page_load_timeout=30, block_resources=True):
+    """
+    Render many dynamic pages in parallel through a shared browser pool.
+
+    Args:
+        urls (list): Page URLs.
+        llm_func (callable): Extractor called with (content, url).
+        pool_size (int): Number of browsers rendering at once.
+        max_pages (int): Page loads before a browser is recycled.
+        page_load_timeout (int): Seconds before a page load is abandoned.
+        block_resources (bool): Skip images, fonts and media while rendering.
+
+    Returns:
+        dict: Extracted events keyed by URL, None where the extractor failed.
+    """
+    urls = list(dict.fromkeys(url for url in urls if url))
+    with BrowserPool(pool_size, max_pages, page_load_timeout, block_resources) as pool:
+        with ThreadPoolExecutor(max_workers=pool_size) as executor:
+            results = executor.map(lambda url: scrape_dynamic_website(url, llm_func, pool), urls)
+            return dict(zip(urls, results))
@@ -0,0 +1,88 @@
+import html
+import re
+
+# Terms beyond this are ignored, keeping every query cheap
+MAX_QUERY_TERMS = 8
+SNIPPET_TOKENS = 12
+# Control characters mark matches in snippets until the text is HTML-escaped
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+def fts_query(text):
+    """
+    Turn free text into an FTS5 query matching every word as a prefix.
+
+    Words are quoted, so FTS5 operators and punctuation in user input are
+    treated as plain text: 'comedy fri' becomes '"comedy"* "fri"*'.
+
+    Raises:
+        ValueError: If the text holds no searchable words.
+    """
+    terms = re.findall(r'\w+', text or '')[:MAX_QUERY_TERMS]
+    if not terms:
+        raise ValueError("Search query has no words")
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def highlight(snippet):
+    """
+    HTML-escape an FTS5 snippet and wrap its matches in <mark> tags.
+    """
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>')
+
+def search_venues(conn, text, limit=20, offset=0, columns=('id', 'name', 'category', 'address')):
+    """
+    Full-text search over venue names, descriptions, categories and addresses, best match first.
+
+    Args:
+        conn (sqlite3.Connection): Database connection.
+        text (str): Search words; each matches as a prefix.
+        limit (int): Maximum number of venues returned.
+        offset (int): Matches skipped, for paging.
+        columns (tuple): Venue columns to return.
+
+    Returns:
+        list: Venue dictionaries with added snippet (HTML with <mark> tags) and score (higher is better).
+    """
+    select = ', '.join(f"v.{column}" for column in columns)
+    # Rank and page inside the FTS table so only the returned rows are joined
+    rows = conn.execute(f"""
+        SELECT {select}, m.snippet, m.rank FROM (
+            SELECT rowid, rank, snippet(venues_fts, -1, ?, ?, '…', ?) AS snippet
+            FROM venues_fts WHERE venues_fts MATCH ? ORDER BY rank LIMIT ? OFFSET ?
+        ) m JOIN venues v ON v.id = m.rowid
+        ORDER BY m.rank
+    """, (MATCH_START, MATCH_END, SNIPPET_TOKENS, fts_query(text), limit, offset)).fetchall()
+    venues = []
+    for row in rows:
+        venue = {column: row[column] for column in columns}
+        venue['snippet'] = highlight(row['snippet'])
+        venue['score'] = round(-row['rank'], 4)
+        venues.append(venue)
+    return venues
+
+def search_events(conn, text, limit=20, offset=0):
+    """
+    Full-text search over event names, their venue names and weekdays, best match first.
+
+    Returns:
+        list: Events (id, name, date, url, venue_id, venue_name) with snippet and score.
+    """
+    rows = conn.execute("""
+        SELECT e.id, e.name, e.date, e.url, e.venue_id, v.name AS venue_name, m.snippet, m.rank FROM (
+            SELECT rowid, rank, snippet(events_fts, -1, ?, ?, '…', ?) AS snippet
+            FROM events_fts WHERE events_fts MATCH ? ORDER BY rank LIMIT ? OFFSET ?
+        ) m JOIN events e ON e.id = m.rowid LEFT JOIN venues v ON v.id = e.venue_id
+        ORDER BY m.rank
+    """, (MATCH_START, MATCH_END, SNIPPET_TOKENS, fts_query(text), limit, offset)).fetchall()
+    return [{
+        'id': row['id'],
+        'name': row['name'],
+        'date': row['date'],
+        'url': row['url'],
+        'venue_id': row['venue_id'],
+        'venue_name': row['venue_name'],
+        'snippet': highlight(row['snippet']),
+        'score': round(-row['rank'], 4)
+    } for row in rows]
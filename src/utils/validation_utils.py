@@ -1,21 +1,152 @@
+from collections import defaultdict
 from thefuzz import fuzz
 import logging
+from src.utils.html_utils import ISO_DATE, normalize_event_date
+
+# Two names are duplicates when fuzz.ratio(a, b) > NAME_SIMILARITY_THRESHOLD on the same date
+NAME_SIMILARITY_THRESHOLD = 90
+
+def normalize_event_name(name):
+    """
+    Lower-case an event name and collapse whitespace, as used for the events table key.
+    """
+    return ' '.join(name.lower().split())
+
+def _length_window(length):
+    """
+    Range of name lengths that can still score above the similarity threshold.
+
+    fuzz.ratio is 200 * matches / (len_a + len_b) with matches <= min(len_a, len_b),
+    so a score above 90 needs 11 * shorter > 9 * longer. The window is a superset
+    of that condition; the fuzzy scorer still makes the final decision.
+    """
+    return range(9 * length // 11, 11 * length // 9 + 2)
+
+class EventIndex:
+    """
+    Index of kept events blocked by exact date, then by normalized name and name length.
+
+    Only events in the same date block and length window are passed to the fuzzy
+    scorer, which returns the same answers as comparing against every kept event.
+    """
+
+    def __init__(self):
+        self._names = defaultdict(set)
+        self._lengths = defaultdict(lambda: defaultdict(list))
+
+    def is_duplicate(self, name, date):
+        if name in self._names.get(date, ()):
+            return True
+        by_length = self._lengths.get(date)
+        if not by_length:
+            return False
+        for length in _length_window(len(name)):
+            for existing in by_length.get(length, ()):
+                if fuzz.ratio(name, existing) > NAME_SIMILARITY_THRESHOLD:
+                    return True
+        return False
+
+    def add(self, name, date):
+        if name not in self._names[date]:
+            self._names[date].add(name)
+            self._lengths[date][len(name)].append(name)
 
 def deduplicate_events(events):
     try:
         deduplicated = []
+        index = EventIndex()
         for event in events:
-            is_duplicate = False
-            for existing in deduplicated:
-                name_similarity = fuzz.ratio(event['name'].lower(), existing['name'].lower())
-                date_match = event['date'] == existing['date']
-                if name_similarity > 90 and date_match:
-                    is_duplicate = True
-                    break
-            if not is_duplicate:
+            name = event['name'].lower()
+            if not index.is_duplicate(name, event['date']):
+                index.add(name, event['date'])
                 deduplicated.append(event)
         logging.info(f"Deduplicated {len(events)} events to {len(deduplicated)}")
         return deduplicated
     except Exception as e:
         logging.error(f"Deduplication error: {e}")
         return events
+
+VENUE_SIZES = ('Large', 'Medium', 'Small')
+# Keys models tend to use instead of the requested field names
+FIELD_ALIASES = {
+    'instagram_handle': 'instagram',
+    'facebook_page': 'facebook',
+    'website': 'website_url',
+    'non_venue': 'non_venue_flag',
+    'event_name': 'name',
+    'title': 'name',
+    'event_url': 'url'
+}
+
+def _normalize_keys(value, what):
+    if not isinstance(value, dict):
+        raise ValueError(f"{what} must be an object, got {type(value).__name__}")
+    normalized = {}
+    for key, field in value.items():
+        key = '_'.join(str(key).lower().replace('-', ' ').split())
+        normalized[FIELD_ALIASES.get(key, key)] = field
+    return normalized
+
+def _optional_text(value, field):
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"{field} must be a string or null")
+    return value.strip()
+
+def _flag(value, field):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ('true', 'false'):
+        return value.strip().lower() == 'true'
+    raise ValueError(f"{field} must be true or false")
+
+def validate_venue_details(value):
+    """
+    Check LLM venue details field by field.
+
+    Returns:
+        dict: size, description, instagram, facebook, website_url and non_venue_flag.
+
+    Raises:
+        ValueError: If a field is missing or has the wrong type or value.
+    """
+    details = _normalize_keys(value, 'Venue details')
+    size = str(details.get('size') or '').strip().capitalize()
+    if size not in VENUE_SIZES:
+        raise ValueError(f"size must be one of {', '.join(VENUE_SIZES)}, got {details.get('size')!r}")
+    description = _optional_text(details.get('description'), 'description')
+    if description is None:
+        raise ValueError("description is missing")
+    return {
+        'size': size,
+        'description': description,
+        'instagram': _optional_text(details.get('instagram'), 'instagram'),
+        'facebook': _optional_text(details.get('facebook'), 'facebook'),
+        'website_url': _optional_text(details.get('website_url'), 'website_url'),
+        'non_venue_flag': _flag(details.get('non_venue_flag', False), 'non_venue_flag')
+    }
+
+def validate_events(value):
+    """
+    Check an LLM event list, dropping events without a name or a parseable date.
+
+    Returns:
+        list: Events with name, date ('YYYY-MM-DD HH:MM:SS') and url (possibly None).
+
+    Raises:
+        ValueError: If the value is not a list of objects.
+    """
+    if not isinstance(value, list):
+        raise ValueError(f"Events must be an array, got {type(value).__name__}")
+    events = []
+    for item in value:
+        event = _normalize_keys(item, 'Event')
+        name = event.get('name')
+        date = normalize_event_date(event.get('date'))
+        if not isinstance(name, str) or not name.strip() or not isinstance(date, str) or not ISO_DATE.match(date):
+            logging.warning(f"Dropping extracted event without a name or ISO date: {item}")
+            continue
+        url = event.get('url')
+        events.append({'name': name.strip(), 'date': date, 'url': url.strip() if isinstance(url, str) and url.strip() else None})
+    return events
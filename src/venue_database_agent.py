@@ -5,98 +5,153 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 import click
-from src.utils.db_utils import connect_db, execute_query, close_db
-from src.utils.api_utils import geocode_address, find_venues, get_place_details
-from src.utils.llm_utils import extract_venue_details
+from concurrent.futures import ThreadPoolExecutor
+from src.utils.db_utils import writer_connection, upsert_venues
+from src.utils.api_utils import geocode_address, find_venues, get_place_details, venue_key
+from src.utils.llm_utils import extract_venue_details_batch
+from src.utils.cache_utils import get_llm_cache
+from src.utils.checkpoint_utils import Checkpoint
+from src.utils.http_utils import http_stats
+from src.utils.export_utils import refresh_static_snapshot
+from src.utils.metrics_utils import annotate, bind_context, count, span, traced_run
 
 # Setup logging
 Path('data/logs').mkdir(parents=True, exist_ok=True)
 logging.basicConfig(filename='data/logs/venue.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def update_venue_details(venue):
+# Venues per batched Gemini pass; the checkpoint is saved after each one
+ENRICH_CHUNK_SIZE = 50
+
+def venue_text(venue):
+    return f"{venue['name']}, {venue['address']}, {venue['category']}"
+
+def update_venue_details(venue, details=None):
     """
     Update venue details using Google Places API and Gemini API.
     
     Args:
         venue (dict): Venue dictionary with name, address, category, and place_id.
+        details (dict): Validated Gemini details for the venue, or None if extraction failed.
     
     Returns:
-        dict: Updated venue with size, description, instagram, facebook, website_url, phone_number, rating, non_venue_flag.
+        dict: Updated venue with website_url, phone_number and rating, plus size, description,
+        instagram, facebook and non_venue_flag when Gemini details are available. Without them
+        those columns are left as they are in the database.
     """
     try:
-        # Fetch details from Google Places API
-        place_details = get_place_details(venue['place_id'])
+        # Fetch details from Google Places API, which needs a place_id
+        place_details = get_place_details(venue['place_id']) if venue.get('place_id') else {}
         website = place_details.get('website')
         phone_number = place_details.get('phone_number')
         rating = place_details.get('rating')
 
-        # Use Gemini API for remaining details
-        text = f"{venue['name']}, {venue['address']}, {venue['category']}"
-        details = extract_venue_details(text)
         venue.update({
-            'size': details['size'],
-            'description': details['description'],
-            'instagram': details['instagram'],
-            'facebook': details['facebook'],
-            'non_venue_flag': details['non_venue_flag']
+            'website_url': website or (details or {}).get('website_url'),
+            'phone_number': phone_number,
+            'rating': rating
         })
+        # Remaining details from the Gemini API, never made up when extraction failed
+        if details is not None:
+            venue.update({
+                'size': details['size'],
+                'description': details['description'],
+                'instagram': details['instagram'],
+                'facebook': details['facebook'],
+                'non_venue_flag': details['non_venue_flag']
+            })
         
         return venue
     except Exception as e:
         logging.error(f"Error updating venue details for {venue['name']}: {e}")
         return venue
 
+def enrich_venues(venues, enriched, checkpoint, state, concurrency):
+    """
+    Enrich venues in chunks: one batched Gemini pass per chunk, then parallel
+    Places lookups, saving the checkpoint after each chunk.
+    
+    Args:
+        venues (list): Discovered venues, unique by venue_key.
+        enriched (dict): Already enriched venues keyed by venue_key; updated in place.
+        checkpoint (Checkpoint): Checkpoint saved as venues finish.
+        state (dict): Checkpoint state holding the discovered and enriched venues.
+        concurrency (int): Places lookups and Gemini requests run in parallel.
+    
+    Returns:
+        list: Enriched venues in discovery order.
+    """
+    pending = [venue for venue in venues if venue_key(venue) not in enriched]
+    if len(pending) < len(venues):
+        logging.info(f"Resuming: {len(venues) - len(pending)} venues already enriched")
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        for start in range(0, len(pending), ENRICH_CHUNK_SIZE):
+            chunk = [dict(venue) for venue in pending[start:start + ENRICH_CHUNK_SIZE]]
+            with span('venues.enrich_chunk', venues=len(chunk)):
+                details = extract_venue_details_batch([venue_text(venue) for venue in chunk], concurrency)
+                for venue in executor.map(bind_context(update_venue_details), chunk, details):
+                    enriched[venue_key(venue)] = venue
+            failed = sum(detail is None for detail in details)
+            state['failed'] += failed
+            count('venues_enriched_total', len(chunk) - failed, status='ok')
+            count('venues_enriched_total', failed, status='llm_failed')
+            checkpoint.save(state)
+    return [enriched[venue_key(venue)] for venue in venues]
+
 @click.command()
 @click.option('--address', required=True, help='Address to search near')
 @click.option('--radius', default=10, type=float, help='Radius in miles')
-def update_venues(address, radius):
+@click.option('--concurrency', default=4, type=int, help='Category searches and venue enrichments run in parallel')
+@click.option('--tile-radius', default=None, type=float, help='Cover the radius with tiles of this many miles, splitting tiles that hit the result cap')
+@click.option('--fresh', is_flag=True, help='Ignore any checkpoint from an interrupted run')
+@traced_run('venue_database')
+def update_venues(address, radius, concurrency, tile_radius, fresh):
     """
     Update venues in the database based on address and radius.
     """
     try:
         logging.info(f"Starting venue update for {address} with radius {radius} miles")
-        conn = connect_db()
-        
-        # Geocode the address
-        coordinates = geocode_address(address)
-        if not coordinates:
-            print(f"Error: Could not geocode address {address}")
-            close_db(conn)
-            return
+        checkpoint = Checkpoint('venues', {'address': address, 'radius': radius, 'tile_radius': tile_radius})
+        state = None if fresh else checkpoint.load()
         
-        latitude, longitude = coordinates
-        venues = find_venues(latitude, longitude, radius)
+        if state is None:
+            # Geocode the address
+            coordinates = geocode_address(address)
+            if not coordinates:
+                print(f"Error: Could not geocode address {address}")
+                return
+            
+            latitude, longitude = coordinates
+            venues = find_venues(latitude, longitude, radius, concurrency=concurrency, tile_radius_miles=tile_radius)
+            
+            if not venues:
+                print("No venues found.")
+                return
+            state = {'venues': venues, 'enriched': {}, 'failed': 0}
+            checkpoint.save(state)
+        else:
+            print(f"Resuming interrupted run from {checkpoint.path}")
+            logging.info(f"Resuming venue update from {checkpoint.path}")
         
-        if not venues:
-            print("No venues found.")
-            close_db(conn)
-            return
+        # Enrich first so the write transaction doesn't wait on API calls
+        venues = enrich_venues(state['venues'], state['enriched'], checkpoint, state, concurrency)
         
-        updated_count = 0
-        for venue in venues:
-            venue = update_venue_details(venue)
-            query = """
-                INSERT OR REPLACE INTO venues (
-                    name, x_coordinate, y_coordinate, address, size, category, 
-                    description, instagram, facebook, website_url, phone_number, rating, non_venue_flag
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """
-            params = (
-                venue['name'], venue['x_coordinate'], venue['y_coordinate'], 
-                venue['address'], venue.get('size'), venue['category'], 
-                venue.get('description'), venue.get('instagram'), 
-                venue.get('facebook'), venue.get('website_url'), 
-                venue.get('phone_number'), venue.get('rating'), 
-                venue.get('non_venue_flag', False)
-            )
-            execute_query(conn, query, params)
-            updated_count += 1
-            logging.info(f"Updated venue: {venue['name']}")
+        with writer_connection() as conn:
+            updated_count = upsert_venues(conn, venues)
+        checkpoint.clear()
+        snapshot = refresh_static_snapshot()
         
-        conn.commit()
-        close_db(conn)
         print(f"Successfully updated {updated_count} venues in the database.")
+        if state.get('failed'):
+            print(f"Gemini details could not be extracted for {state['failed']} venues; their stored details were kept. "
+                  f"Failures are listed in the llm_failures table of the LLM cache.")
         logging.info(f"Completed venue update: {updated_count} venues")
+        llm_cache = get_llm_cache()
+        if llm_cache is not None:
+            logging.info(f"LLM cache stats: {llm_cache.stats()}")
+        logging.info(f"HTTP stats: {http_stats()}")
+        count('venues_stored_total', updated_count)
+        annotate(venues=updated_count, failed=state.get('failed', 0), http=http_stats(),
+                 llm_cache=llm_cache.stats() if llm_cache is not None else None, snapshot=snapshot)
     
     except Exception as e:
         logging.error(f"Error in update_venues: {e}")
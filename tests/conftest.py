@@ -0,0 +1,106 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+import pytest
+from src.utils import http_utils
+from src.utils.db_utils import connect_db, ensure_schema
+
+FIXTURES = Path(__file__).parent.parent / 'benchmarks' / 'fixtures'
+SCHEMA = Path(__file__).parent.parent / 'src' / 'schemas' / 'venue_schema.sql'
+
+class StubServer:
+    """
+    A local HTTP server standing in for an upstream API or website.
+
+    Routes map a path prefix to a handler called with (path, query, body) that
+    returns (status, payload). Dict and list payloads are sent as JSON, strings
+    as HTML. Every request is recorded in `requests` as (method, path, query, body).
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def handle_route(self, method):
+                url = urlsplit(self.path)
+                query = dict(parse_qsl(url.query))
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                with stub._lock:
+                    stub.requests.append((method, url.path, query, body))
+                route = next((handler for prefix, handler in stub.routes.items() if url.path.startswith(prefix)), None)
+                if route is None:
+                    self.send_error(404)
+                    return
+                status, payload = route(url.path, query, body)
+                if isinstance(payload, (dict, list)):
+                    data, content_type = json.dumps(payload).encode('utf-8'), 'application/json'
+                else:
+                    data, content_type = str(payload).encode('utf-8'), 'text/html; charset=utf-8'
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self.handle_route('GET')
+
+            def do_POST(self):
+                self.handle_route('POST')
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def calls(self, path_prefix):
+        with self._lock:
+            return [request for request in self.requests if request[1].startswith(path_prefix)]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def stub_server():
+    server = StubServer()
+    yield server
+    server.close()
+
+def add_venue(conn, name='Test Hall', address='1 Main St'):
+    cursor = conn.execute("INSERT INTO venues (name, x_coordinate, y_coordinate, address) VALUES (?, 42.33, -83.05, ?)", (name, address))
+    conn.commit()
+    return cursor.lastrowid
+
+@pytest.fixture
+def db(isolated_run):
+    """
+    A database at the default path (relative to the test's directory) built from
+    the schema file and brought up to date like the agents do.
+    """
+    conn = connect_db('data/venues.db')
+    conn.executescript(SCHEMA.read_text())
+    ensure_schema(conn)
+    yield conn
+    conn.close()
+
+@pytest.fixture(autouse=True)
+def isolated_run(tmp_path, monkeypatch):
+    """
+    Run each test in an empty directory (data/ paths are relative), with fresh
+    HTTP clients, no provider rate limits and no LLM cache.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(http_utils, '_clients', {})
+    for provider in http_utils.PROVIDERS:
+        monkeypatch.setenv(f"{provider.upper()}_RATE_LIMIT", '0')
+    monkeypatch.setenv('LLM_CACHE_DISABLED', '1')
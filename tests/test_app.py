@@ -0,0 +1,125 @@
+import json
+import math
+
+import pytest
+from src import app as api_module
+from src.utils.db_utils import ConnectionPool, upsert_events
+from tests.conftest import add_venue
+
+@pytest.fixture
+def client(db, monkeypatch):
+    """
+    A test client reading the test database through a fresh pool and response cache.
+    """
+    pool = ConnectionPool('data/venues.db', size=2)
+    monkeypatch.setattr(api_module, 'reader_pool', pool)
+    monkeypatch.setattr(api_module, 'response_cache', api_module.ResponseCache())
+    yield api_module.app.test_client()
+    while not pool._idle.empty():
+        pool._idle.get().close()
+
+def venue_names(response):
+    assert response.status_code == 200, response.get_json()
+    return [venue['name'] for venue in response.get_json()['venues']]
+
+def test_venues_are_paged_by_id(client):
+    first = client.get('/api/venues?limit=2').get_json()
+    assert [venue['id'] for venue in first['venues']] == [1, 2]
+    assert first['next_after'] == 2
+    rest = client.get(f"/api/venues?limit=2&after={first['next_after']}").get_json()
+    assert [venue['id'] for venue in rest['venues']] == [3]
+    assert rest['next_after'] is None
+
+def test_page_size_is_bounded(client, monkeypatch):
+    monkeypatch.setattr(api_module, 'MAX_PAGE_SIZE', 2)
+    assert len(client.get('/api/venues?limit=500').get_json()['venues']) == 2
+    for query in ('limit=0', 'limit=-3', 'limit=ten', 'after=x'):
+        response = client.get(f"/api/venues?{query}")
+        assert response.status_code == 400 and 'error' in response.get_json()
+
+def test_venue_filters(client, db):
+    assert venue_names(client.get('/api/venues?category=Stadium')) == ['Ford Field']
+    assert venue_names(client.get('/api/venues?size=Large,Small')) == ['Ford Field', 'The Eastern', 'Hart Plaza Festivals']
+    assert venue_names(client.get('/api/venues?non_venue_flag=true')) == ['Hart Plaza Festivals']
+    assert venue_names(client.get('/api/venues?size=Large&non_venue_flag=0')) == ['Ford Field']
+    assert venue_names(client.get('/api/venues?bbox=42.33,-83.04,42.35,-83.03')) == ['The Eastern']
+
+    venue_id = add_venue(db, 'Comedy Castle')
+    upsert_events(db, [{'venue_id': venue_id, 'name': 'Open Mic', 'date': '2030-05-03'}])
+    assert venue_names(client.get('/api/venues?event_from=2030-05-01&event_to=2030-05-31')) == ['Comedy Castle']
+    assert venue_names(client.get('/api/venues?event_from=2030-06-01')) == []
+
+    assert client.get('/api/venues?non_venue_flag=maybe').status_code == 400
+    assert client.get('/api/venues?bbox=1,2,3').status_code == 400
+
+def test_fields_select_columns(client):
+    venues = client.get('/api/venues?fields=name,category&limit=1').get_json()['venues']
+    assert venues == [{'id': 1, 'name': 'Ford Field', 'category': 'Stadium'}]
+    assert client.get('/api/venues?fields=name,password').status_code == 400
+
+def test_etag_matches_until_the_data_changes(client, db):
+    first = client.get('/api/venues?limit=2')
+    etag = first.headers['ETag']
+    assert etag
+
+    unchanged = client.get('/api/venues?limit=2', headers={'If-None-Match': etag})
+    assert unchanged.status_code == 304 and unchanged.data == b''
+    # Another query is a different resource
+    assert client.get('/api/venues?limit=3', headers={'If-None-Match': etag}).status_code == 200
+
+    db.execute("UPDATE venues SET description = 'Renovated' WHERE id = 1")
+    db.commit()
+    changed = client.get('/api/venues?limit=2', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert changed.get_json()['venues'][0]['description'] == 'Renovated'
+
+ORIGIN = (42.0, -83.0)
+
+def add_nearby_venues(db):
+    miles_per_degree_lng = 69.0 * math.cos(math.radians(ORIGIN[0]))
+    offsets = {
+        'One Mile East': (0, 1.0),
+        'Half Mile North': (0.5, 0),
+        'Edge Of Radius': (-1.9, 0),
+        # Inside the bounding box of a 2-mile radius, but about 2.5 miles away
+        'Box Corner': (1.8, 1.8),
+    }
+    for name, (north, east) in offsets.items():
+        db.execute("INSERT INTO venues (name, x_coordinate, y_coordinate, address) VALUES (?, ?, ?, 'x')",
+                   (name, ORIGIN[0] + north / 69.0, ORIGIN[1] + east / miles_per_degree_lng))
+    db.commit()
+
+def test_nearby_venues_within_radius_nearest_first(client, db):
+    add_nearby_venues(db)
+    body = client.get(f"/api/venues/nearby?lat={ORIGIN[0]}&lng={ORIGIN[1]}").get_json()
+    assert [venue['name'] for venue in body['venues']] == ['Half Mile North', 'One Mile East', 'Edge Of Radius']
+    assert body['count'] == 3
+    distances = [venue['distance_miles'] for venue in body['venues']]
+    assert distances == pytest.approx([0.5, 1.0, 1.9], abs=0.01)
+
+    assert venue_names(client.get(f"/api/venues/nearby?lat={ORIGIN[0]}&lng={ORIGIN[1]}&radius=0.75")) == ['Half Mile North']
+    assert len(venue_names(client.get(f"/api/venues/nearby?lat={ORIGIN[0]}&lng={ORIGIN[1]}&radius=3"))) == 4
+    assert venue_names(client.get(f"/api/venues/nearby?lat={ORIGIN[0]}&lng={ORIGIN[1]}&limit=2")) == ['Half Mile North', 'One Mile East']
+
+def test_nearby_venues_reject_bad_coordinates(client):
+    for query in ('lng=-83', 'lat=42', 'lat=north&lng=-83', 'lat=91&lng=-83', 'lat=42&lng=-181',
+                  'lat=42&lng=-83&radius=-1', 'lat=42&lng=-83&radius=1000', 'lat=42&lng=-83&limit=0'):
+        response = client.get(f"/api/venues/nearby?{query}")
+        assert response.status_code == 400, query
+        assert 'error' in response.get_json()
+
+def test_export_streams_ndjson(client, monkeypatch):
+    # Small chunks, so the rows arrive over several reads
+    monkeypatch.setattr('src.utils.export_utils.EXPORT_CHUNK_ROWS', 1)
+    response = client.get('/api/venues/export?fields=id,name&size=Large')
+    assert response.status_code == 200 and response.mimetype == 'application/x-ndjson'
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line) for line in lines] == [{'id': 1, 'name': 'Ford Field'}, {'id': 3, 'name': 'Hart Plaza Festivals'}]
+
+def test_export_streams_compact_json(client):
+    response = client.get('/api/venues/export?format=compact&fields=id,name,size')
+    assert response.status_code == 200 and response.mimetype == 'application/json'
+    assert response.get_json() == {'columns': ['id', 'name', 'size'],
+                                   'rows': [[1, 'Ford Field', 'Large'], [2, 'The Eastern', 'Small'], [3, 'Hart Plaza Festivals', 'Large']]}
+    assert client.get('/api/venues/export?format=csv').status_code == 400
@@ -0,0 +1,77 @@
+import gzip
+import os
+import sqlite3
+import time
+
+from click.testing import CliRunner
+from src import backup_db
+from src.utils import backup_utils
+from src.utils.backup_utils import create_backup, list_backups, snapshot_database, verify_database
+from tests.conftest import add_venue
+
+def venue_names(path):
+    conn = sqlite3.connect(path)
+    try:
+        return [row[0] for row in conn.execute("SELECT name FROM venues ORDER BY id")]
+    finally:
+        conn.close()
+
+def test_snapshot_of_a_live_wal_database_is_consistent(db, monkeypatch):
+    assert db.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    # Committed rows still in the WAL, plus enough pages for several backup steps
+    add_venue(db, 'Committed Hall')
+    for number in range(200):
+        add_venue(db, f"Padding {number}", f"{number} Filler Ave")
+    # An open write transaction that isn't committed when the copy starts
+    db.execute("INSERT INTO venues (name, x_coordinate, y_coordinate, address) VALUES ('Uncommitted Hall', 42.33, -83.05, '2 Main St')")
+    real_sleep = time.sleep
+
+    def write_between_steps(seconds):
+        # Writes committed while the copy runs are not part of the snapshot
+        if db.in_transaction:
+            db.commit()
+            add_venue(db, 'Late Hall', '3 Main St')
+        real_sleep(0)
+
+    monkeypatch.setattr(backup_utils.time, 'sleep', write_between_steps)
+    stats = snapshot_database('data/venues.db', 'data/snapshot.db', step_pages=1, step_pause=0.01)
+
+    assert stats['steps'] > 1
+    names = venue_names('data/snapshot.db')
+    assert 'Committed Hall' in names and 'Uncommitted Hall' not in names and 'Late Hall' not in names
+    assert {'Uncommitted Hall', 'Late Hall'} <= set(venue_names('data/venues.db'))
+    ok, problems, _ = verify_database('data/snapshot.db')
+    assert ok and problems == []
+    conn = sqlite3.connect('data/snapshot.db')
+    assert conn.execute("PRAGMA integrity_check").fetchone()[0] == 'ok'
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'delete'
+    conn.close()
+
+def test_backup_is_verified_and_compressed(db):
+    report = create_backup('data/venues.db', 'data/backups', step_pause=0)
+    assert report['verify']['ok']
+    backup, = list_backups('data/backups')
+    assert str(backup) == report['path'] and backup.name.endswith('.db.gz')
+    with gzip.open(backup) as compressed, open('data/restored.db', 'wb') as restored:
+        restored.write(compressed.read())
+    assert venue_names('data/restored.db') == ['Ford Field', 'The Eastern', 'Hart Plaza Festivals']
+    assert not [path for path in os.listdir('data/backups') if path.endswith('.partial')]
+
+def test_retention_keeps_exactly_the_newest_backups(db):
+    os.makedirs('data/backups')
+    now = time.time()
+    for day in range(1, 6):
+        path = f"data/backups/{backup_utils.BACKUP_PREFIX}2026-10-{day:02d}_03-00-00.db.gz"
+        with open(path, 'wb') as backup:
+            backup.write(b'old')
+        os.utime(path, (now - 86400 * (10 - day), now - 86400 * (10 - day)))
+
+    result = CliRunner().invoke(backup_db.main, ['--backup-dir', 'data/backups', '--keep', '3', '--step-pause', '0'])
+
+    assert result.exit_code == 0, result.output
+    assert 'Removed 3 old backups.' in result.output
+    kept = [path.name for path in list_backups('data/backups')]
+    assert len(kept) == 3
+    # The new backup plus the two newest old ones
+    assert kept[1:] == [f"{backup_utils.BACKUP_PREFIX}2026-10-05_03-00-00.db.gz", f"{backup_utils.BACKUP_PREFIX}2026-10-04_03-00-00.db.gz"]
+    assert sorted(os.listdir('data/backups')) == sorted(kept)
@@ -0,0 +1,109 @@
+import threading
+import time
+import urllib.request
+
+import pytest
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from src.utils.scraping_utils import BrowserPool, scrape_dynamic_websites
+from tests.conftest import FIXTURES
+
+class FakeDriver:
+    """
+    Stands in for a Chrome driver: fetches the page over HTTP instead of rendering it.
+    """
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on or {}
+        self.page_source = None
+        self.loads = 0
+        self.quit_called = False
+
+    def get(self, url):
+        self.loads += 1
+        for marker, error in self.fail_on.items():
+            if marker in url:
+                raise error
+        with urllib.request.urlopen(url, timeout=5) as response:
+            self.page_source = response.read().decode('utf-8')
+
+    def quit(self):
+        self.quit_called = True
+
+@pytest.fixture
+def venue_pages(stub_server):
+    page = (FIXTURES / 'venue_events.html').read_text()
+    stub_server.routes['/venues/'] = lambda path, query, body: (200, page.replace('{venue}', f"Venue {path.rsplit('/', 1)[-1]}"))
+    return stub_server
+
+def fake_drivers(monkeypatch, **driver_options):
+    drivers = []
+
+    def start_driver(pool):
+        driver = FakeDriver(**driver_options)
+        drivers.append(driver)
+        return driver
+
+    monkeypatch.setattr(BrowserPool, '_start_driver', start_driver)
+    return drivers
+
+def test_pool_renders_pages_in_parallel_with_bounded_browsers(venue_pages, monkeypatch):
+    drivers = fake_drivers(monkeypatch)
+    urls = [f"{venue_pages.url}/venues/{number}" for number in range(12)]
+    seen = {}
+
+    def extract(content, url):
+        seen[url] = content
+        return [{'name': 'Show', 'date': '2026-11-01', 'url': url}]
+
+    results = scrape_dynamic_websites(urls, extract, pool_size=3)
+
+    assert set(results) == set(urls)
+    assert all(events for events in results.values())
+    assert 'Venue 7' in seen[f"{venue_pages.url}/venues/7"]
+    assert len(drivers) <= 3
+    assert all(driver.quit_called for driver in drivers)
+
+def test_pool_recycles_browsers_after_max_pages(venue_pages, monkeypatch):
+    drivers = fake_drivers(monkeypatch)
+    with BrowserPool(size=1, max_pages=2) as pool:
+        for number in range(5):
+            pool.render(f"{venue_pages.url}/venues/{number}")
+    assert [driver.loads for driver in drivers] == [2, 2, 1]
+    assert all(driver.quit_called for driver in drivers)
+
+def test_pool_replaces_crashed_browser_but_keeps_timed_out_one(venue_pages, monkeypatch):
+    drivers = fake_drivers(monkeypatch, fail_on={'crash': WebDriverException('tab crashed'), 'slow': TimeoutException('slow')})
+    with BrowserPool(size=1) as pool:
+        with pytest.raises(TimeoutException):
+            pool.render(f"{venue_pages.url}/venues/slow")
+        assert len(drivers) == 1 and not drivers[0].quit_called
+        with pytest.raises(WebDriverException):
+            pool.render(f"{venue_pages.url}/venues/crash")
+        assert drivers[0].quit_called
+        assert 'Venue 3' in pool.render(f"{venue_pages.url}/venues/3")
+    assert len(drivers) == 2
+
+def test_failed_browser_start_wakes_waiting_threads(monkeypatch):
+    def start_driver(pool):
+        # Long enough for the other thread to block waiting for this browser
+        time.sleep(0.2)
+        raise RuntimeError("chrome not found")
+
+    monkeypatch.setattr(BrowserPool, '_start_driver', start_driver)
+    errors = []
+
+    def render(pool):
+        try:
+            pool.render('http://127.0.0.1:9/unused')
+        except RuntimeError as e:
+            errors.append(e)
+
+    with BrowserPool(size=1) as pool:
+        threads = [threading.Thread(target=render, args=(pool,), daemon=True) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.05)
+        for thread in threads:
+            thread.join(timeout=5)
+        assert not any(thread.is_alive() for thread in threads)
+    assert len(errors) == 2
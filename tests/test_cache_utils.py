@@ -0,0 +1,76 @@
+import pytest
+from src.utils import cache_utils
+from src.utils.cache_utils import LLMCache, cache_key, get_llm_cache
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_utils.time, 'time', clock)
+    return clock
+
+@pytest.fixture
+def cache():
+    cache = LLMCache('data/llm_cache.db', ttl_seconds=60, max_entries=2)
+    yield cache
+    cache.close()
+
+def test_keys_ignore_whitespace_but_not_the_model():
+    assert cache_key('gemini', 'Find  events\n at the venue') == cache_key('gemini', 'Find events at the venue')
+    assert cache_key('gemini', 'Find events') != cache_key('other', 'Find events')
+
+def test_entries_expire_after_the_ttl(cache, clock):
+    cache.put('a', 'gemini', '{"size": "Small"}')
+    clock.now += 60
+    assert cache.get('a') == '{"size": "Small"}'
+    clock.now += 1
+    assert cache.get('a') is None
+    # Expired entries are dropped on the next write
+    cache.put('b', 'gemini', '[]')
+    assert cache.evictions == 1
+    assert cache._conn.execute("SELECT key FROM llm_cache").fetchall() == [('b',)]
+
+def test_least_recently_used_entry_is_evicted(cache, clock):
+    cache.put('a', 'gemini', 'A')
+    clock.now += 1
+    cache.put('b', 'gemini', 'B')
+    clock.now += 1
+    # Reading 'a' makes 'b' the least recently used
+    assert cache.get('a') == 'A'
+    clock.now += 1
+    cache.put('c', 'gemini', 'C')
+
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == ('A', 'C')
+    assert cache.evictions == 1
+
+def test_hits_and_misses_are_counted(cache):
+    assert cache.stats() == {'hits': 0, 'misses': 0, 'evictions': 0, 'hit_rate': 0.0}
+    cache.put('a', 'gemini', 'A')
+    cache.get('a')
+    cache.get('a')
+    cache.get('missing')
+    assert cache.stats() == {'hits': 2, 'misses': 1, 'evictions': 0, 'hit_rate': 0.667}
+
+def test_cache_file_is_shared_between_instances(cache):
+    cache.put('a', 'gemini', 'A')
+    other = LLMCache('data/llm_cache.db')
+    assert other.get('a') == 'A'
+    other.close()
+
+def test_process_cache_is_configured_from_the_environment(monkeypatch):
+    monkeypatch.setattr(cache_utils, '_llm_cache', None)
+    assert get_llm_cache() is None
+    monkeypatch.delenv('LLM_CACHE_DISABLED')
+    monkeypatch.setenv('LLM_CACHE_PATH', 'data/other_cache.db')
+    monkeypatch.setenv('LLM_CACHE_TTL', '5')
+    cache = get_llm_cache()
+    assert (cache.db_path, cache.ttl_seconds, cache.max_entries) == ('data/other_cache.db', 5, 10000)
+    assert get_llm_cache() is cache
+    cache.close()
@@ -0,0 +1,27 @@
+import asyncio
+import time
+
+from src.utils.concurrency_utils import BoundedRunner
+
+def run_calls(hosts, concurrency, host_interval):
+    """
+    Run one quick call per host entry and return (host, start time) per call, in order.
+    """
+    async def main():
+        runner = BoundedRunner(concurrency, host_interval)
+        start = time.monotonic()
+        try:
+            return await asyncio.gather(*(runner.run(host, lambda host=host: (host, time.monotonic() - start)) for host in hosts))
+        finally:
+            runner.close()
+    return asyncio.run(main())
+
+def test_calls_to_one_host_are_spaced_out():
+    starts = [started for _, started in run_calls(['a.test'] * 3, concurrency=3, host_interval=0.2)]
+    assert all(later - earlier >= 0.18 for earlier, later in zip(starts, starts[1:]))
+
+def test_host_interval_does_not_hold_slots_from_other_hosts():
+    results = run_calls(['a.test'] * 4 + ['b.test', 'c.test'], concurrency=2, host_interval=0.3)
+    # Without holding slots while a.test waits out its interval, the other hosts run straight away
+    assert all(started < 0.15 for host, started in results if host != 'a.test')
+    assert [host for host, _ in results] == ['a.test'] * 4 + ['b.test', 'c.test']
@@ -0,0 +1,75 @@
+from datetime import date, timedelta
+
+from src.utils import db_utils
+from src.utils.db_utils import connect_db, load_fetch_states, upsert_events, upsert_venues, writer_connection
+from src.utils.geo_utils import find_nearby_venues
+from src.utils.queue_utils import queue_stats
+from src.utils.search_utils import search_events, search_venues
+from tests.conftest import SCHEMA, add_venue
+
+def test_upcoming_event_includes_date_only_events_today(db):
+    venue_id = add_venue(db)
+    today = date.today()
+    upsert_events(db, [
+        {'venue_id': venue_id, 'name': 'Yesterday', 'date': (today - timedelta(days=1)).isoformat()},
+        {'venue_id': venue_id, 'name': 'Tonight', 'date': today.isoformat()},
+        {'venue_id': venue_id, 'name': 'Tomorrow', 'date': (today + timedelta(days=1)).isoformat()},
+    ])
+
+    row = db.execute("SELECT upcoming_event_name, upcoming_event_date FROM venues WHERE id = ?", (venue_id,)).fetchone()
+    assert tuple(row) == ('Tonight', f"{today.isoformat()} 00:00:00")
+
+def test_upsert_venues_adopts_rows_stored_without_place_id(db):
+    # Rows written before the place_id column existed
+    first_id = add_venue(db, 'Fox Theatre', '2211 Woodward Ave')
+    second_id = add_venue(db, 'Majestic', '4120 Woodward Ave')
+    venues = [
+        {'place_id': 'fox', 'name': 'Fox Theatre', 'address': '2211 Woodward Ave', 'x_coordinate': 42.34, 'y_coordinate': -83.05, 'rating': 4.5},
+        {'place_id': 'majestic', 'name': 'Majestic', 'address': '4120 Woodward Ave', 'x_coordinate': 42.35, 'y_coordinate': -83.06},
+        {'place_id': 'new', 'name': 'New Hall', 'address': '1 New St', 'x_coordinate': 42.36, 'y_coordinate': -83.07},
+    ]
+    count_before = db.execute("SELECT count(*) FROM venues").fetchone()[0]
+
+    upsert_venues(db, venues)
+    upsert_venues(db, venues)
+
+    assert db.execute("SELECT count(*) FROM venues").fetchone()[0] == count_before + 1
+    rows = {row['place_id']: row for row in db.execute("SELECT id, place_id, rating FROM venues WHERE place_id IS NOT NULL")}
+    assert rows['fox']['id'] == first_id and rows['fox']['rating'] == 4.5
+    assert rows['majestic']['id'] == second_id
+
+def test_upsert_venues_matches_venues_without_place_id_by_name_and_address(db):
+    venue = {'name': 'Park Stage', 'address': 'Belle Isle', 'x_coordinate': 42.34, 'y_coordinate': -82.98}
+    upsert_venues(db, [venue])
+    upsert_venues(db, [dict(venue, place_id='', rating=4.0)])
+
+    rows = db.execute("SELECT place_id, rating FROM venues WHERE name = 'Park Stage'").fetchall()
+    assert [tuple(row) for row in rows] == [(None, 4.0)]
+
+def test_ensure_schema_indexes_a_database_created_from_the_schema_file(db):
+    # The sample venues were inserted before the search and spatial indexes existed
+    assert [venue['name'] for venue in search_venues(db, 'eastern')] == ['The Eastern']
+    assert 'Ford Field' in [venue['name'] for venue in find_nearby_venues(db, 42.34, -83.045, 1)]
+    venue_id = add_venue(db, 'Comedy Castle')
+    upsert_events(db, [{'venue_id': venue_id, 'name': 'Open Mic Comedy', 'date': '2030-05-03 20:00'}])
+    assert [event['name'] for event in search_events(db, 'comedy friday')] == ['Open Mic Comedy']
+
+def test_writer_connection_updates_schema_once_per_database(db, monkeypatch):
+    calls = []
+    monkeypatch.setattr(db_utils, 'ensure_schema', lambda conn: calls.append(conn))
+    for _ in range(3):
+        with writer_connection() as conn:
+            conn.execute("UPDATE venues SET rating = 4.0")
+    with writer_connection('data/other.db'):
+        pass
+    assert len(calls) == 2
+
+def test_readers_do_not_change_the_schema():
+    conn = connect_db('data/fresh.db')
+    conn.executescript(SCHEMA.read_text())
+
+    assert load_fetch_states(conn) == {}
+    assert queue_stats(conn) == {}
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert 'fetch_state' not in tables and 'scrape_jobs' not in tables
+    conn.close()
@@ -0,0 +1,40 @@
+import gzip
+import json
+
+import brotli
+from src.utils.export_utils import refresh_static_snapshot
+from tests.conftest import add_venue
+
+def read_snapshots(output_dir):
+    raw = (output_dir / 'venues.json').read_bytes()
+    assert gzip.decompress((output_dir / 'venues.json.gz').read_bytes()) == raw
+    assert brotli.decompress((output_dir / 'venues.json.br').read_bytes()) == raw
+    return json.loads(raw)
+
+def test_snapshot_is_written_with_compressed_copies(db, tmp_path):
+    output_dir = tmp_path / 'snapshot'
+    stats = refresh_static_snapshot('data/venues.db', output_dir)
+
+    snapshot = read_snapshots(output_dir)
+    assert stats['venues'] == 3
+    assert stats['bytes'] == {kind: (output_dir / name).stat().st_size
+                              for kind, name in [('json', 'venues.json'), ('gzip', 'venues.json.gz'), ('brotli', 'venues.json.br')]}
+    names = [row[snapshot['columns'].index('name')] for row in snapshot['rows']]
+    assert names == ['Ford Field', 'The Eastern', 'Hart Plaza Festivals']
+    assert sorted(path.name for path in output_dir.iterdir()) == ['venues.json', 'venues.json.br', 'venues.json.gz']
+
+def test_snapshot_is_replaced_after_a_write(db, tmp_path):
+    output_dir = tmp_path / 'snapshot'
+    refresh_static_snapshot('data/venues.db', output_dir)
+    first = read_snapshots(output_dir)
+    add_venue(db)
+
+    refresh_static_snapshot('data/venues.db', output_dir)
+    second = read_snapshots(output_dir)
+    assert len(second['rows']) == len(first['rows']) + 1
+    assert second['change_counter'] != first['change_counter']
+
+def test_snapshot_can_be_turned_off(db, tmp_path, monkeypatch):
+    monkeypatch.setenv('STATIC_SNAPSHOT_DIR', '')
+    assert refresh_static_snapshot('data/venues.db') is None
+    assert refresh_static_snapshot('data/missing/venues.db', tmp_path / 'snapshot') is None
@@ -0,0 +1,43 @@
+from src import event_scraper_agent
+from src.event_scraper_agent import check_page, get_dynamic_page, get_website_events
+from src.utils.fetch_utils import FetchTracker
+
+class FailingPool:
+    def render(self, url):
+        raise RuntimeError("tab crashed")
+
+def stored_state(url):
+    return {'source_key': f"page:{url}", 'url': url, 'etag': None, 'last_modified': None,
+            'content_hash': 'old', 'last_checked': '2026-10-01 00:00:00', 'last_changed': '2026-10-01 00:00:00'}
+
+def serve_venue_pages(stub_server):
+    stub_server.routes['/venues/'] = lambda path, query, body: (200, f"<html>{path}</html>")
+    return [f"{stub_server.url}/venues/{number}" for number in range(2)]
+
+def test_failed_render_restores_page_state(stub_server):
+    urls = serve_venue_pages(stub_server)
+    tracker = FetchTracker({f"page:{urls[0]}": stored_state(urls[0])})
+
+    assert not check_page(tracker, urls[0]) and not check_page(tracker, urls[1])
+    assert get_dynamic_page(urls[0], FailingPool(), tracker) == []
+    assert get_dynamic_page(urls[1], FailingPool(), tracker) == []
+
+    # The old hash is back, and a new page has no state, so both are fetched again next run
+    assert tracker.states[f"page:{urls[0]}"]['content_hash'] == 'old'
+    assert f"page:{urls[1]}" not in tracker.states
+    assert not check_page(tracker, urls[0])
+
+def test_failed_crawl_restores_page_state(stub_server, monkeypatch):
+    urls = serve_venue_pages(stub_server)
+    tracker = FetchTracker({f"page:{url}": stored_state(url) for url in urls})
+    for url in urls:
+        assert not check_page(tracker, url)
+    # Only the first site loaded; the second is missing from the crawl results
+    monkeypatch.setattr(event_scraper_agent, 'scrape_websites', lambda sites: {urls[0]: [{'name': 'Show', 'date': '2026-11-01', 'url': urls[0]}]})
+    venues = [{'name': f"Venue {number}", 'website_url': url, 'non_venue_flag': 0} for number, url in enumerate(urls)]
+
+    events = get_website_events(venues, tracker=tracker)
+
+    assert events == {'Venue 0': [{'name': 'Show', 'date': '2026-11-01', 'url': urls[0], 'venue': 'Venue 0'}], 'Venue 1': []}
+    assert tracker.states[f"page:{urls[0]}"]['content_hash'] != 'old'
+    assert tracker.states[f"page:{urls[1]}"]['content_hash'] == 'old'
@@ -0,0 +1,20 @@
+import sqlite3
+
+import pytest
+from src.utils.geo_utils import find_nearby_venues, haversine_many, haversine_miles
+
+def test_haversine_distances():
+    # Detroit to Chicago is about 237 miles
+    assert haversine_miles(42.3314, -83.0458, 41.8781, -87.6298) == pytest.approx(237, abs=2)
+    assert haversine_many(42.0, -83.0, [(42.0, -83.0), (42.0 + 1 / 69.0, -83.0)]) == pytest.approx([0, 1.0], abs=0.01)
+
+def test_nearby_venues_without_rtree_match_the_index(db):
+    indexed = find_nearby_venues(db, 42.335, -83.04, 1, columns=('id', 'name'))
+    assert [venue['name'] for venue in indexed] == ['Ford Field', 'Hart Plaza Festivals', 'The Eastern']
+    assert [venue['distance_miles'] for venue in indexed] == sorted(venue['distance_miles'] for venue in indexed)
+
+    plain = sqlite3.connect(':memory:')
+    plain.row_factory = sqlite3.Row
+    plain.execute("CREATE TABLE venues (id INTEGER PRIMARY KEY, name TEXT, x_coordinate FLOAT, y_coordinate FLOAT)")
+    plain.executemany("INSERT INTO venues SELECT ?, ?, ?, ?", [tuple(row) for row in db.execute("SELECT id, name, x_coordinate, y_coordinate FROM venues")])
+    assert find_nearby_venues(plain, 42.335, -83.04, 1, columns=('id', 'name')) == indexed
@@ -0,0 +1,46 @@
+from src.utils.html_utils import normalize_event_date, pack_blocks, reduce_html
+from tests.conftest import FIXTURES
+
+PAGE_URL = 'https://shelter.test/calendar'
+
+def test_events_are_read_from_json_ld_and_microdata():
+    events, _ = reduce_html((FIXTURES / 'structured_events.html').read_text(), PAGE_URL)
+    assert sorted(events, key=lambda event: event['date']) == [
+        {'name': 'Motown Revue Live', 'date': '2030-05-02 19:30:00', 'url': 'https://shelter.test/events/motown-revue'},
+        {'name': 'Live Jazz Brunch', 'date': '2030-05-18 11:00:00', 'url': 'https://shelter.test/events/jazz-brunch'},
+        {'name': 'Summer Block Party', 'date': '2030-06-14 00:00:00', 'url': 'https://tickets.test/block-party'},
+    ]
+
+def test_small_parser_chunks_give_the_same_result():
+    html = (FIXTURES / 'structured_events.html').read_text()
+    assert reduce_html(html, PAGE_URL, chunk_size=7) == reduce_html(html, PAGE_URL)
+
+def test_text_keeps_event_blocks_and_drops_boilerplate():
+    html = (FIXTURES / 'venue_events.html').read_text().replace('{venue}', 'The Shelter')
+    events, text = reduce_html(html, 'https://shelter.test/events')
+
+    assert events == []
+    lines = text.splitlines()
+    assert lines[:3] == ["Detroit's home for live music, comedy and late-night dancing since 1998.",
+                         'Motown Revue Live', '2030-05-02 19:30:00 Tickets']
+    assert '2030-05-21 20:00:00 Tickets' in lines
+    # Head, navigation and the page footer never reach the model
+    for boilerplate in ('Upcoming Events', 'analytics', 'margin', 'Contact', 'Woodward'):
+        assert boilerplate not in text
+
+def test_headers_inside_an_event_are_kept():
+    _, text = reduce_html((FIXTURES / 'structured_events.html').read_text(), PAGE_URL)
+    assert 'Live Jazz Brunch' in text.splitlines()
+    assert 'box office' not in text and 'Congress' not in text
+
+def test_text_is_packed_into_the_budget():
+    _, text = reduce_html((FIXTURES / 'venue_events.html').read_text(), 'https://shelter.test/events', budget_tokens=20)
+    assert 0 < len(text) <= 80
+    # Event-like blocks win over the rest, and come out in page order
+    assert pack_blocks(['About us', 'Live show Friday 8pm', 'Parking', 'Tickets May 3'], 40) == 'Live show Friday 8pm\nTickets May 3'
+    assert pack_blocks(['About us', 'Parking'], 40) == 'About us\nParking'
+
+def test_iso_dates_are_normalized():
+    assert normalize_event_date('2030-05-02T19:30') == '2030-05-02 19:30:00'
+    assert normalize_event_date('2030-05-02 19:30:15+02:00') == '2030-05-02 19:30:15'
+    assert normalize_event_date('Friday at 8') == 'Friday at 8'
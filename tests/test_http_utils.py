@@ -0,0 +1,77 @@
+import time
+
+import pytest
+import requests
+from src.utils.http_utils import HttpClient, TokenBucket, get_client, http_stats
+
+def flaky(stub_server, statuses):
+    """
+    Answer /flaky with each status in turn, then 200.
+    """
+    remaining = list(statuses)
+    stub_server.routes['/flaky'] = lambda path, query, body: (remaining.pop(0) if remaining else 200, {'ok': not remaining})
+    return f"{stub_server.url}/flaky"
+
+def test_retries_rate_limited_and_server_errors(stub_server):
+    client = HttpClient('test', retries=3, backoff=0.01)
+    response = client.get(flaky(stub_server, [429, 503]))
+
+    assert response.status_code == 200
+    assert len(stub_server.calls('/flaky')) == 3
+    stats = client.stats()
+    assert (stats['requests'], stats['errors'], stats['retries']) == (3, 2, 2)
+    assert 'p50_ms' in stats and 'p95_ms' in stats
+
+def test_client_errors_are_not_retried(stub_server):
+    client = HttpClient('test', retries=3, backoff=0.01)
+    assert client.get(flaky(stub_server, [404])).status_code == 404
+    assert len(stub_server.calls('/flaky')) == 1
+
+def test_last_response_is_returned_when_retries_run_out(stub_server):
+    client = HttpClient('test', retries=2, backoff=0.01)
+    assert client.get(flaky(stub_server, [500, 502, 504, 503])).status_code == 504
+    assert client.stats()['retries'] == 2
+
+def test_connection_errors_raise_after_retries(stub_server):
+    url = f"{stub_server.url}/gone"
+    stub_server.close()
+    client = HttpClient('test', retries=1, backoff=0.01, timeout=2)
+    with pytest.raises(requests.ConnectionError):
+        client.get(url)
+    assert client.stats()['requests'] == 2 and client.stats()['errors'] == 2
+
+class FakeResponse:
+    def __init__(self, headers):
+        self.headers = headers
+
+def test_retry_delay_honours_retry_after_and_caps_backoff():
+    client = HttpClient('test', backoff=0.5, max_backoff=4)
+    assert client._retry_delay(0, FakeResponse({'Retry-After': '3'})) == 3
+    assert client._retry_delay(0, FakeResponse({'Retry-After': '120'})) == 4
+    # An HTTP-date Retry-After falls back to jittered backoff
+    assert 0 <= client._retry_delay(1, FakeResponse({'Retry-After': 'Wed, 21 Oct 2026 07:28:00 GMT'})) <= 1
+    assert all(0 <= client._retry_delay(10, None) <= 4 for _ in range(20))
+
+def test_token_bucket_allows_a_burst_then_paces():
+    bucket = TokenBucket(rate=20, burst=2)
+    start = time.monotonic()
+    waits = [bucket.acquire() for _ in range(6)]
+    elapsed = time.monotonic() - start
+
+    assert waits[:2] == [0.0, 0.0]
+    assert all(wait > 0 for wait in waits[2:])
+    # Four tokens beyond the burst at 20 per second
+    assert elapsed >= 0.18
+    assert TokenBucket(rate=None).acquire() == 0.0
+
+def test_clients_are_shared_per_provider_with_rate_overrides(stub_server, monkeypatch):
+    monkeypatch.setenv('GEMINI_RATE_LIMIT', '2.5')
+    assert get_client('gemini') is get_client('gemini')
+    assert get_client('gemini').limiter.rate == 2.5
+    # Disabled by the test setup
+    assert get_client('google_maps').limiter.rate == 0
+
+    get_client('web').get(flaky(stub_server, []))
+    stats = http_stats()
+    assert set(stats) == {'gemini', 'google_maps', 'web'}
+    assert stats['web']['requests'] == 1 and stats['gemini']['requests'] == 0
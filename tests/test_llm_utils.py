@@ -0,0 +1,150 @@
+import asyncio
+import json
+import re
+import urllib.request
+
+import pytest
+from src import event_scraper_agent
+from src.utils import llm_utils
+from src.utils.cache_utils import LLMCache
+from src.utils.llm_utils import ExtractionError, extract_event_data_batch, extract_json, generate_json
+from src.utils.validation_utils import validate_events
+from tests.conftest import FIXTURES
+
+BATCH_ITEM = re.compile(r'^\[(\d+)\] Source: (\S+)', re.M)
+SINGLE_SOURCE = re.compile(r'text from (\S+):')
+
+class GeminiStub:
+    """
+    Answers generateContent requests with one event per page URL. URLs in
+    `omit` are left out of batched replies, and URLs in `invalid` always get a
+    reply that fails validation.
+    """
+
+    def __init__(self):
+        self.omit = set()
+        self.invalid = set()
+        self.batches = []
+        self.singles = []
+
+    def events(self, url):
+        if url in self.invalid:
+            return 'no events here'
+        return [{'name': f"Show at {url}", 'date': '2030-05-02 19:30', 'url': None},
+                {'name': 'Open Mic', 'date': '2030-05-03', 'url': '/events/open-mic'}]
+
+    def __call__(self, path, query, body):
+        prompt = json.loads(body)['contents'][0]['parts'][0]['text']
+        items = BATCH_ITEM.findall(prompt)
+        if items:
+            self.batches.append([url for number, url in items])
+            value = [{'id': int(number), 'result': self.events(url)} for number, url in items if url not in self.omit]
+        else:
+            url = SINGLE_SOURCE.search(prompt).group(1)
+            self.singles.append(url)
+            value = self.events(url)
+        return 200, {'candidates': [{'content': {'parts': [{'text': json.dumps(value)}]}}]}
+
+@pytest.fixture
+def gemini(stub_server, monkeypatch):
+    stub = GeminiStub()
+    stub_server.routes['/gemini'] = stub
+    monkeypatch.setattr(llm_utils, 'GEMINI_URL', f"{stub_server.url}/gemini")
+    return stub
+
+def venue_page(number):
+    return (FIXTURES / 'venue_events.html').read_text().replace('{venue}', f"Venue {number}")
+
+def test_pages_share_batched_requests(gemini):
+    pages = [(venue_page(number), f"https://venue{number}.test/events") for number in range(5)]
+
+    events = extract_event_data_batch(pages)
+
+    assert gemini.batches == [[url for html, url in pages]] and not gemini.singles
+    assert [page_events[0]['name'] for page_events in events] == [f"Show at {url}" for html, url in pages]
+    # Events without a link point at the page they were found on
+    assert [page_events[0]['url'] for page_events in events] == [url for html, url in pages]
+    assert events[0][0]['date'] == '2030-05-02 19:30:00'
+    # Relative links are resolved against the page
+    assert events[2][1]['url'] == 'https://venue2.test/events/open-mic'
+
+def test_missing_and_invalid_items_are_retried_alone(gemini):
+    pages = [(venue_page(number), f"https://venue{number}.test/events") for number in range(3)]
+    gemini.omit.add(pages[1][1])
+    gemini.invalid.add(pages[2][1])
+
+    events = extract_event_data_batch(pages)
+
+    assert sorted(gemini.singles) == [pages[1][1], pages[2][1]]
+    assert events[0][0]['name'] == f"Show at {pages[0][1]}"
+    assert events[1][0]['name'] == f"Show at {pages[1][1]}"
+    assert events[2] is None
+
+def test_collect_events_extracts_pages_in_chunks(gemini, stub_server, monkeypatch):
+    stub_server.routes['/venues/'] = lambda path, query, body: (200, venue_page(path.rsplit('/', 1)[-1]))
+    venues = [{'name': f"Venue {number}", 'website_url': f"{stub_server.url}/venues/{number}", 'instagram': None,
+               'facebook': None, 'non_venue_flag': 0} for number in range(5)]
+
+    def render(url, pool):
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.read().decode('utf-8')
+
+    chunks = []
+
+    def extract(pages, concurrency):
+        chunks.append(len(pages))
+        return extract_event_data_batch(pages, concurrency)
+
+    monkeypatch.setattr(event_scraper_agent, 'get_ticketmaster_events', lambda venue_name, tracker=None: [])
+    monkeypatch.setattr(event_scraper_agent, 'get_eventbrite_events', lambda venue_name, tracker=None: [])
+    monkeypatch.setattr(event_scraper_agent, 'render_dynamic_page', render)
+    monkeypatch.setattr(event_scraper_agent, 'extract_event_data_batch', extract)
+
+    per_venue_events = asyncio.run(event_scraper_agent.collect_events_async(venues, {}, None, 4, 0, chunk_pages=2))
+
+    assert sorted(chunks) == [1, 2, 2]
+    for venue, events in zip(venues, per_venue_events):
+        assert [(event['name'], event['venue']) for event in events] == [(f"Show at {venue['website_url']}", venue['name']),
+                                                                         ('Open Mic', venue['name'])]
+
+def test_extract_json_ignores_fences_and_prose():
+    assert extract_json('```json\n{"size": "Large"}\n```') == {'size': 'Large'}
+    assert extract_json('Here are the events: [{"name": "A"}] Hope this helps!') == [{'name': 'A'}]
+    # Braces in prose that aren't JSON are skipped
+    assert extract_json('Result {not json} -> {"ok": true}') == {'ok': True}
+    with pytest.raises(ValueError):
+        extract_json('Sorry, I could not find any events.')
+
+def test_extract_json_salvages_truncated_arrays():
+    truncated = '[{"id": 0, "result": []}, {"id": 1, "result": [{"name": "A"}]}, {"id": 2, "res'
+    assert extract_json(truncated, salvage=True) == [{'id': 0, 'result': []}, {'id': 1, 'result': [{'name': 'A'}]}]
+    with pytest.raises(ValueError):
+        extract_json('[{"id": 0, "res', salvage=True)
+
+def test_ledger_gives_up_after_max_attempts(gemini, monkeypatch):
+    cache = LLMCache('data/llm_cache.db')
+    monkeypatch.setattr(llm_utils, 'get_llm_cache', lambda: cache)
+    monkeypatch.setattr(llm_utils, 'LLM_MAX_ATTEMPTS', 2)
+    url = 'https://venue.test/events'
+    gemini.invalid.add(url)
+    prompt = llm_utils.event_data_prompt('Friday: live music', url)
+
+    for _ in range(3):
+        with pytest.raises(ExtractionError):
+            generate_json(prompt, validate=validate_events, kind='events', item=url)
+
+    # Two invalid replies were recorded, then the prompt was no longer sent
+    assert gemini.singles == [url, url]
+    failure, = cache.failures('events')
+    assert (failure['item'], failure['attempts']) == (url, 2)
+    assert 'No JSON value in reply' in failure['error']
+
+    # A valid reply clears the ledger entry and is cached
+    gemini.invalid.clear()
+    monkeypatch.setattr(llm_utils, 'LLM_MAX_ATTEMPTS', 0)
+    events = generate_json(prompt, validate=validate_events, kind='events', item=url)
+    assert events[0]['name'] == f"Show at {url}"
+    assert cache.failures() == []
+    assert generate_json(prompt, validate=validate_events, kind='events', item=url) == events
+    assert len(gemini.singles) == 3
+    cache.close()
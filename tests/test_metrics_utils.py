@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from src.utils import metrics_utils
+from src.utils.metrics_utils import MetricsRegistry, bind_context, count, metrics_enabled, span
+
+@pytest.fixture
+def registry(monkeypatch):
+    """
+    Metrics turned on, recorded in a fresh registry.
+    """
+    registry = MetricsRegistry(buckets=(0.1, 1))
+    monkeypatch.setattr(metrics_utils, 'registry', registry)
+    monkeypatch.setattr(metrics_utils, '_enabled', True)
+    return registry
+
+def test_metrics_setting_is_read_on_first_use(monkeypatch):
+    monkeypatch.setattr(metrics_utils, '_enabled', None)
+    # Set after import, as load_dotenv in an entry point would
+    monkeypatch.setenv('METRICS_ENABLED', 'true')
+    assert metrics_enabled()
+    monkeypatch.setattr(metrics_utils, '_enabled', None)
+    monkeypatch.setenv('METRICS_ENABLED', '0')
+    assert not metrics_enabled()
+    assert span('off') is metrics_utils._NOOP_SPAN
+
+def test_label_values_are_escaped(registry):
+    count('http_requests_total', provider='say "hi"\\now\nthen')
+    count('http_requests_total', 2, provider='plain')
+    assert registry.render_prometheus().splitlines() == [
+        '# TYPE http_requests_total counter',
+        'http_requests_total{provider="plain"} 2',
+        'http_requests_total{provider="say \\"hi\\"\\\\now\\nthen"} 1',
+    ]
+
+def test_histogram_buckets_are_cumulative(registry):
+    for value in (0.05, 0.1, 0.5, 3):
+        metrics_utils.observe('fetch_seconds', value, host='a.test')
+    assert registry.render_prometheus().splitlines() == [
+        '# TYPE fetch_seconds histogram',
+        'fetch_seconds_bucket{host="a.test",le="0.1"} 2',
+        'fetch_seconds_bucket{host="a.test",le="1"} 3',
+        'fetch_seconds_bucket{host="a.test",le="+Inf"} 4',
+        'fetch_seconds_sum{host="a.test"} 3.65',
+        'fetch_seconds_count{host="a.test"} 4',
+    ]
+    assert registry.snapshot()['histograms']['fetch_seconds{host="a.test"}'] == {'count': 4, 'sum': 3.65, 'p50': 0.1, 'p95': None, 'p99': None}
+
+def test_spans_in_executor_threads_nest_under_the_caller(registry):
+    def work(number):
+        with span('work', number=number):
+            return number
+
+    with span('run'):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            assert list(executor.map(bind_context(work), range(3))) == [0, 1, 2]
+        # Without the bound context, executor threads start new traces
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            executor.submit(work, 3).result()
+
+    spans = registry.drain_spans()
+    root, = [finished for finished in spans if finished['name'] == 'run']
+    bound = [finished for finished in spans if finished['name'] == 'work' and finished['attributes']['number'] < 3]
+    unbound, = [finished for finished in spans if finished['name'] == 'work' and finished['attributes']['number'] == 3]
+    assert len(bound) == 3
+    assert all(finished['parent_id'] == root['span_id'] and finished['trace_id'] == root['trace_id'] for finished in bound)
+    assert unbound['parent_id'] is None and unbound['trace_id'] != root['trace_id']
+    assert registry.snapshot()['histograms']['span_duration_seconds{span="work"}']['count'] == 4
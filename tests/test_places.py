@@ -0,0 +1,109 @@
+import itertools
+
+import pytest
+from src.utils import api_utils
+from src.utils.api_utils import METERS_PER_MILE, find_venues
+from src.utils.geo_utils import MILES_PER_DEGREE_LAT, haversine_miles
+
+CENTER = (42.3314, -83.0458)
+
+def place(place_id, latitude=CENTER[0], longitude=CENTER[1], category='theater'):
+    return {'place_id': place_id, 'name': f"Place {place_id}", 'vicinity': f"{place_id} Main St",
+            'geometry': {'location': {'lat': latitude, 'lng': longitude}}, 'types': [category]}
+
+class PlacesStub:
+    """
+    Serves nearbysearch from a fixed list of places: those within the requested
+    radius, 20 per page and at most 3 pages, like the real API. A new
+    next_page_token is rejected once with INVALID_REQUEST before it works.
+    """
+
+    def __init__(self, places):
+        self.places = places
+        self.pages = {}
+        self.tokens_tried = set()
+        self.tokens = itertools.count()
+
+    def __call__(self, path, query, body):
+        if 'pagetoken' in query:
+            token = query['pagetoken']
+            if token not in self.tokens_tried:
+                self.tokens_tried.add(token)
+                return 200, {'status': 'INVALID_REQUEST', 'results': []}
+            results, page = self.pages.pop(token)
+        else:
+            latitude, longitude = map(float, query['location'].split(','))
+            radius_miles = float(query['radius']) / METERS_PER_MILE
+            results = [place for place in self.places if query['type'] in place['types']
+                       and haversine_miles(latitude, longitude, *place['geometry']['location'].values()) <= radius_miles][:60]
+            page = 0
+        response = {'status': 'OK' if results else 'ZERO_RESULTS', 'results': results[page * 20:(page + 1) * 20]}
+        if len(results) > (page + 1) * 20:
+            token = f"token-{next(self.tokens)}"
+            self.pages[token] = (results, page + 1)
+            response['next_page_token'] = token
+        return 200, response
+
+@pytest.fixture
+def places_api(stub_server, monkeypatch):
+    monkeypatch.setattr(api_utils, 'NEARBY_SEARCH_URL', f"{stub_server.url}/nearby")
+    monkeypatch.setattr(api_utils, 'PAGE_TOKEN_DELAY', 0)
+    return stub_server
+
+def test_failed_search_keeps_other_results(places_api):
+    def nearby(path, query, body):
+        if query['type'] == 'museum':
+            return 400, 'Bad request'
+        return 200, {'status': 'OK', 'results': [place(query['type'], category=query['type'])]}
+    places_api.routes['/nearby'] = nearby
+
+    venues = find_venues(*CENTER, 5, categories=['theater', 'museum', 'stadium'])
+
+    assert sorted(venue['place_id'] for venue in venues) == ['stadium', 'theater']
+
+def test_search_follows_page_tokens(places_api):
+    places_api.routes['/nearby'] = PlacesStub([place(f"p{number}") for number in range(45)])
+
+    venues = find_venues(*CENTER, 5, categories=['theater'])
+
+    assert len(venues) == 45
+    token_requests = [request for request in places_api.calls('/nearby') if 'pagetoken' in request[2]]
+    # Two pages after the first, each rejected once while the token becomes valid
+    assert len(token_requests) == 4
+
+def test_tiled_search_splits_saturated_tiles_and_deduplicates(places_api, capsys):
+    # A dense 10x10 grid of venues about 0.1 miles apart, far more than one search returns
+    step = 0.1 / MILES_PER_DEGREE_LAT
+    dense = [place(f"d{row}-{col}", CENTER[0] + row * step, CENTER[1] + col * step) for row in range(10) for col in range(10)]
+    # A venue inside a tile overhanging the circle but outside the search radius
+    outside = place('outside', CENTER[0] + 5.5 / MILES_PER_DEGREE_LAT, CENTER[1])
+    places_api.routes['/nearby'] = PlacesStub(dense + [outside])
+
+    untiled = find_venues(*CENTER, 5, categories=['theater'])
+    tiled = find_venues(*CENTER, 5, categories=['theater'], tile_radius_miles=2)
+
+    assert len(untiled) == 60
+    assert sorted(venue['place_id'] for venue in tiled) == sorted(venue['place_id'] for venue in dense)
+    radii = {float(request[2]['radius']) / METERS_PER_MILE for request in places_api.calls('/nearby') if 'radius' in request[2]}
+    assert min(radii) < 2
+    output = capsys.readouterr().out
+    assert 'capped at 60' in output
+    assert 'found 100 venues' in output
+
+def test_radius_over_the_places_limit_is_tiled(places_api, capsys):
+    far = place('far', CENTER[0] + 38 / MILES_PER_DEGREE_LAT, CENTER[1])
+    places_api.routes['/nearby'] = PlacesStub([place('center'), far])
+
+    venues = find_venues(*CENTER, 40, categories=['theater'])
+
+    assert sorted(venue['place_id'] for venue in venues) == ['center', 'far']
+    radii = [float(request[2]['radius']) for request in places_api.calls('/nearby') if 'radius' in request[2]]
+    assert len(radii) > 1 and max(radii) <= api_utils.PLACES_MAX_RADIUS_METERS
+    assert 'over the Places limit of 31.1 miles' in capsys.readouterr().out
+
+def test_tiles_are_no_larger_than_the_places_limit(places_api):
+    places_api.routes['/nearby'] = PlacesStub([place('center')])
+
+    assert [venue['place_id'] for venue in find_venues(*CENTER, 45, categories=['theater'], tile_radius_miles=40)] == ['center']
+    radii = [float(request[2]['radius']) for request in places_api.calls('/nearby') if 'radius' in request[2]]
+    assert max(radii) <= api_utils.PLACES_MAX_RADIUS_METERS
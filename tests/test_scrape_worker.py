@@ -0,0 +1,50 @@
+from src import scrape_worker
+from src.scrape_worker import process_batch, store_job_result
+from src.utils.fetch_utils import FetchTracker
+from src.utils.queue_utils import enqueue_jobs, lease_jobs
+from tests.conftest import add_venue
+
+def lease(db, venue_ids, worker_id='worker-1'):
+    enqueue_jobs(db, [{'venue_id': venue_id, 'source': 'ticketmaster', 'target': f"Venue {venue_id}"} for venue_id in venue_ids])
+    return lease_jobs(db, worker_id)
+
+def job_statuses(db):
+    return {row['venue_id']: row['status'] for row in db.execute("SELECT venue_id, status FROM scrape_jobs")}
+
+def stored_events(db):
+    return {row['venue_id']: row['name'] for row in db.execute("SELECT venue_id, name FROM events")}
+
+def show(name):
+    return [{'name': name, 'date': '2030-05-02 19:30:00', 'url': None}]
+
+def test_job_lost_to_another_worker_stores_nothing(db):
+    venue_id = add_venue(db)
+    job, = lease(db, [venue_id])
+    key = scrape_worker.job_key(job)
+    tracker = FetchTracker({key: {'source_key': key, 'url': 'https://example.test'}})
+
+    assert store_job_result(job, show('Show'), tracker, 'worker-2') == 0
+    assert stored_events(db) == {}
+    assert db.execute("SELECT count(*) FROM fetch_state").fetchone()[0] == 0
+    assert job_statuses(db) == {venue_id: 'leased'}
+
+def test_failed_store_fails_only_that_job(db, monkeypatch):
+    venue_ids = [add_venue(db, f"Hall {number}", f"{number} Main St") for number in range(3)]
+    jobs = lease(db, venue_ids)
+    write_events = scrape_worker.write_events
+
+    def failing_write(conn, events):
+        if events and events[0]['venue_id'] == venue_ids[1]:
+            raise ValueError("bad event")
+        return write_events(conn, events)
+
+    async def run_jobs(jobs, tracker, pool, concurrency, host_interval):
+        return [show(f"Show {job['venue_id']}") for job in jobs]
+
+    monkeypatch.setattr(scrape_worker, 'write_events', failing_write)
+    monkeypatch.setattr(scrape_worker, 'run_jobs_async', run_jobs)
+
+    assert process_batch(jobs, None, 'worker-1', 1, 0, False) == 2
+
+    assert stored_events(db) == {venue_ids[0]: f"Show {venue_ids[0]}", venue_ids[2]: f"Show {venue_ids[2]}"}
+    assert job_statuses(db) == {venue_ids[0]: 'done', venue_ids[1]: 'pending', venue_ids[2]: 'done'}
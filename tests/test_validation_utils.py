@@ -0,0 +1,42 @@
+import pytest
+from src.utils.validation_utils import validate_events, validate_venue_details
+
+def test_venue_details_are_normalized():
+    details = validate_venue_details({
+        'Size': 'large', 'description': '  Arena downtown ', 'Instagram Handle': '@arena',
+        'facebook_page': '', 'website': 'https://arena.test', 'non-venue': 'false'
+    })
+    assert details == {'size': 'Large', 'description': 'Arena downtown', 'instagram': '@arena', 'facebook': None,
+                       'website_url': 'https://arena.test', 'non_venue_flag': False}
+
+@pytest.mark.parametrize('value', [
+    [{'size': 'Large'}],
+    'Large arena',
+    {'size': 'Huge', 'description': 'Arena'},
+    {'size': 'Small'},
+    {'size': 'Small', 'description': 42},
+    {'size': 'Small', 'description': 'Bar', 'instagram': ['@bar']},
+    {'size': 'Small', 'description': 'Bar', 'non_venue_flag': 'maybe'},
+])
+def test_venue_details_with_wrong_types_or_values_are_rejected(value):
+    with pytest.raises(ValueError):
+        validate_venue_details(value)
+
+def test_events_without_name_or_date_are_dropped():
+    events = validate_events([
+        {'title': ' Open Mic ', 'date': '2030-05-03', 'event_url': ' /open-mic '},
+        {'name': 'Jazz Night', 'date': '2030-05-04T21:30', 'url': ''},
+        {'name': 'No Date'},
+        {'name': 'Sometime', 'date': 'next Friday'},
+        {'name': '', 'date': '2030-05-05'},
+        {'name': 7, 'date': '2030-05-05'},
+    ])
+    assert events == [
+        {'name': 'Open Mic', 'date': '2030-05-03 00:00:00', 'url': '/open-mic'},
+        {'name': 'Jazz Night', 'date': '2030-05-04 21:30:00', 'url': None},
+    ]
+
+@pytest.mark.parametrize('value', [{'name': 'Open Mic'}, 'no events', None, ['Open Mic 2030-05-03']])
+def test_events_that_are_not_a_list_of_objects_are_rejected(value):
+    with pytest.raises(ValueError):
+        validate_events(value)
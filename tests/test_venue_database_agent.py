@@ -0,0 +1,36 @@
+from src import venue_database_agent
+from src.utils.checkpoint_utils import Checkpoint
+from src.venue_database_agent import enrich_venues
+
+def discovered(name, place_id=''):
+    return {'name': name, 'address': f"{name} Rd", 'x_coordinate': 42.3, 'y_coordinate': -83.0, 'category': 'park', 'place_id': place_id}
+
+def test_venues_without_place_id_are_enriched_separately(monkeypatch):
+    looked_up = []
+
+    def place_details(place_id):
+        looked_up.append(place_id)
+        return {'website': f"https://{place_id}.test"}
+
+    def extract(texts, concurrency):
+        return [{'size': 'Small', 'description': text, 'instagram': None, 'facebook': None,
+                 'non_venue_flag': False, 'website_url': None} for text in texts]
+
+    monkeypatch.setattr(venue_database_agent, 'get_place_details', place_details)
+    monkeypatch.setattr(venue_database_agent, 'extract_venue_details_batch', extract)
+    venues = [discovered('Belle Isle'), discovered('Fox Theatre', 'fox'), discovered('Campus Martius')]
+    state = {'venues': venues, 'enriched': {}, 'failed': 0}
+    checkpoint = Checkpoint('venues', {'test': True})
+
+    enriched = enrich_venues(venues, state['enriched'], checkpoint, state, 2)
+
+    assert [venue['name'] for venue in enriched] == ['Belle Isle', 'Fox Theatre', 'Campus Martius']
+    assert [venue['description'].split(',')[0] for venue in enriched] == ['Belle Isle', 'Fox Theatre', 'Campus Martius']
+    assert looked_up == ['fox']
+    assert enriched[1]['website_url'] == 'https://fox.test'
+
+    # Resuming finds every venue already enriched
+    looked_up.clear()
+    resumed = enrich_venues(venues, checkpoint.load()['enriched'], checkpoint, state, 2)
+    assert [venue['name'] for venue in resumed] == ['Belle Isle', 'Fox Theatre', 'Campus Martius']
+    assert looked_up == []